@@ -1,13 +1,35 @@
+import collections
+import functools
 import multiprocessing
-import pyaudio
-import wave
+import os
+import threading
 import time
 
+from ring_buffer import RingBuffer, SharedRingBuffer
+from wav_reader import WavReader, WavError
+from pipeline import Pipeline, native_rate, stream_format, stream_sample_format
+from resampler import Quality
+from pcm_cache import PcmCache, CachedPcm, CacheStats
+from mixer import Mixer
+from read_ahead import ReadAheadReader, ReadAheadStats
+from player_stats import PlayerStats, StatsField, percentiles as _percentiles
+from output_backend import PortAudioBackend, CallbackFlag, StreamStatus
 
-class Play:
-    PLAY = 1
-    PAUSE = 2
-    STOP = 0
+
+class Command:
+    LOAD = 1
+    PLAY = 2
+    PAUSE = 3
+    STOP = 4
+    RESET = 5
+    LOAD_PCM = 6
+    SEEK = 7
+    ENQUEUE = 8
+    LOAD_MULTI = 9
+    LOAD_MIX = 10
+    ADD_VOICE = 11
+    REMOVE_VOICE = 12
+    QUIT = 0
 
 
 class Playing:
@@ -15,150 +37,1437 @@ class Playing:
     FINISH = 0
 
 
-def _play_audio(device, wav_file, play, playing, event):
+class PlayerEvent:
+    # Sent by the player process as (event, info)
+    STARTED = 1      # the stream started or resumed
+    PAUSED = 2
+    FINISHED = 3     # the last frame has been played
+    STOPPED = 4      # unloaded by STOP or RESET
+    DEVICE_LOST = 5  # the stream failed while playing, info is the message
+    ERROR = 6        # the source or the stream can't be opened, or the player process has exited, info is the message
+    TRACK_CHANGED = 7  # the next file of the queue is being heard, info is its path
+    STALLED = 8      # the file hasn't been read in time, info is its path
+    OUTPUT_LOST = 9  # another output of play_multi() has failed and is dropped, info is its device name
+    VOICE_FINISHED = 10  # a voice of the mixer has ended, info is (voice id, error message or '')
+
+
+class _Position:
+    # Index of the shared position array
+    FRAME = 0   # the frame of the source which is being heard
+    RATE = 1    # the sampling rate of the source
+    FRAMES = 2  # the frame count of the source, 0 if it is unknown
+
+
+class Engine:
+    BLOCKING = 0  # stream.write() chunk by chunk
+    CALLBACK = 1  # stream callback fed from a ring buffer
+
+
+def _pull_ring(ring, buffer, frame_count, frame_size, status, stats):
+    """
+    Take the frames of a stream callback from a ring, and count the underflows and underruns in the stats.
+
+    The frames are returned in the buffer without a copy, the stream takes them before the next callback.
+
+    Args:
+        buffer (memoryview): The preallocated output buffer, a larger one is made if the device asks for more.
+
+    Returns:
+        tuple: (a read-only view of the frames to return, CallbackFlag, the bytes read from the ring)
+    """
+    if status & StreamStatus.OUTPUT_UNDERFLOW:
+        stats.add(StatsField.UNDERFLOWS)
+    nbytes = frame_count * frame_size
+    if buffer is None or len(buffer) < nbytes:
+        buffer = memoryview(bytearray(nbytes))
+    out = buffer[:nbytes]
+    # Check it before reading, all the frames are in the ring if it is set.
+    source_finished = ring.finished
+    n = ring.read_into(out)
+    flag = CallbackFlag.CONTINUE
+    if n < nbytes:
+        if source_finished:
+            # Returning less than the requested frames completes the stream.
+            out = out[:n]
+            flag = CallbackFlag.COMPLETE
+        else:
+            # Underrun : fill the rest with silence
+            out[n:] = bytes(nbytes - n)
+            stats.add(StatsField.UNDERRUNS)
+    # PyAudio takes a read-only buffer only
+    return out.toreadonly(), flag, n
+
+
+def _ring_ready(ring, nbytes) -> bool:
+    """
+    True if the ring has the bytes of a callback, or all the frames of the source.
+    """
+    return ring.finished or ring.readable() >= nbytes
+
+
+class _Output:
+    """
+    Another device stream of the player process, fed with the source frames read for the main stream.
+
+    The source is read and decoded once, and each output converts the frames with its own Pipeline and gain.
+    The stream pulls the converted frames from a ring by a callback, at the pace of its own device.
+    """
+
+    def __init__(self, backend, device, source, quality, gain, buffer_ms, chunk, stats):
+        """
+        Args:
+            device (dict): The device information.
+            source: The WAV file source of the main stream.
+            chunk (int): The frames of the source read at a time.
+
+        Raises:
+            OSError: The device can't be opened.
+        """
+        channels, rate = stream_format(device, source.channels, source.rate, quality)
+        supported = functools.partial(backend.is_format_supported, device, channels, rate)
+        sample_width, is_float = stream_sample_format(device, source.sample_width, source.is_float, supported)
+        self.name = device['name']
+        self.stats = stats
+        self.pipeline = Pipeline(source.channels, source.rate, source.sample_width, channels, rate, quality or Quality.MEDIUM, sample_width, gain, source.is_float, is_float)
+        self.frame_size = channels * sample_width
+        self.pending = None          # converted frames which haven't fit in the ring
+        self.flushed = False         # the last frames of the source have been converted
+        self.started = False
+        self.stream = backend.open(device, channels, rate, sample_width, self._callback, is_float, self._ready)
+        # The ring takes the device buffer and a converted chunk more than buffer_ms, as the ring of the main stream.
+        latency = self.stream.get_output_latency()
+        frames = int(rate * (buffer_ms / 1000 + latency)) + -(-chunk * rate // source.rate) + chunk
+        self.ring = RingBuffer(frames * self.frame_size)
+        self.callback_buffer = memoryview(bytearray(self.ring.size))
+
+    def process(self, data):
+        """
+        Convert the frames read from the source and write them to the ring.
+        """
+        self.pending = memoryview(self.pipeline.process(data)).cast('B')
+        self.feed()
+
+    def flush(self):
+        """
+        Convert the frames kept in the pipeline after the last frame of the source.
+        """
+        if self.flushed:
+            return
+        self.flushed = True
+        self.pending = memoryview(self.pipeline.flush()).cast('B')
+        self.feed()
+
+    def feed(self) -> bool:
+        """
+        Write the frames which haven't fit in the ring.
+
+        Returns:
+            bool: True if the next frames of the source can be taken.
+        """
+        if self.pending:
+            n = self.ring.write(self.pending)
+            self.pending = self.pending[n:]
+        if self.pending:
+            return False
+        self.pending = None
+        if self.flushed and not self.ring.finished:
+            self.ring.finish()
+        return True
+
+    def is_playing(self) -> bool:
+        """
+        True until the stream has played the last frame of the ring.
+        """
+        return not self.ring.finished or self.stream.is_active()
+
+    def is_lost(self) -> bool:
+        """
+        True if the stream has stopped before the last frame, for example the device has been disconnected.
+        """
+        return self.started and not self.ring.finished and not self.stream.is_active()
+
+    def start(self):
+        self.stream.start_stream()
+        self.started = True
+
+    def abort(self):
+        self.stream.abort_stream()
+        self.started = False
+
+    def reset(self):
+        """
+        Discard the frames of the old position after the stream is aborted.
+        """
+        self.pipeline.reset()
+        self.ring.reset()
+        self.pending = None
+        self.flushed = False
+
+    def close(self):
+        try:
+            self.stream.abort_stream()
+            self.stream.close()
+        except OSError:
+            pass
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """
+        Stream callback, the same as _PlayerWorker._callback() without the position.
+        """
+        data, flag, _ = _pull_ring(self.ring, self.callback_buffer, frame_count, self.frame_size, status, self.stats)
+        return data, flag
+
+    def _ready(self, frame_count) -> bool:
+        return _ring_ready(self.ring, frame_count * self.frame_size)
+
+
+class _PlayerWorker:
     """
-    Play an audio file executed by a process.
+    Playback loop executed by the persistent player process.
+
+    The output backend (PortAudio by default) is initialized once when the process starts and kept until it quits,
+    so loading a new file only costs opening the file and the stream.
+    The stream takes the native sample format of the device, negotiated by stream_sample_format() with the backend,
+    so the conversion and the dither are done here instead of by the OS mixer.
+    The files of the queue are converted to the format of the open stream,
+    so they are played back to back on the same stream.
+    Files read to the end are kept in the PCM cache in the stream format, to replay them without reading the disk.
+    A file can be played on other devices at once, its frames are read once and converted for each _Output.
+    Overlapping files are played by a Mixer loaded as the source, the voices are added and removed while it plays.
+    Files are read ahead by a thread of ReadAheadReader, so a slow storage doesn't block the stream.
+    Underflows, the time of the writes and the fill of the ring are counted in the shared PlayerStats block.
+    Commands are received as (command, args) tuples from the command pipe,
+    and state transitions are sent as (PlayerEvent, info) tuples to the event pipe.
+    PAUSE and STOP are acknowledged on the command pipe after they take effect.
 
     ATTENTION:
         PyAudio (based on PortAudio) is not thread-safe.
         Also, Python is running under GIL.
-        If this function is running as a thread, it won't work correctly.
+        If this class is running as a thread with PortAudioBackend, it won't work correctly.
     """
 
-    # print('Start Process...') # _FOR_DEBUG_
-    wf = wave.open(wav_file, 'rb')
-    sw = wf.getsampwidth()
-    ch = wf.getnchannels()
-    fr = wf.getframerate()
-
-    p = pyaudio.PyAudio()
-    fmt = p.get_format_from_width(sw)
-
-    # Check the channel count
-    wav_channels = ch
-    device_channels = int(device['maxOutputChannels'])
-    output_channels = min(wav_channels, device_channels)
-
-    # Adjust the sampling rate regarding the channel count
-    fr = int(fr * wav_channels / output_channels)
-
-    stream = p.open(
-        format=fmt,
-        channels=output_channels,
-        rate=fr,
-        output=True,
-        output_device_index=device['index'],
-    )
-    
     chunk = 2 ** 10
-    data = wf.readframes(chunk)
-    stream_available = True
-    # print('Playing...') # _FOR_DEBUG_
-    while data:
+
+    def __init__(self, conn, events, playing, position, cache_stats, read_ahead_stats, stats, engine=Engine.BLOCKING, buffer_ms=100, quality=Quality.MEDIUM, stop_bound_ms=10, cache_bytes=0, read_ahead_ms=0, backend=None, gain=1.0):
+        self.conn = conn
+        self.events = events
+        self.playing = playing
+        self.position = position
+        self.read_ahead_stats = read_ahead_stats
+        self.read_ahead_ms = read_ahead_ms  # 0 to read the files on the main thread
+        self.stalled = False         # the read-ahead thread hasn't read the next data
+
+        # Telemetry
+        self.stats = stats
+        self.load_ns = 0             # when the source was loaded, 0 after its first frames are passed to the stream
+        self.primed = False          # frames have been written since the stream started (BLOCKING engine)
+        self.write_capacity = 0      # the write available of the empty stream (BLOCKING engine)
+        self.engine = engine
+        self.stream_engine = engine  # the engine of the loaded stream, CALLBACK if there are other outputs
+        self.buffer_ms = buffer_ms
+        self.quality = quality       # resampling quality, None to play at the rate of the file
+        self.player_gain = gain      # linear gain of the files
+        self.gain = gain             # linear gain of the loaded file and its queue
+        self.stop_bound_ms = stop_bound_ms
+        self.backend = backend or PortAudioBackend()
+        self.wf = None               # WAV file source
+        self.path = None
+        self.pipeline = None         # converts the frames of the file to the stream format
+        self.queue = collections.deque()  # paths of the files to play after the current one
+        self.next_track = None       # (path, WavReader, Pipeline, first data, cache key) opened ahead
+        self.outputs = []            # _Output of the other devices, fed with the frames of the same source
+        self.waiting_outputs = False # the other outputs haven't taken the last frames yet
+
+        # PCM cache
+        self.cache = PcmCache(cache_bytes, cache_stats)
+        self.out_formats = {}        # (path, device name, channels, native rate, mix format): the stream format of the file on the device
+        self.record_key = None       # cache key of the current file
+        self.recording = None        # the converted frames of the current file to keep in the cache
+        self.shared_ring = None      # PCM source written by another process
+        self.stream = None
+        self.paused = True
+        self.rewind = False          # the frames buffered for the device were discarded by PAUSE
+        self.channels = 0            # stream format
+        self.sample_width = 0
+        self.is_float = False
+        self.frame_size = 0          # bytes per frame
+        self.rate = 0
+
+        # Playback position
+        # tracks[0] is the source being heard, the others are already passed to the stream.
+        # (start output frame, source frame at the start, source rate, source frames or 0, path)
+        self.tracks = collections.deque()
+        self.produced = 0            # output frames passed to the stream or to the ring
+        self.out_frames = 0          # output frames passed to the stream
+        self.latency_frames = 0      # output frames buffered after the stream
+        self.changed = collections.deque()  # paths which have started to be heard, not reported yet
+
+        # BLOCKING engine
+        # A write blocks until the device has room for it, and commands are checked between writes.
+        # So the writes are limited to stop_bound_ms of frames.
+        self.write_frames = 0
+        self.pending = None          # the rest of the chunk read from the file, not written yet
+
+        # CALLBACK engine, or PCM source
+        self.ring = None             # drained by the stream
+        self.callback_buffer = None  # preallocated output buffer of the callback
+
+    def run(self):
+        # print('Start Process...') # _FOR_DEBUG_
+        self.backend.initialize()
         try:
-            event.wait()
+            while True:
+                if self.stream is None or self.paused:
+                    # Nothing to play, sleep until the next command
+                    command, args = self.conn.recv()
+                elif self.conn.poll(self._wait_time()):
+                    command, args = self.conn.recv()
+                elif self.stream_engine == Engine.CALLBACK:
+                    self._fill_ring()
+                    self._announce_track()
+                    self.stats.set(StatsField.CPU_NS, time.process_time_ns())
+                    continue
+                else:
+                    self._write_chunk()
+                    self._announce_track()
+                    self.stats.set(StatsField.CPU_NS, time.process_time_ns())
+                    continue
 
-            if play.value == Play.PLAY:
-                pass
-            elif play.value == Play.PAUSE:
-                # continue
-                pass
-            elif play.value == Play.STOP:
-                break
-            
-            stream.write(data)
-            data = wf.readframes(chunk)
+                if command == Command.QUIT:
+                    break
+                self._handle(command, args)
+        finally:
+            self._unload()
+            self.backend.terminate()
+        # print('Exit Process...') # _FOR_DEBUG_
+
+    def _handle(self, command, args):
+        if command == Command.LOAD:
+            device, wav_file, gain = args
+            self._close()
+            self._count_load()
+            self.gain = self.player_gain if gain is None else gain
+            self._load(device, wav_file)
+        elif command == Command.LOAD_MULTI:
+            outputs, wav_file = args
+            self._close()
+            self._count_load()
+            # The first output is the main stream
+            device, gain = outputs[0]
+            self.gain = self.player_gain if gain is None else gain
+            self._load(device, wav_file, outputs[1:])
+        elif command == Command.LOAD_MIX:
+            self._close()
+            self._count_load()
+            self._load_mix(args)
+        elif command == Command.ADD_VOICE:
+            voice, source, gain = args
+            self._add_voice(voice, source, self.player_gain if gain is None else gain)
+        elif command == Command.REMOVE_VOICE:
+            if isinstance(self.wf, Mixer) and self.wf.remove(args):
+                self._notify(PlayerEvent.VOICE_FINISHED, (args, ''))
+        elif command == Command.PLAY:
+            if self.stream is None:
+                return
+            # The stream is kept open while it is paused, it only needs to be started again.
+            if self.rewind:
+                # Play the frames discarded by the pause again, from the frame which was being heard.
+                self._seek(self.position[_Position.FRAME])
+                self.rewind = False
+            self._start_streams()
+            self.paused = False
+            self._notify(PlayerEvent.STARTED)
+        elif command == Command.PAUSE:
+            if self.stream and not self.paused:
+                # Silence the device now, instead of after its buffer is played.
+                # The discarded frames are read again by PLAY, not to skip them.
+                self.stream.abort_stream()
+                for output in self.outputs:
+                    output.abort()
+                self.paused = True
+                self.rewind = True
+                self._notify(PlayerEvent.PAUSED)
+        elif command == Command.LOAD_PCM:
+            device, name, channels, rate, sample_width = args
+            self._close()
+            self._count_load()
+            self._load_pcm(device, name, channels, rate, sample_width)
+        elif command == Command.SEEK:
+            self._seek(args)
+        elif command == Command.ENQUEUE:
+            # The other outputs are converted from the current file only, and a mix has no end
+            if self.wf and not self.outputs and not isinstance(self.wf, Mixer):
+                self.queue.append(args)
+                self._prepare_next()
+        elif command == Command.STOP:
+            self._unload(PlayerEvent.STOPPED)
+        elif command == Command.RESET:
+            # The device list of the backend can be fixed at initialization, as PortAudio.
+            # Re-initialize it to see devices added or removed since then.
+            self._unload(PlayerEvent.STOPPED)
+            self.backend.reset()
+
+        if command in (Command.PAUSE, Command.STOP):
+            # The caller is waiting for it, args is its token.
+            self.conn.send((command, args))
+
+    def _load(self, device, wav_file, outputs=()):
+        """
+        Args:
+            outputs: (device, gain) of the other devices to play the file on at once.
+        """
+        try:
+            # The stream format is known without reading the file, if it has been played on the device.
+            target = (wav_file, device['name'], int(device['maxOutputChannels']), native_rate(device), device.get('mixFormat'))
+            out_format = self.out_formats.get(target)
+            key = self._cache_key(wav_file, *out_format) if out_format else None
+            # The other outputs need the frames of the file, not the frames converted for the main stream.
+            cached = self.cache.get(key) if not outputs else None
+            if cached:
+                self.wf = cached
+                output_channels = cached.channels
+                fr = cached.rate
+                sw = cached.sample_width
+                out_float = cached.is_float
+            else:
+                self.wf = self._open_file(wav_file)
+                # Mixed down to the channels of the device, and converted to its native rate and sample format.
+                output_channels, fr = stream_format(device, self.wf.channels, self.wf.rate, self.quality)
+                supported = functools.partial(self.backend.is_format_supported, device, output_channels, fr)
+                sw, out_float = stream_sample_format(device, self.wf.sample_width, self.wf.is_float, supported)
+                self.out_formats[target] = (output_channels, fr, sw, out_float)
+                key = self._cache_key(wav_file, output_channels, fr, sw, out_float)
+            self.path = wav_file
+            # The cached frames are already converted with the gain.
+            self.pipeline = Pipeline(self.wf.channels, self.wf.rate, self.wf.sample_width, output_channels, fr, self.quality or Quality.MEDIUM, sw, 1.0 if cached else self.gain, self.wf.is_float, out_float)
+
+            # The other outputs are fed with the frames read for the ring, so they are as full as it.
+            self.stream_engine = Engine.CALLBACK if outputs else self.engine
+            self._open_stream(device, output_channels, fr, sw, out_float)
+            for output_device, gain in outputs:
+                self.outputs.append(_Output(self.backend, output_device, self.wf, self.quality, self.player_gain if gain is None else gain, self.buffer_ms, self.chunk, self.stats))
+            self._start_position(0, self.wf.rate, self.wf.frames, wav_file)
+            self._start_recording(None if outputs else key)
+        except (OSError, WavError) as e:
+            # The file can't be read or the device can't be opened
+            self._unload(PlayerEvent.ERROR, str(e))
+            return
+        self.paused = True
+        self.playing.value = Playing.PLAYING
+        # print('Loaded...') # _FOR_DEBUG_
+
+    def _load_mix(self, device):
+        """
+        Open the stream of a Mixer at the native rate of the device, the voices are added by ADD_VOICE.
+        """
+        try:
+            self.stream_engine = self.engine
+            channels, rate = stream_format(device, Mixer.CHANNELS, native_rate(device) or 48000, self.quality)
+            # The voices are summed in float32, the sum is converted to the native format of the device.
+            supported = functools.partial(self.backend.is_format_supported, device, channels, rate)
+            sw, is_float = stream_sample_format(device, 4, True, supported)
+            self.wf = Mixer(channels, rate, sw, self.quality, lambda voice: self._notify(PlayerEvent.VOICE_FINISHED, (voice, '')), is_float=is_float)
+            # The mix is already in the stream format
+            self.pipeline = Pipeline(channels, rate, sw, channels, rate, is_float=is_float, out_is_float=is_float)
+            self._open_stream(device, channels, rate, sw, is_float)
+            self._start_position(0, rate, 0, None)
+        except OSError as e:
+            # The device can't be opened
+            self._unload(PlayerEvent.ERROR, str(e))
+            return
+        self.paused = True
+        self.playing.value = Playing.PLAYING
+
+    def _add_voice(self, voice, source, gain):
+        """
+        Add a WAV file, or PCM frames given as (data, channels, rate, sample_width), to the mix.
+        """
+        if not isinstance(self.wf, Mixer):
+            self._notify(PlayerEvent.VOICE_FINISHED, (voice, 'No mix is loaded'))
+            return
+        try:
+            # The voices are short, they are read on demand instead of by a read-ahead thread each.
+            source = WavReader(source) if isinstance(source, str) else CachedPcm(*source)
+        except (OSError, WavError) as e:
+            self._notify(PlayerEvent.VOICE_FINISHED, (voice, str(e)))
+            return
+        try:
+            self.wf.add(voice, source, gain, self.chunk)
+        except ValueError as e:
+            source.close()
+            self._notify(PlayerEvent.VOICE_FINISHED, (voice, str(e)))
+
+    def _load_pcm(self, device, name, channels, rate, sample_width):
+        """
+        Load PCM frames written to the shared memory ring by another process.
+        """
+        try:
+            self.stream_engine = self.engine
+            self.shared_ring = SharedRingBuffer(name=name)
+            self.ring = self.shared_ring
+            self._open_stream(device, channels, rate, sample_width)
+            self._start_position(0, rate, 0, None)
+        except (OSError, ValueError) as e:
+            # The shared memory has gone or the device can't be opened
+            self._unload(PlayerEvent.ERROR, str(e))
+            return
+        self.paused = True
+        self.playing.value = Playing.PLAYING
+
+    def _open_stream(self, device, channels, rate, sample_width, is_float=False):
+        self.channels = channels
+        self.sample_width = sample_width
+        self.is_float = is_float
+        self.frame_size = sample_width * channels
+        self.rate = rate
+        self.write_capacity = 0
+        self.primed = False
+        self.write_frames = max(64, int(rate * self.stop_bound_ms / 1000))
+        if self.stream_engine == Engine.CALLBACK:
+            # Opened stopped, so the ring is made for the latency of the stream before the callback runs.
+            self.stream = self.backend.open(device, channels, rate, sample_width, self._callback, is_float, self._ready)
+            if self.shared_ring is None:
+                # The device takes its buffer from the ring when the stream starts,
+                # so the ring holds it more than buffer_ms, which decides the latency instead of the chunk size.
+                frames = max(self.chunk, int(rate * (self.buffer_ms / 1000 + self.stream.get_output_latency())))
+                self.ring = RingBuffer(frames * self.frame_size)
+            self.callback_buffer = memoryview(bytearray(self.ring.size))
+        else:
+            self.stream = self.backend.open(device, channels, rate, sample_width, is_float=is_float)
+        self.stats.set(StatsField.CAPACITY, self.ring.size if self.ring else 0)
+        self.stats.set(StatsField.FILL, 0)
+        self.latency_frames = int(self.stream.get_output_latency() * rate)
+
+    def _prepare_next(self):
+        """
+        Open the next file of the queue ahead and convert its first chunk,
+        so that it follows the last frame of the current file without a gap.
+        """
+        while self.next_track is None and self.queue:
+            path = self.queue.popleft()
+            try:
+                wf, pipeline, key = self._open_track(path)
+            except (OSError, WavError) as e:
+                # Skip it, and try the next one
+                self._notify(PlayerEvent.ERROR, str(e))
+                continue
+            # Copied, so the pages of the file are read now, not when it is played.
+            data = wf.read(self.chunk)
+            data = bytes(pipeline.process(data)) if data else b''
+            self.next_track = (path, wf, pipeline, data, key)
+
+    def _open_track(self, path):
+        """
+        Open a file to play in the stream format of the loaded one, from the cache if it has been converted.
+
+        Returns:
+            tuple: (WavReader or CachedPcm, Pipeline, cache key)
+
+        Raises:
+            OSError: The file can't be read.
+            WavError: The file isn't a supported WAV file.
+        """
+        key = self._cache_key(path, self.channels, self.rate, self.sample_width, self.is_float)
+        wf = self.cache.get(key)
+        if wf is None:
+            wf = self._open_file(path, current=False)
+        gain = 1.0 if isinstance(wf, CachedPcm) else self.gain
+        pipeline = Pipeline(wf.channels, wf.rate, wf.sample_width, self.channels, self.rate, self.quality or Quality.MEDIUM, self.sample_width, gain, wf.is_float, self.is_float)
+        return wf, pipeline, key
+
+    def _rewind_to_heard(self):
+        """
+        Make the file being heard the current one again, when the next files are already being read.
+
+        The files after it are put back in the queue, and opened ahead again after the seek.
+
+        Raises:
+            OSError: The file can't be read.
+            WavError: The file isn't a supported WAV file.
+        """
+        path = self.tracks[0][4]
+        wf, pipeline, _ = self._open_track(path)
+        following = [track[4] for track in list(self.tracks)[1:]]
+        if self.next_track:
+            following.append(self.next_track[0])
+            self.next_track[1].close()
+        self.next_track = None
+        self.queue.extendleft(reversed(following))
+        self.wf.close()
+        self.wf = wf
+        self.path = path
+        self.pipeline = pipeline
+        if isinstance(wf, ReadAheadReader):
+            wf.report_to(self.read_ahead_stats)
+
+    def _switch_track(self):
+        """
+        Continue with the file opened by _prepare_next().
+
+        Returns:
+            The first chunk of the file in the stream format.
+        """
+        path, wf, pipeline, data, key = self.next_track
+        self.next_track = None
+        self.wf.close()
+        self.wf = wf
+        self.path = path
+        self.pipeline = pipeline
+        if isinstance(wf, ReadAheadReader):
+            wf.report_to(self.read_ahead_stats)
+        # The new file starts to be heard after the frames passed to the stream so far.
+        self.tracks.append((self.produced, 0, wf.rate, wf.frames, path))
+        self._start_recording(key)
+        self._prepare_next()
+        return data
+
+    def _open_file(self, path, current=True):
+        """
+        Open a WAV file, with a read-ahead thread if it is enabled.
+
+        Args:
+            current (bool): False for a file opened ahead, it doesn't report to the shared stats until it is played.
+        """
+        wf = WavReader(path)
+        if not self.read_ahead_ms:
+            return wf
+        try:
+            # A file opened ahead doesn't wait for its first block, not to block the stream of the current one.
+            return ReadAheadReader(wf, self.read_ahead_ms / 1000, self.read_ahead_stats if current else None, wait=current)
+        except OSError:
+            wf.close()
+            raise
+
+    def _cache_key(self, path, channels, rate, sample_width, is_float):
+        """
+        Return the key of the file converted to the stream format, or None if the file can't be found.
+
+        The modification time is a part of the key, so the frames of an overwritten file are not used.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size, channels, rate, sample_width, is_float, self.quality, self.gain)
+
+    def _start_recording(self, key):
+        """
+        Keep the converted frames of the current file until its end, to put them in the cache.
+        """
+        self.record_key = None
+        self.recording = None
+        if key is None or isinstance(self.wf, CachedPcm):
+            return
+        if self.cache.accepts(self.wf.frames * self.rate // self.wf.rate * self.frame_size):
+            self.record_key = key
+            self.recording = bytearray()
+
+    def _record(self, data):
+        if self.recording is None:
+            return
+        self.recording += data
+        if not self.cache.accepts(len(self.recording)):
+            self.recording = None
+
+    def _keep_in_cache(self):
+        """
+        Put the frames of the file read to the end in the cache.
+        """
+        if self.recording is None:
+            return
+        self.cache.put(self.record_key, self.recording, self.channels, self.rate, self.sample_width, self.is_float)
+        self.recording = None
+
+    def _start_position(self, frame, source_rate, source_frames, path):
+        """
+        Restart the position of a source from the frame, after loading or seeking.
+        """
+        self.tracks.clear()
+        self.tracks.append((0, frame, source_rate, source_frames, path))
+        self.produced = 0
+        self.out_frames = 0
+        self._publish_position()
+
+    def _seek(self, frame):
+        """
+        Move the playhead to the frame of the file being heard.
+
+        The offset in the data chunk is calculated from the frame, nothing is decoded from the start.
+        """
+        if self.wf is None or isinstance(self.wf, Mixer):
+            return
+        # The frame is in the file of tracks[0], whose rate converts the seconds of AudioPlayer.seek().
+        # After it has been read to the end, self.wf is already the next file.
+        self._publish_position()
+        if len(self.tracks) > 1:
+            try:
+                self._rewind_to_heard()
+            except (OSError, WavError) as e:
+                self._notify(PlayerEvent.ERROR, str(e))
+                return
+        # Discard the frames of the old position buffered in the device.
+        # The callback doesn't run after it, so the ring can be reset.
+        self.stream.abort_stream()
+        for output in self.outputs:
+            output.abort()
+            output.reset()
+        self.wf.seek(frame)
+        self.pipeline.reset()
+        self.pending = None
+        self.waiting_outputs = False
+        # The frames are not continuous anymore
+        self.recording = None
+        if self.ring:
+            self.ring.reset()
+        self._start_position(self.wf.tell(), self.wf.rate, self.wf.frames, self.path)
+        self._prepare_next()
+        self.rewind = False
+        if not self.paused:
+            self._start_streams()
+
+    def _start_streams(self):
+        """
+        Start the stream and the other outputs, after their buffers are filled.
+        """
+        if self.stream_engine == Engine.CALLBACK and not self.ring.finished:
+            # A finished ring already has the last frame, and the stopped stream would be taken as completed.
+            self._fill_ring()
+        self.stream.start_stream()
+        for output in self.outputs:
+            output.start()
+        self.primed = False
+
+    def _publish_position(self):
+        """
+        Publish the frame of the source which is being heard, behind the written frames by the output latency.
+        """
+        played = max(0, self.out_frames - self.latency_frames)
+        while len(self.tracks) > 1 and self.tracks[1][0] <= played:
+            self.tracks.popleft()
+            self.changed.append(self.tracks[0][4])
+        start, base, source_rate, source_frames, _ = self.tracks[0]
+        frame = base + (played - start) * source_rate // self.rate
+        if source_frames:
+            frame = min(frame, source_frames)
+        self.position[_Position.FRAME] = frame
+        self.position[_Position.RATE] = source_rate
+        self.position[_Position.FRAMES] = source_frames
+
+    def _announce_track(self):
+        """
+        Report the file which has started to be heard.
+
+        The position is updated in the callback, but the event is sent from the main thread.
+        """
+        while self.changed:
+            self._notify(PlayerEvent.TRACK_CHANGED, self.changed.popleft())
+
+    def _write_chunk(self):
+        limit = self.write_frames * self.frame_size
+        if self.wf:
+            if not self.pending:
+                data = self._read_file()
+                if data is None:
+                    # Wait for the read-ahead thread
+                    return
+                self.pending = memoryview(data).cast('B')
+            data = self.pending[:limit]
+            self.pending = self.pending[limit:]
+            finished = not data
+        else:
+            # Write the shared memory directly to the stream
+            finished = self.ring.finished
+            readable = self.ring.readable()
+            data = self.ring.peek(min(limit, readable - readable % self.frame_size))
+            if not data and not finished:
+                # Wait for the producer
+                return
+        if finished and not data:
+            # print('Finished Playing...') # _FOR_DEBUG_
+            self._unload(PlayerEvent.FINISHED)
+            return
+        try:
+            available = self.stream.get_write_available()
+            if not self.primed:
+                # Nothing is buffered after the stream is started, it is the size of the buffer.
+                self.write_capacity = max(self.write_capacity, available)
+                self.primed = True
+            elif self.write_capacity and available >= self.write_capacity:
+                # The device has played all the frames written before
+                self.stats.add(StatsField.UNDERFLOWS)
+            start = time.perf_counter_ns()
+            self.stream.write(data)
+            self._count_write(start)
         except OSError as e:
             # stream can't be used anymore
             # possibly, the device is disconnected before finish playing
-            stream_available = False
-            break
+            self.stats.add(StatsField.STREAM_ERRORS)
+            self.stream = None
+            self._unload(PlayerEvent.DEVICE_LOST, str(e))
+            return
+        if self.wf is None:
+            self.ring.consume(len(data))
+            self.stats.set(StatsField.FILL, self.ring.readable())
+        self.out_frames += len(data) // self.frame_size
+        self.produced = self.out_frames
+        self._publish_position()
+        data.release()
+
+    def _read_file(self):
+        """
+        Read the next chunk of the file in the stream format.
+
+        An empty data is returned after the last frame,
+        and None if the read-ahead thread hasn't read the next frames yet.
+        """
+        while True:
+            if not self._feed_outputs():
+                # The source frames are shared, wait until the other outputs take the last ones.
+                self.waiting_outputs = True
+                return None
+            self.waiting_outputs = False
+            data = self.wf.read(self.chunk)
+            if data is None:
+                if not self.stalled:
+                    # print('Stalled...') # _FOR_DEBUG_
+                    self.stalled = True
+                    self._notify(PlayerEvent.STALLED, self.path)
+                return None
+            self.stalled = False
+            if not data:
+                for output in self.outputs:
+                    output.flush()
+                data = self.pipeline.flush()
+                if not data:
+                    # All the frames of the file have been read
+                    self._keep_in_cache()
+                    if self.next_track is None:
+                        return data
+                    # Continue with the next file at the frame after the last one
+                    data = self._switch_track()
+            else:
+                for output in self.outputs:
+                    output.process(data)
+                data = self.pipeline.process(data)
+            if data:
+                self._record(data)
+                return data
+
+    def _wait_time(self):
+        """
+        Return the time to wait for a command before the next processing.
+        """
+        if self.stream_engine == Engine.CALLBACK:
+            if self.wf is None or self.stalled or self.waiting_outputs or self.ring.finished or self.ring.writable() < self.chunk * self.frame_size:
+                # Nothing to read, wait until the callback consumes a quarter of the ring.
+                return self.buffer_ms / 4000
+        elif self.stalled or (self.wf is None and self.ring.readable() < self.frame_size):
+            # Wait for the producer
+            return self.chunk / self.rate / 4
+        return 0
+
+    def _fill_ring(self):
+        """
+        Read the file ahead of the playhead until the ring is full. (CALLBACK engine)
+        """
+        if self.ring.finished:
+            if not self.stream.is_active() and not self._outputs_playing():
+                # The callback has played the last frame.
+                # print('Finished Playing...') # _FOR_DEBUG_
+                self._unload(PlayerEvent.FINISHED)
+            return
+        if self.wf is None:
+            # The ring is filled by the producer of the shared memory
+            return
+
+        while self.ring.writable() >= self.chunk * self.frame_size:
+            if not self.pending:
+                data = self._read_file()
+                if data is None:
+                    # Wait for the read-ahead thread
+                    return
+                if not data:
+                    self.ring.finish()
+                    return
+                self.pending = memoryview(data).cast('B')
+            # A converted chunk can be larger than the space, the rest is written next time.
+            n = self.ring.write(self.pending)
+            self.pending = self.pending[n:]
+            self.produced += n // self.frame_size
+        self.stats.set(StatsField.FILL, self.ring.readable())
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """
+        Stream callback. (CALLBACK engine)
+
+        It runs on the thread of the backend, like the PortAudio thread, so it only copies from the ring and never reads the file.
+        """
+        start = time.perf_counter_ns()
+        data, flag, n = _pull_ring(self.ring, self.callback_buffer, frame_count, self.frame_size, status, self.stats)
+        self.out_frames += n // self.frame_size
+        self._publish_position()
+        if n:
+            self._count_write(start)
+        return data, flag
+
+    def _ready(self, frame_count) -> bool:
+        """
+        True if the callback has the frames to return, for the streams which can wait for them. (CALLBACK engine)
+        """
+        return _ring_ready(self.ring, frame_count * self.frame_size)
+
+    def _feed_outputs(self) -> bool:
+        """
+        Write the pending frames of the other outputs, and drop the outputs whose streams have failed.
+
+        Returns:
+            bool: True if all the outputs can take the next frames of the source.
+        """
+        ready = True
+        for output in list(self.outputs):
+            if output.is_lost():
+                # The device has gone, the others continue without it.
+                output.close()
+                self.outputs.remove(output)
+                self._notify(PlayerEvent.OUTPUT_LOST, output.name)
+                continue
+            ready = output.feed() and ready
+        return ready
 
-    # print('Finished Playing...') # _FOR_DEBUG_
+    def _outputs_playing(self) -> bool:
+        self._feed_outputs()
+        return any(output.is_playing() for output in self.outputs)
 
-    playing.value = Playing.FINISH
+    def _count_load(self):
+        self.load_ns = time.perf_counter_ns()
+        self.stats.add(StatsField.LOADS)
 
-    if stream_available:
-        stream.stop_stream()
-        stream.close()
-    p.terminate()
+    def _count_write(self, start):
+        """
+        Count a write or a callback which has started at start in perf_counter_ns().
+        """
+        end = time.perf_counter_ns()
+        self.stats.record_write(end - start)
+        if self.load_ns:
+            # The first frames of the source
+            self.stats.set(StatsField.FIRST_SAMPLE_NS, end - self.load_ns)
+            self.load_ns = 0
+
+    def _unload(self, event=None, info=None):
+        loaded = self.stream is not None
+        if event == PlayerEvent.FINISHED:
+            # The buffered frames are played before the stream is closed, so the last file is heard.
+            self.out_frames += self.latency_frames
+            self._publish_position()
+            self._announce_track()
+        # Only the end of the file lets the device play its buffer, the others cut it off.
+        self._close(drain=(event == PlayerEvent.FINISHED))
+        self.playing.value = Playing.FINISH
+        # Nothing is reported if nothing was loaded, for example STOP after the end.
+        if event is not None and (loaded or event == PlayerEvent.ERROR):
+            self._notify(event, info)
+
+    def _notify(self, event, info=None):
+        try:
+            self.events.send((event, info))
+        except OSError:
+            # The parent has closed the event pipe
+            pass
 
-    # print('Exit Playing...') # _FOR_DEBUG_
+    def _close(self, drain=False):
+        if self.stream:
+            try:
+                if drain:
+                    self.stream.stop_stream()
+                else:
+                    self.stream.abort_stream()
+                self.stream.close()
+            except OSError:
+                pass
+        self.stream = None
+        for output in self.outputs:
+            output.close()
+        self.outputs = []
+        self.waiting_outputs = False
+        self.pending = None
+        self.stalled = False
+        if self.wf:
+            self.wf.close()
+        self.wf = None
+        self.path = None
+        self.pipeline = None
+        if self.next_track:
+            self.next_track[1].close()
+        self.next_track = None
+        self.queue.clear()
+        self.tracks.clear()
+        self.recording = None
+        self.changed.clear()
+        if self.shared_ring:
+            self.shared_ring.close()
+        self.shared_ring = None
+        self.ring = None
+        self.paused = True
+        self.rewind = False
+        for i in range(len(self.position)):
+            self.position[i] = 0
+
+
+def _player_process(conn, events, playing, position, cache_stats, read_ahead_stats, stats_name, engine, buffer_ms, quality, stop_bound_ms, cache_bytes, read_ahead_ms, backend, gain):
+    """
+    Entry point of the persistent player process.
+    """
+    stats = PlayerStats(stats_name)
+    try:
+        _PlayerWorker(conn, events, playing, position, cache_stats, read_ahead_stats, stats, engine, buffer_ms, quality, stop_bound_ms, cache_bytes, read_ahead_ms, backend, gain).run()
+    finally:
+        stats.close()
 
 
 class AudioPlayer:
-    def __init__(self):
-        self.play = multiprocessing.Value('i', Play.STOP)
+    # Seconds to wait for the player process to acknowledge PAUSE or STOP
+    ACK_TIMEOUT = 1.0
+
+    def __init__(self, engine=Engine.BLOCKING, buffer_ms=100, quality=Quality.MEDIUM, stop_bound_ms=10, cache_bytes=64 * 1024 * 1024, read_ahead_ms=2000, stats_name=None, event_callback=None, backend=None, gain=1.0):
+        """
+        Args:
+            engine (int): Engine.BLOCKING or Engine.CALLBACK.
+            buffer_ms (int): The length of the ring buffer of the CALLBACK engine in milliseconds.
+            quality (str): Quality.FAST, MEDIUM or BEST to convert files to the default rate of the device.
+                None to play files at their own rate.
+            stop_bound_ms (int): The bound of the time to pause or stop in milliseconds.
+                The BLOCKING engine writes the stream in blocks of this length.
+            cache_bytes (int): The budget of the cache of the frames converted for the device, 0 to disable it.
+                The files read to the end are replayed from the cache of the player process.
+            read_ahead_ms (int): The length of the audio read ahead of the playhead by a thread, 0 to read on demand.
+            stats_name (str): The name of the shared memory block of the telemetry, generated if None.
+                Other processes can read it with player_stats.PlayerStats(stats_name).
+            event_callback: Called as event_callback(event, info) with a PlayerEvent when the state of the player changes.
+                It is called from the listener thread, not from the thread which created the player.
+            backend (OutputBackend): The output of the frames, PortAudioBackend if None.
+                NullBackend or WavFileBackend plays without a device, faster than real time.
+            gain (float): The linear gain applied to the files, before the conversion to the sample width.
+                offline_render.render() with the same settings produces the same frames.
+        """
+
         self.playing = multiprocessing.Value('i', Playing.FINISH)
-        self.play_process = None
-        self.event = multiprocessing.Event()
+        # Written by the player process while it plays, read without a round trip.
+        self.position = multiprocessing.RawArray('q', 3)
+        # Counters of the PCM cache in the player process
+        self.cache_counters = multiprocessing.RawArray('q', CacheStats.SIZE)
+        # Buffer of the read-ahead thread in the player process
+        self.read_ahead_counters = multiprocessing.RawArray('q', ReadAheadStats.SIZE)
+        # Telemetry of the player process, attachable by its name
+        self.stats = PlayerStats(stats_name, create=True)
+        self.loaded = False
+        self.mixing = False   # a Mixer is loaded by play_overlay()
+        self.voice_count = 0  # the last voice id
+        self.pcm_ring = None  # shared memory ring of play_pcm()
+        self.backend = backend or PortAudioBackend()
+        self.event_callback = event_callback
+        self.ack_token = 0
+        self.closing = False  # close() has been called
+        self.exited = False   # the player process has exited, by close() or not
+        # Recent latencies in seconds, from sending PAUSE or STOP to its acknowledgement
+        self.pause_latencies = collections.deque(maxlen=1000)
+        self.stop_latencies = collections.deque(maxlen=1000)
+
+        # The player process is started here and kept until close(),
+        # so that pressing Play doesn't pay for a new interpreter and the initialization of the backend.
+        self.conn, worker_conn = multiprocessing.Pipe()
+        self.event_conn, worker_event_conn = multiprocessing.Pipe(duplex=False)
+        # Commands can be sent from the Tk thread and from Core Audio callbacks.
+        self.conn_lock = threading.Lock()
+        self.play_process = multiprocessing.Process(target=_player_process, args=(worker_conn, worker_event_conn, self.playing, self.position, self.cache_counters, self.read_ahead_counters, self.stats.name, engine, buffer_ms, quality, stop_bound_ms, cache_bytes, read_ahead_ms, self.backend, gain), daemon=True)
+        self.play_process.start()
+        # Keep only the ends of this process, so that the listener sees EOF when the player process exits.
+        worker_conn.close()
+        worker_event_conn.close()
 
-    def play_audio(self, device_name, wav_file):
+        # The listener sleeps in recv() until the player process sends an event, nothing is polled.
+        self.listener = threading.Thread(target=self._listen, daemon=True)
+        self.listener.start()
+
+    def play_audio(self, device_name, wav_file, queue=(), gain=None):
         """
         Play an audio file.
-        
+
         Args:
             device_name (str): The friendly name of the audio device.
             wav_file (str): The path of the WAV file.
+            queue: The paths of the WAV files to play after it without a gap.
+                They are queued before the playback starts, see also enqueue().
+            gain (float): The linear gain of the file and its queue, the gain of the player if None.
         """
 
-        if self.play_process is None:
-            # Playing process is not started.
+        if not self.loaded:
+            # No file is loaded in the player process.
             device = self._get_device(device_name)
             if device is None:
                 # print('Device not found.')
                 return
 
-            self.play.value = Play.PLAY
             self.playing.value = Playing.PLAYING
-            self.event.set()
-            self.play_process = multiprocessing.Process(target=_play_audio, args=(device, wav_file, self.play, self.playing, self.event))
-            self.play_process.start()
+            self.loaded = True
+            self._send(Command.LOAD, (device, wav_file, gain))
+            for path in queue:
+                self._send(Command.ENQUEUE, path)
+            self._send(Command.PLAY)
         else:
             # PAUSE
-            self.play.value = Play.PLAY
-            self.event.set()
+            self._send(Command.PLAY)
+
+    def play_multi(self, outputs, wav_file):
+        """
+        Play an audio file on several devices at once.
+
+        The file is read and decoded once by the player process, and the frames are converted for each device with its gain.
+        The first output is the main stream, the position and the events are of it.
+        All the streams are fed by callbacks from rings of buffer_ms, as the CALLBACK engine, whatever the engine of the player.
+        OUTPUT_LOST is reported if one of the others fails, and the rest continue.
+        The file isn't replayed from the PCM cache, and files can't be queued.
+
+        Args:
+            outputs: (device_name, gain) of the devices, gain is the gain of the player if None.
+            wav_file (str): The path of the WAV file.
+        """
+
+        if self.loaded:
+            # PAUSE
+            self._send(Command.PLAY)
+            return
+        devices = []
+        for device_name, gain in outputs:
+            device = self._get_device(device_name)
+            if device is None:
+                # print('Device not found.')
+                return
+            devices.append((device, gain))
+        if not devices:
+            return
+
+        self.playing.value = Playing.PLAYING
+        self.loaded = True
+        self._send(Command.LOAD_MULTI, (devices, wav_file))
+        self._send(Command.PLAY)
+
+    def play_overlay(self, device_name, wav_file, gain=None):
+        """
+        Play an audio file over the ones already played by play_overlay().
+
+        The first call loads a Mixer on the device, and the files are mixed into its stream until stop_audio().
+        The later calls add voices to it, whatever the device name is.
+        VOICE_FINISHED is reported with the voice id when the last frame of the file has been mixed,
+        it is heard after the output latency.
+
+        Args:
+            device_name (str): The friendly name of the audio device.
+            wav_file (str): The path of the WAV file.
+            gain (float): The linear gain of the voice, the gain of the player if None.
+
+        Returns:
+            int: The voice id, or None if the device isn't found or a file is played by play_audio().
+        """
+        return self._add_voice(device_name, wav_file, gain)
+
+    def play_overlay_pcm(self, device_name, data, channels, rate, sample_width, gain=None):
+        """
+        Play PCM frames over the files played by play_overlay(), the same as play_overlay().
+
+        The frames are sent to the player process through the command pipe, so they should be short, like a sound effect.
+        """
+        return self._add_voice(device_name, (bytes(data), channels, rate, sample_width), gain)
+
+    def stop_voice(self, voice_id):
+        """
+        Stop a voice of play_overlay() at the next block, VOICE_FINISHED is reported if it was mixed.
+        """
+        if self.mixing:
+            self._send(Command.REMOVE_VOICE, voice_id)
+
+    def _add_voice(self, device_name, source, gain):
+        if not self.loaded:
+            device = self._get_device(device_name)
+            if device is None:
+                # print('Device not found.')
+                return None
+            self.playing.value = Playing.PLAYING
+            self.loaded = True
+            self.mixing = True
+            self._send(Command.LOAD_MIX, device)
+            # Added before the stream is filled, the first voice starts with it.
+            self.voice_count += 1
+            self._send(Command.ADD_VOICE, (self.voice_count, source, gain))
+            self._send(Command.PLAY)
+            return self.voice_count
+        if not self.mixing:
+            return None
+        self.voice_count += 1
+        self._send(Command.ADD_VOICE, (self.voice_count, source, gain))
+        return self.voice_count
+
+    def play_pcm(self, device_name, channels, rate, sample_width, buffer_ms=1000):
+        """
+        Play PCM frames written to a shared memory ring.
+
+        The caller writes interleaved frames with write() of the returned ring and calls finish() after the last frame.
+        The player process reads the frames directly from the shared memory, so they are neither pickled nor read from a file.
+
+        Args:
+            device_name (str): The friendly name of the audio device.
+            channels (int): The channel count of the frames.
+            rate (int): The sampling rate of the frames.
+            sample_width (int): The bytes per sample.
+            buffer_ms (int): The capacity of the ring in milliseconds.
+
+        Returns:
+            SharedRingBuffer: The ring to write the frames, or None if it can't be played.
+        """
+
+        if self.loaded:
+            return None
+        device = self._get_device(device_name)
+        if device is None:
+            return None
+
+        frame_size = channels * sample_width
+        frames = max(1024, int(rate * buffer_ms / 1000))
+        self.pcm_ring = SharedRingBuffer(frames * frame_size)
+
+        self.playing.value = Playing.PLAYING
+        self.loaded = True
+        self._send(Command.LOAD_PCM, (device, self.pcm_ring.name, channels, rate, sample_width))
+        self._send(Command.PLAY)
+        return self.pcm_ring
 
     def pause_audio(self):
-        self.play.value = Play.PAUSE
-        self.event.clear()
+        latency = self._request(Command.PAUSE)
+        if latency is not None:
+            self.pause_latencies.append(latency)
 
     def stop_audio(self):
-        self.play.value = Play.STOP
-        self.event.set()
-        while self.is_playing:
-            time.sleep(0.1)
-        self.play_process = None
+        # The player process has closed the stream when it is acknowledged.
+        latency = self._request(Command.STOP)
+        if latency is not None:
+            self.stop_latencies.append(latency)
+        self.loaded = False
+        self.mixing = False
+        self._release_pcm()
+
+    def enqueue(self, wav_file) -> bool:
+        """
+        Play a file after the current one and the files queued before it, without a gap.
+
+        The file is converted to the format of the stream opened for the first file.
+        TRACK_CHANGED is reported when it starts to be heard.
+        A file queued after the last frame of the current one has been read is too late, FINISHED is reported instead.
+
+        Returns:
+            bool: False if nothing is loaded. Use play_audio() for the first file.
+        """
+        if not self.loaded:
+            return False
+        self._send(Command.ENQUEUE, wav_file)
+        return True
+
+    def seek(self, seconds=None, frames=None):
+        """
+        Move the playhead of the loaded file.
+
+        Args:
+            seconds (float): The position in seconds.
+            frames (int): The position in frames of the file. It is used instead of seconds if given.
+        """
+        if not self.loaded:
+            return
+        if frames is None:
+            if seconds is None:
+                return
+            frames = int(seconds * self.position[_Position.RATE])
+        self._send(Command.SEEK, max(0, frames))
+
+    @property
+    def position_frames(self) -> int:
+        """
+        The frame of the file which is being heard, corrected by the output latency of the stream.
+        """
+        return self.position[_Position.FRAME]
+
+    @property
+    def position_seconds(self) -> float:
+        rate = self.position[_Position.RATE]
+        return self.position[_Position.FRAME] / rate if rate else 0.0
+
+    @property
+    def duration_seconds(self) -> float:
+        """
+        The length of the loaded file, 0 if it is unknown.
+        """
+        rate = self.position[_Position.RATE]
+        return self.position[_Position.FRAMES] / rate if rate else 0.0
+
+    @property
+    def stats_name(self) -> str:
+        return self.stats.name
+
+    def player_stats(self) -> dict:
+        """
+        Return the telemetry of the player process, see PlayerStats.snapshot().
+        """
+        return self.stats.snapshot()
+
+    def cache_stats(self) -> dict:
+        """
+        Return the counters of the PCM cache of the player process.
+
+        Returns:
+            dict: hits, misses, evictions, and bytes and entries held now.
+        """
+        return {
+            'hits':      self.cache_counters[CacheStats.HITS],
+            'misses':    self.cache_counters[CacheStats.MISSES],
+            'evictions': self.cache_counters[CacheStats.EVICTIONS],
+            'bytes':     self.cache_counters[CacheStats.BYTES],
+            'entries':   self.cache_counters[CacheStats.ENTRIES],
+        }
+
+    def read_ahead_stats(self) -> dict:
+        """
+        Return the buffer state of the read-ahead thread of the player process.
+
+        Returns:
+            dict: fill_bytes and capacity_bytes of the buffer of the current file, and stalls in total.
+        """
+        return {
+            'fill_bytes':     self.read_ahead_counters[ReadAheadStats.FILL],
+            'capacity_bytes': self.read_ahead_counters[ReadAheadStats.CAPACITY],
+            'stalls':         self.read_ahead_counters[ReadAheadStats.STALLS],
+        }
+
+    def pause_latency_percentiles(self, percentiles=(50, 90, 99)) -> dict:
+        """
+        Return the percentiles of the recent pause latencies.
+
+        Returns:
+            dict: {percentile: milliseconds}, empty if it has never been paused.
+        """
+        return _percentiles([latency * 1000 for latency in self.pause_latencies], percentiles)
+
+    def stop_latency_percentiles(self, percentiles=(50, 90, 99)) -> dict:
+        """
+        Return the percentiles of the recent stop latencies.
+
+        Returns:
+            dict: {percentile: milliseconds}, empty if it has never been stopped.
+        """
+        return _percentiles([latency * 1000 for latency in self.stop_latencies], percentiles)
 
     def audio_finished(self):
-        # If the audio is finished naturally, the process is finished but the instance variable is not cleared.
+        # If the audio is finished naturally, the file is unloaded by the player process but the instance variable is not cleared.
         # In this case, this method is needed to be called just to clear the variable.
+        self.loaded = False
+        self.mixing = False
+        self._release_pcm()
+
+    def reset_devices(self):
+        """
+        Let the player process re-initialize the backend to see the current device list,
+        and discard the device cache.
+
+        It should be called when an audio device is added or removed.
+        """
+        self.backend.invalidate()
+        self._send(Command.RESET)
+        self.loaded = False
+        self.mixing = False
+        self._release_pcm()
+
+    def close(self):
+        """
+        Quit the player process.
+        """
+        if self.play_process is None:
+            return
+        self.closing = True
+        self._send(Command.QUIT)
+        self.play_process.join(timeout=5)
+        if self.play_process.is_alive():
+            self.play_process.terminate()
         self.play_process = None
-        self.event.set()
+        self.conn.close()
+        self._release_pcm()
+        self.stats.close()
+        # The listener exits at the EOF of the event pipe.
+        # It isn't joined, because event_callback can be waiting for the thread which calls close().
+
+    def _listen(self):
+        """
+        Receive the events of the player process and pass them to event_callback. (Listener thread)
+        """
+        while True:
+            try:
+                event, info = self.event_conn.recv()
+            except (EOFError, OSError):
+                # The player process has exited
+                break
+            if self.event_callback:
+                self.event_callback(event, info)
+        self.event_conn.close()
+        self.exited = True
+        if not self.closing:
+            # Killed or crashed, the file being played won't report its end.
+            self.playing.value = Playing.FINISH
+            if self.event_callback:
+                self.event_callback(PlayerEvent.ERROR, 'The player process has exited')
 
     @property
     def is_playing(self):
         return self.playing.value == Playing.PLAYING
 
-    def _get_device(self, device_friendly_name):
-        """
-        Return the PyAudio object regarding the device friendly name.
-        """
+    def _release_pcm(self):
+        if self.pcm_ring:
+            self.pcm_ring.close()
+        self.pcm_ring = None
 
-        p = pyaudio.PyAudio()
-        host_api_count = p.get_host_api_count()
-        for i in range(host_api_count):
-            host_api = p.get_host_api_info_by_index(i)
-            if host_api['name'] == 'MME':
-                device_count = int(host_api['deviceCount'])
-                for j in range(device_count):
-                    device = p.get_device_info_by_host_api_device_index(i, j)
-                    if int(device['maxOutputChannels']) > 0:
-                        name = str(device['name'])
-                        if name == device_friendly_name[:len(name)]:
-                            p.terminate()
-                            return device
-        p.terminate()
-        return None
+    def _send(self, command, args=None):
+        if self.play_process is None:
+            return
+        with self.conn_lock:
+            try:
+                self.conn.send((command, args))
+            except OSError:
+                # The player process has exited, the listener reports it.
+                pass
 
+    def _request(self, command):
+        """
+        Send a command and wait until the player process acknowledges it.
 
+        Returns:
+            float: The seconds until it is acknowledged, or None if it timed out or the player process has exited.
+        """
+        if self.play_process is None:
+            return None
+        with self.conn_lock:
+            self.ack_token += 1
+            start = time.perf_counter()
+            deadline = start + self.ACK_TIMEOUT
+            try:
+                self.conn.send((command, self.ack_token))
+                while True:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0 or not self.conn.poll(timeout):
+                        # print('No acknowledgement...') # _FOR_DEBUG_
+                        return None
+                    # An acknowledgement which came after its request timed out is skipped.
+                    if self.conn.recv() == (command, self.ack_token):
+                        return time.perf_counter() - start
+            except (EOFError, OSError):
+                # The player process has exited
+                return None
+
+    def _get_device(self, device_friendly_name):
+        """
+        Return the device information of the backend regarding the device friendly name.
+        """
+        return self.backend.get_device(device_friendly_name)
@@ -0,0 +1,55 @@
+"""
+Measure the cost of the channel mixing stage of the player.
+
+Each case converts one minute of noise block by block through Pipeline
+(decode, mix, encode) and reports the share of one core needed for real-time playback.
+
+Usage:
+    python benchmarks/bench_channel_mixer.py [--block FRAMES]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import Pipeline
+
+# (input channels, output channels, rate, sample width)
+CASES = (
+    (2, 1, 48000, 2),
+    (6, 2, 48000, 2),
+    (6, 2, 96000, 3),
+    (8, 2, 192000, 3),
+    (16, 2, 192000, 4),
+)
+
+
+def measure(in_channels, out_channels, rate, sample_width, block, seconds=60):
+    pipeline = Pipeline(in_channels, rate, sample_width, out_channels, rate)
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, size=block * in_channels * sample_width, dtype=np.uint8).tobytes()
+    blocks = rate * seconds // block
+    t0 = time.process_time()
+    for _ in range(blocks):
+        pipeline.process(data)
+    elapsed = time.process_time() - t0
+    return elapsed / (blocks * block / rate)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--block', type=int, default=1024)
+    args = parser.parse_args()
+
+    for in_channels, out_channels, rate, sample_width in CASES:
+        load = measure(in_channels, out_channels, rate, sample_width, args.block)
+        print(f'{in_channels:2d} -> {out_channels} ch, {rate:6d} Hz, {sample_width * 8:2d} bit : {load * 100:6.2f} % of one core')
+
+
+if __name__ == '__main__':
+    main()
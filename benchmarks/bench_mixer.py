@@ -0,0 +1,153 @@
+"""
+Measure how many voices the mixer of the player mixes in real time, against simulated devices.
+
+The fake pyaudio of benchmarks/fakes is imported instead of the real one, see bench_player.py.
+
+Measured:
+    mix       : the time of Mixer.read() per block for a count of voices, in this process,
+                and the voices which fit in the real time of a block
+    player    : the most voices of play_overlay() played without an underrun or an underflow,
+                found by doubling the count and bisecting, for both engines
+
+The voices are files of the native rate of the device and of 44100 Hz, which are resampled.
+The results are written as JSON, so that two runs can be compared.
+
+Usage:
+    python benchmarks/bench_mixer.py [--output FILE] [--seconds SECONDS] [--max-voices N]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+# The fakes must be found before the real modules
+sys.path.insert(0, os.path.join(BENCHMARKS, 'fakes'))
+
+import fake_devices
+from audio_player import AudioPlayer, Engine
+from bench_player import _make_wav
+from mixer import Mixer
+from wav_reader import WavReader
+
+# 48000 Hz float
+DEVICE = fake_devices.DEVICES[0].friendly_name
+RATE = 48000
+BLOCK = 1024
+ENGINES = {'blocking': Engine.BLOCKING, 'callback': Engine.CALLBACK}
+
+
+def bench_mix(wav_file, counts, blocks=200):
+    """
+    Time Mixer.read() of the player block size.
+    """
+    results = {}
+    for count in counts:
+        mixer = Mixer(2, RATE)
+        for voice in range(count):
+            mixer.add(voice, WavReader(wav_file), 1.0 / count)
+        t0 = time.perf_counter()
+        for _ in range(blocks):
+            mixer.read(BLOCK)
+        block_seconds = (time.perf_counter() - t0) / blocks
+        mixer.close()
+        results[count] = {
+            'block_ms': block_seconds * 1000,
+            'voice_us': block_seconds / count * 1e6,
+            # Voices mixed in the time the device plays a block
+            'realtime_voices': int(BLOCK / RATE / (block_seconds / count)),
+        }
+    return results
+
+
+def _underruns(player) -> int:
+    stats = player.player_stats()
+    return stats['underruns'] + stats['underflows']
+
+
+def _plays(player, wav_file, count, seconds, warmup=0.3) -> bool:
+    """
+    Return True if count voices are played for seconds without an underrun.
+    """
+    for _ in range(count):
+        player.play_overlay(DEVICE, wav_file, 1.0 / count)
+    time.sleep(warmup)
+    before = _underruns(player)
+    time.sleep(seconds)
+    underruns = _underruns(player) - before
+    player.stop_audio()
+    return underruns == 0
+
+
+def bench_max_voices(engine, wav_file, seconds, max_voices):
+    """
+    Return the most voices played without an underrun, 0 if even one voice underruns.
+    """
+    os.environ['FAKE_PORTAUDIO_SPEED'] = '1'
+    player = AudioPlayer(engine=engine)
+    trials = {}
+    try:
+        good, bad = 0, None
+        count = 1
+        while count <= max_voices:
+            trials[count] = _plays(player, wav_file, count, seconds)
+            if not trials[count]:
+                bad = count
+                break
+            good = count
+            count *= 2
+        if bad is not None:
+            while bad - good > 1:
+                count = (good + bad) // 2
+                trials[count] = _plays(player, wav_file, count, seconds)
+                if trials[count]:
+                    good = count
+                else:
+                    bad = count
+        return {'max_voices': good, 'limit_reached': bad is None, 'trials': trials}
+    finally:
+        player.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default='bench_mixer.json', help='the JSON file of the results')
+    parser.add_argument('--seconds', type=float, default=2.0, help='seconds to play each count of voices')
+    parser.add_argument('--max-voices', type=int, default=512, help='the count to stop doubling at')
+    args = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'device': DEVICE,
+        'block_frames': BLOCK,
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        # Longer than a trial, so no voice ends while it is measured
+        seconds = args.seconds + 2
+        files = {'native': os.path.join(folder, 'native.wav'), 'resampled': os.path.join(folder, 'resampled.wav')}
+        _make_wav(files['native'], seconds, rate=RATE)
+        _make_wav(files['resampled'], seconds, rate=44100)
+
+        for kind, wav_file in files.items():
+            mix = bench_mix(wav_file, (1, 8, 32))
+            results[kind] = {'mix': mix}
+            print(f'{kind:9s} : {mix[32]["voice_us"]:7.1f} us per voice and block, {mix[32]["realtime_voices"]} voices in real time')
+            for name, engine in ENGINES.items():
+                result = bench_max_voices(engine, wav_file, args.seconds, args.max_voices)
+                results[kind][name] = result
+                print(f'{"":9s}   {name:8s} : {result["max_voices"]} voices without an underrun' + (' (limit)' if result['limit_reached'] else ''))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Written : {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+Measure the player and the Core Audio wrapper against simulated devices, without Windows or speakers.
+
+The fake pyaudio, comtypes and pycaw modules of benchmarks/fakes are imported instead of the real ones:
+the output streams are a null sink consuming the frames on a clock, and Core Audio is a fake enumerator and endpoints.
+
+Measured:
+    start     : from play_audio() to STARTED, and from loading to the first frames passed to the device,
+                with the underruns and underflows of the plays
+    stop      : from stop_audio() to its acknowledgement
+    throughput: source frames per second with the sink clock unthrottled, first play and replay from the cache
+    allocations: blocks and bytes allocated and still alive per second of playback, traced by tracemalloc
+    multi_output: CPU time of the player processes to play a file on 1, 2 and 4 devices, by play_multi() and by a player per device
+    recording : the frames recorded by WavFileBackend at several speeds of its clock, checked against offline_render
+    core_audio: COM calls of each CoreAudio operation, and of VolumeWriter for a burst of requests
+
+The results are written as JSON, so that two runs can be compared.
+
+Usage:
+    python benchmarks/bench_player.py [--output FILE] [--repeat N] [--speed FACTOR] [--seconds SECONDS]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import wave
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+# The fakes must be found before the real modules
+sys.path.insert(0, os.path.join(BENCHMARKS, 'fakes'))
+
+import numpy as np
+
+import fake_devices
+from audio_player import AudioPlayer, Command, Engine, Playing, PlayerEvent, _player_process
+from core_audio import CoreAudio, VolumeWriter
+from device_cache import DeviceCache
+from offline_render import render_file
+from output_backend import WavFileBackend
+from pcm_cache import CacheStats
+from player_stats import PlayerStats
+from read_ahead import ReadAheadStats
+from resampler import Quality
+
+# 48000 Hz float, the files of 44100 Hz are resampled
+DEVICE = fake_devices.DEVICES[0].friendly_name
+ENGINES = {'blocking': Engine.BLOCKING, 'callback': Engine.CALLBACK}
+
+
+def _make_wav(path, seconds, rate=44100, channels=2):
+    rng = np.random.default_rng(0)
+    frames = (rng.uniform(-0.5, 0.5, size=(int(seconds * rate), channels)) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(frames.tobytes())
+    return len(frames)
+
+
+def _summary(values):
+    values = sorted(values)
+    return {
+        'median': statistics.median(values),
+        'p90': values[min(len(values) - 1, int(len(values) * 0.9))],
+        'max': values[-1],
+        'mean': statistics.fmean(values),
+    }
+
+
+class _Events:
+    """
+    Event callback of AudioPlayer which keeps the time of the last event of each kind.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.times = {}
+
+    def __call__(self, event, info):
+        with self.condition:
+            self.times[event] = time.perf_counter()
+            self.condition.notify_all()
+
+    def clear(self):
+        with self.condition:
+            self.times.clear()
+
+    def wait(self, event, timeout=30.0) -> float:
+        with self.condition:
+            if not self.condition.wait_for(lambda: event in self.times, timeout):
+                raise TimeoutError(f'No event {event}')
+            return self.times[event]
+
+
+def _wait_writes(player, writes, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while player.player_stats()['writes'] <= writes and time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+
+def bench_start_stop(engine, wav_file, repeat, speed):
+    os.environ['FAKE_PORTAUDIO_SPEED'] = str(speed)
+    events = _Events()
+    player = AudioPlayer(engine=engine, event_callback=events)
+    start_ms = []
+    first_sample_ms = []
+    try:
+        for _ in range(repeat):
+            events.clear()
+            writes = player.player_stats()['writes']
+            t0 = time.perf_counter()
+            player.play_audio(DEVICE, wav_file)
+            start_ms.append((events.wait(PlayerEvent.STARTED) - t0) * 1000)
+            _wait_writes(player, writes)
+            first_sample_ms.append(player.player_stats()['first_sample_ms'])
+            # Stop while the device buffer is full
+            time.sleep(0.2 / speed)
+            player.stop_audio()
+        stop_ms = [latency * 1000 for latency in player.stop_latencies]
+        stats = player.player_stats()
+        return {
+            'start_ms': _summary(start_ms),
+            'first_sample_ms': _summary(first_sample_ms),
+            'stop_ms': _summary(stop_ms),
+            'stop_timeouts': repeat - len(stop_ms),
+            # Underflows are reported by the device, underruns are the callbacks which found the ring empty.
+            'underflows': stats['underflows'],
+            'underruns': stats['underruns'],
+        }
+    finally:
+        player.close()
+
+
+def bench_throughput(engine, wav_file, frames):
+    # The sink consumes the frames as fast as they are written
+    os.environ['FAKE_PORTAUDIO_SPEED'] = '0'
+    events = _Events()
+    player = AudioPlayer(engine=engine, event_callback=events)
+    results = {}
+    try:
+        for label in ('first_play', 'cached'):
+            events.clear()
+            cpu = player.player_stats()['cpu_seconds']
+            t0 = time.perf_counter()
+            player.play_audio(DEVICE, wav_file)
+            elapsed = events.wait(PlayerEvent.FINISHED, timeout=600) - t0
+            results[label] = {
+                'seconds': elapsed,
+                'frames_per_second': frames / elapsed,
+                'realtime_factor': frames / 44100 / elapsed,
+                'cpu_seconds': player.player_stats()['cpu_seconds'] - cpu,
+            }
+            player.audio_finished()
+        results['cache'] = player.cache_stats()
+        return results
+    finally:
+        player.close()
+
+
+def bench_recording(engine, wav_file, folder, speeds):
+    """
+    Record a file by WavFileBackend at each speed, and compare the recording with the frames rendered offline.
+
+    The recording must be the same at any speed, as the frames which a device would receive.
+    """
+    backend = WavFileBackend(os.path.join(folder, 'recording.wav'))
+    rendered = os.path.join(folder, 'rendered.wav')
+    render_file(wav_file, rendered, backend.get_device(DEVICE))
+    with open(rendered, 'rb') as f:
+        expected = f.read()
+    results = {}
+    for speed in speeds:
+        backend.speed = speed
+        events = _Events()
+        player = AudioPlayer(engine=engine, backend=backend, event_callback=events)
+        try:
+            player.play_audio(DEVICE, wav_file)
+            events.wait(PlayerEvent.FINISHED, timeout=600)
+            stats = player.player_stats()
+        finally:
+            player.close()
+        with open(backend.path_format, 'rb') as f:
+            recorded = f.read()
+        results[speed] = {
+            'recorded_bytes': len(recorded),
+            'rendered_bytes': len(expected),
+            'identical': recorded == expected,
+            'underruns': stats['underruns'],
+            'underflows': stats['underflows'],
+        }
+    return results
+
+
+def bench_multi_output(wav_file, speed, counts=(1, 2, 4)):
+    """
+    Play a file on several devices by play_multi() of one player, and by a player per device.
+
+    play_multi() reads and decodes the file once whatever the count, the players read it once each.
+    The PCM cache is disabled, so every play reads the file.
+    """
+    os.environ['FAKE_PORTAUDIO_SPEED'] = str(speed)
+    results = {}
+    for count in counts:
+        result = {}
+        for label, player_count in (('multi', 1), ('players', count)):
+            events = [_Events() for _ in range(player_count)]
+            players = [AudioPlayer(cache_bytes=0, event_callback=e) for e in events]
+            try:
+                t0 = time.perf_counter()
+                if label == 'multi':
+                    players[0].play_multi([(DEVICE, None)] * count, wav_file)
+                else:
+                    for player in players:
+                        player.play_audio(DEVICE, wav_file)
+                elapsed = max(e.wait(PlayerEvent.FINISHED, timeout=600) for e in events) - t0
+                result[label] = {
+                    'seconds': elapsed,
+                    'cpu_seconds': sum(player.player_stats()['cpu_seconds'] for player in players),
+                    'underruns': sum(player.player_stats()['underruns'] for player in players),
+                }
+            finally:
+                for player in players:
+                    player.close()
+        results[count] = result
+    return results
+
+
+def bench_allocations(engine, wav_file, seconds, speed, warmup=0.5):
+    """
+    Trace the allocations of the player loop while it plays.
+
+    The worker runs on a thread of this process, so that tracemalloc sees it.
+    It is fine with the fake PortAudio, not with the real one.
+    """
+    os.environ['FAKE_PORTAUDIO_SPEED'] = str(speed)
+    conn, worker_conn = multiprocessing.Pipe()
+    event_conn, worker_event_conn = multiprocessing.Pipe(duplex=False)
+    playing = multiprocessing.Value('i', Playing.FINISH)
+    position = multiprocessing.RawArray('q', 3)
+    cache_counters = multiprocessing.RawArray('q', CacheStats.SIZE)
+    read_ahead_counters = multiprocessing.RawArray('q', ReadAheadStats.SIZE)
+    stats = PlayerStats(create=True)
+    worker = threading.Thread(target=_player_process, args=(worker_conn, worker_event_conn, playing, position, cache_counters, read_ahead_counters, stats.name, engine, 100, Quality.MEDIUM, 10, 0, 2000, None, 1.0))
+    worker.start()
+    try:
+        tracemalloc.start(1)
+        conn.send((Command.LOAD, (DeviceCache().get(DEVICE), wav_file, None)))
+        conn.send((Command.PLAY, None))
+        time.sleep(warmup)
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        frames = position[0]   # the source frame being heard
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        frames = position[0] - frames
+        tracemalloc.stop()
+    finally:
+        conn.send((Command.QUIT, None))
+        worker.join()
+        stats.close()
+
+    # Exclude the snapshots themselves
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    diff = [d for d in diff if d.count_diff > 0]
+    blocks = sum(d.count_diff for d in diff)
+    size = sum(d.size_diff for d in diff if d.size_diff > 0)
+    diff.sort(key=lambda d: d.size_diff, reverse=True)
+    return {
+        'seconds': seconds,
+        'source_frames': frames,
+        'new_blocks_per_second': blocks / seconds,
+        'new_bytes_per_second': size / seconds,
+        'peak_bytes_above_baseline': peak - baseline,
+        'top': [f'{d.traceback[0].filename}:{d.traceback[0].lineno} +{d.size_diff} B, +{d.count_diff} blocks' for d in diff[:5]],
+    }
+
+
+def _com_calls(operation) -> dict:
+    fake_devices.reset_counts()
+    operation()
+    calls = dict(fake_devices.com_calls)
+    return {'total': sum(calls.values()), 'calls': calls}
+
+
+def bench_core_audio(iterations):
+    results = {}
+    ca = CoreAudio()
+    results['open'] = _com_calls(ca.open)
+    device_id = ca.audio_device_id_list()[0]
+    results['audio_device_list'] = _com_calls(ca.audio_device_list)
+    results['get_friendly_name'] = _com_calls(lambda: ca.get_friendly_name(device_id))
+    results['first_set_volume'] = _com_calls(lambda: ca.set_volume(device_id, 0.5))
+    results['set_volume'] = _com_calls(lambda: [ca.set_volume(device_id, i / iterations) for i in range(iterations)])
+    results['set_volume']['per_call'] = results['set_volume']['total'] / iterations
+    results['get_volume'] = _com_calls(lambda: ca.get_volume(device_id))
+    results['timing'] = ca.timing()
+    ca.close()
+
+    # A slider dragged for half a second
+    writers = []
+    def drag():
+        writer = VolumeWriter()
+        for i in range(iterations):
+            writer.set_volume(device_id, i / iterations)
+            time.sleep(0.5 / iterations)
+        writer.close()
+        writers.append(writer)
+    results['volume_writer'] = _com_calls(drag)
+    results['volume_writer'].update(requests=writers[0].requests, writes=writers[0].writes)
+    results['unfreed_mix_formats'] = len(fake_devices.allocations)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default='bench_player.json', help='the JSON file of the results')
+    parser.add_argument('--repeat', type=int, default=20, help='plays to measure the start and stop latency')
+    parser.add_argument('--speed', type=float, default=1.0, help='speed of the sink clock for the latency and allocations')
+    parser.add_argument('--seconds', type=float, default=60.0, help='length of the file for the throughput')
+    args = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'device': DEVICE,
+        'speed': args.speed,
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        clip = os.path.join(folder, 'clip.wav')
+        _make_wav(clip, 5)
+        long_file = os.path.join(folder, 'long.wav')
+        frames = _make_wav(long_file, args.seconds)
+
+        for name, engine in ENGINES.items():
+            results[name] = {
+                'latency': bench_start_stop(engine, clip, args.repeat, args.speed),
+                'throughput': bench_throughput(engine, long_file, frames),
+                'allocations': bench_allocations(engine, clip, 2.0 / args.speed, args.speed),
+                'recording': bench_recording(engine, clip, folder, sorted({0, args.speed, 20, 100})),
+            }
+            latency = results[name]['latency']
+            throughput = results[name]['throughput']
+            allocations = results[name]['allocations']
+            recording = results[name]['recording']
+            print(f'{name:8s} : start {latency["start_ms"]["median"]:6.2f} ms, first sample {latency["first_sample_ms"]["median"]:6.2f} ms, '
+                  f'stop {latency["stop_ms"]["median"]:6.2f} ms (p90 {latency["stop_ms"]["p90"]:6.2f} ms), '
+                  f'{latency["underruns"]} underruns, {latency["underflows"]} underflows')
+            print(f'{"":8s}   {throughput["first_play"]["frames_per_second"] / 1e6:6.2f} M frames/s, cached {throughput["cached"]["frames_per_second"] / 1e6:6.2f} M frames/s, '
+                  f'{allocations["new_blocks_per_second"]:8.1f} blocks/s, {allocations["new_bytes_per_second"] / 1024:8.1f} KiB/s')
+            print(f'{"":8s}   recording ' + ', '.join(f'{speed:g}x {"identical" if r["identical"] else "DIFFERS"}' for speed, r in recording.items()))
+
+        results['multi_output'] = bench_multi_output(clip, args.speed)
+        print('multi out : ' + ', '.join(f'{count} devices {r["multi"]["cpu_seconds"]:.2f} s CPU ({r["players"]["cpu_seconds"]:.2f} s by players)' for count, r in results['multi_output'].items()))
+
+    results['core_audio'] = bench_core_audio(100)
+    core_audio = results['core_audio']
+    print(f'core audio : device list {core_audio["audio_device_list"]["total"]} calls, set_volume {core_audio["set_volume"]["per_call"]:.1f} calls, '
+          f'volume writer {core_audio["volume_writer"]["requests"]} requests -> {core_audio["volume_writer"]["writes"]} writes, {core_audio["volume_writer"]["total"]} calls')
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Written : {args.output}')
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
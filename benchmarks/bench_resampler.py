@@ -0,0 +1,55 @@
+"""
+Measure the throughput of the resampler for each quality preset.
+
+The result is the output frames per second of CPU time on one core,
+and the share of one core needed for real-time playback.
+
+Usage:
+    python benchmarks/bench_resampler.py [--block FRAMES] [--channels N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resampler import Resampler, Quality
+
+RATES = (
+    (44100, 48000),
+    (48000, 44100),
+    (96000, 48000),
+)
+
+
+def measure(in_rate, out_rate, channels, quality, block, seconds=20):
+    resampler = Resampler(in_rate, out_rate, channels, quality)
+    rng = np.random.default_rng(0)
+    frames = rng.uniform(-1, 1, size=(block, channels)).astype(np.float32)
+    blocks = in_rate * seconds // block
+    out_frames = 0
+    t0 = time.process_time()
+    for _ in range(blocks):
+        out_frames += len(resampler.process(frames))
+    elapsed = time.process_time() - t0
+    return out_frames / elapsed, elapsed / (out_frames / out_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--block', type=int, default=1024)
+    parser.add_argument('--channels', type=int, default=2)
+    args = parser.parse_args()
+
+    for in_rate, out_rate in RATES:
+        for quality in (Quality.FAST, Quality.MEDIUM, Quality.BEST):
+            throughput, load = measure(in_rate, out_rate, args.channels, quality, args.block)
+            print(f'{in_rate:6d} -> {out_rate:6d} Hz, {quality:6s} : {throughput / 1e6:6.2f} M frames/s per core, {load * 100:5.2f} % of one core')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Measure the sample format conversions of the player.
+
+Each case converts one minute of stereo noise at 48000 Hz block by block,
+from the format of a file to float32 and back to the stream format,
+and reports the share of one core needed for real-time playback.
+The streams of fewer bits than the file are dithered by TpdfDither, as the Pipeline of the player does.
+
+Usage:
+    python benchmarks/bench_sample_format.py [--block FRAMES]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sample_format
+
+RATE = 48000
+CHANNELS = 2
+
+# (name, file sample width, file is float, stream sample width, stream is float)
+CASES = (
+    ('16 bit -> 16 bit', 2, False, 2, False),
+    ('16 bit -> float32', 2, False, 4, True),
+    ('24 bit -> 24 bit', 3, False, 3, False),
+    ('24 bit -> 32 bit', 3, False, 4, False),
+    ('24 bit -> 16 bit', 3, False, 2, False),
+    ('32 bit -> 32 bit', 4, False, 4, False),
+    ('float32 -> float32', 4, True, 4, True),
+    ('float32 -> 32 bit', 4, True, 4, False),
+    ('float32 -> 16 bit', 4, True, 2, False),
+    ('float64 -> 32 bit', 8, True, 4, False),
+)
+
+
+def measure(sample_width, is_float, out_sample_width, out_is_float, block, seconds=60):
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-1.0, 1.0, size=block * CHANNELS).astype(np.float32)
+    data = bytes(sample_format.from_float(samples, sample_width, is_float))
+    dither = None
+    if not out_is_float and sample_format.precision(out_sample_width) < min(sample_format.precision(sample_width, is_float), sample_format.FLOAT_BITS):
+        dither = sample_format.TpdfDither()
+    blocks = RATE * seconds // block
+    t0 = time.process_time()
+    for _ in range(blocks):
+        sample_format.from_float(sample_format.to_float(data, sample_width, is_float), out_sample_width, out_is_float, dither)
+    elapsed = time.process_time() - t0
+    return elapsed / (blocks * block / RATE)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--block', type=int, default=1024)
+    args = parser.parse_args()
+
+    for name, sample_width, is_float, out_sample_width, out_is_float in CASES:
+        load = measure(sample_width, is_float, out_sample_width, out_is_float, args.block)
+        print(f'{name:18s} : {load * 100:6.2f} % of one core')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Measure the start latency of AudioPlayer.
+
+Before : a new process is started for every play (the former AudioPlayer behavior).
+After  : the persistent player process receives a LOAD/PLAY command.
+
+Both cases play a clip of one chunk and measure the time from the request
+until the first frames are passed to the device, seen from this process in the same way:
+a shared flag set after the first write of the former process, and the write counter of PlayerStats.
+So the difference is the start overhead, without the drain of the device buffer.
+
+The simulated devices of benchmarks/fakes are used if they are found first, for example
+    PYTHONPATH=benchmarks/fakes FAKE_PORTAUDIO_SPEED=1 python benchmarks/bench_start_latency.py
+
+Usage:
+    python benchmarks/bench_start_latency.py [--device NAME] [--repeat N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyaudio
+from audio_player import AudioPlayer, Playing
+
+
+def _legacy_play_audio(device, wav_file, playing, first_write):
+    """
+    The former playing process : PortAudio is initialized for every play.
+
+    first_write is set to perf_counter() after the first frames are written, which is not a part of the former code.
+    """
+    wf = wave.open(wav_file, 'rb')
+    p = pyaudio.PyAudio()
+    stream = p.open(
+        format=p.get_format_from_width(wf.getsampwidth()),
+        channels=wf.getnchannels(),
+        rate=wf.getframerate(),
+        output=True,
+        output_device_index=device['index'],
+    )
+    data = wf.readframes(1024)
+    while data:
+        stream.write(data)
+        if not first_write.value:
+            first_write.value = time.perf_counter()
+        data = wf.readframes(1024)
+    playing.value = Playing.FINISH
+    stream.stop_stream()
+    stream.close()
+    p.terminate()
+
+
+def _make_clip(path, frames=1024, rate=44100):
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b'\x00' * frames * 4)
+
+
+def _first_output_device_name():
+    p = pyaudio.PyAudio()
+    try:
+        for i in range(p.get_host_api_count()):
+            host_api = p.get_host_api_info_by_index(i)
+            if host_api['name'] != 'MME':
+                continue
+            for j in range(int(host_api['deviceCount'])):
+                device = p.get_device_info_by_host_api_device_index(i, j)
+                if int(device['maxOutputChannels']) > 0:
+                    return str(device['name'])
+    finally:
+        p.terminate()
+    return None
+
+
+def _wait(condition):
+    while not condition():
+        time.sleep(0.0005)
+
+
+def bench_before(player, device_name, wav_file, repeat):
+    device = player._get_device(device_name)
+    first_write = multiprocessing.Value('d', 0.0)
+    results = []
+    for _ in range(repeat):
+        first_write.value = 0.0
+        t0 = time.perf_counter()
+        player.playing.value = Playing.PLAYING
+        process = multiprocessing.Process(target=_legacy_play_audio, args=(device, wav_file, player.playing, first_write))
+        process.start()
+        _wait(lambda: first_write.value)
+        results.append(time.perf_counter() - t0)
+        # Not timed : the drain of the device buffer and the exit of the process
+        process.join()
+    return results
+
+
+def bench_after(player, device_name, wav_file, repeat):
+    results = []
+    for _ in range(repeat):
+        writes = player.player_stats()['writes']
+        t0 = time.perf_counter()
+        player.play_audio(device_name, wav_file)
+        _wait(lambda: player.player_stats()['writes'] > writes)
+        results.append(time.perf_counter() - t0)
+        # Not timed : the drain of the device buffer
+        _wait(lambda: player.playing.value != Playing.PLAYING)
+        player.audio_finished()
+    return results
+
+
+def _report(label, results):
+    ms = sorted(r * 1000 for r in results)
+    print(f'{label:7s}: median {statistics.median(ms):7.1f} ms, min {ms[0]:7.1f} ms, max {ms[-1]:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--device', default=None, help='friendly name of the output device')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    device_name = args.device or _first_output_device_name()
+    if device_name is None:
+        print('No output device.')
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        wav_file = os.path.join(folder, 'clip.wav')
+        _make_clip(wav_file)
+
+        player = AudioPlayer()
+        try:
+            _report('before', bench_before(player, device_name, wav_file, args.repeat))
+            _report('after', bench_after(player, device_name, wav_file, args.repeat))
+        finally:
+            player.close()
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
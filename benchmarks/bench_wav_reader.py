@@ -0,0 +1,85 @@
+"""
+Compare WavReader with wave.readframes() for reading a whole file chunk by chunk.
+
+It reports the throughput, the memory allocated by Python while reading (tracemalloc),
+and the growth of the resident set size.
+
+Usage:
+    python benchmarks/bench_wav_reader.py [--seconds N] [--chunk FRAMES]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wav_reader import WavReader
+
+
+def _make_file(path, seconds, rate=48000, channels=2, sample_width=2):
+    block = b'\x01\x02' * channels * rate
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        for _ in range(seconds):
+            wf.writeframes(block)
+
+
+def read_wave(path, chunk):
+    with wave.open(path, 'rb') as wf:
+        data = wf.readframes(chunk)
+        while data:
+            data = wf.readframes(chunk)
+
+
+def read_wav_reader(path, chunk):
+    with WavReader(path) as reader:
+        data = reader.read(chunk)
+        while data:
+            data = reader.read(chunk)
+
+
+def measure(func, path, chunk):
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    tracemalloc.start()
+    func(path, chunk)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Measured again without tracemalloc for the throughput
+    t0 = time.perf_counter()
+    func(path, chunk)
+    elapsed = time.perf_counter() - t0
+    rss_growth = process.memory_info().rss - rss
+    return elapsed, peak, rss_growth
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=int, default=600)
+    parser.add_argument('--chunk', type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'bench.wav')
+        _make_file(path, args.seconds)
+        size = os.path.getsize(path)
+        chunks = size // 4 // args.chunk
+        print(f'file : {size / 2**20:.1f} MiB, {chunks} chunks of {args.chunk} frames')
+
+        for label, func in (('wave', read_wave), ('WavReader', read_wav_reader)):
+            elapsed, peak, rss_growth = measure(func, path, args.chunk)
+            print(f'{label:10s}: {size / 2**20 / elapsed:8.0f} MiB/s, {elapsed / chunks * 1e6:6.2f} us/chunk, '
+                  f'tracemalloc peak {peak / 1024:8.1f} KiB, RSS growth {rss_growth / 2**20:6.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
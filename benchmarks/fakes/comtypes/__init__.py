@@ -0,0 +1,105 @@
+"""
+Fake comtypes, to run CoreAudio against the simulated devices of fake_devices.
+
+CoCreateInstance() returns the fake IMMDeviceEnumerator of fake_core_audio,
+and every call of a COM function or method is counted in fake_devices.com_calls.
+"""
+
+import ctypes
+import types
+import uuid
+
+import fake_devices
+
+
+CLSCTX_INPROC_SERVER = 1
+CLSCTX_INPROC_HANDLER = 2
+CLSCTX_LOCAL_SERVER = 4
+CLSCTX_SERVER = 5
+CLSCTX_ALL = 7
+
+COINIT_MULTITHREADED = 0x0
+COINIT_APARTMENTTHREADED = 0x2
+
+pointer = ctypes.pointer
+
+
+class COMError(Exception):
+    def __init__(self, hresult, text, details):
+        super().__init__(hresult, text, details)
+        self.hresult = hresult
+        self.text = text
+        self.details = details
+
+
+class GUID(ctypes.Structure):
+    _fields_ = [
+        ('Data1', ctypes.c_ulong),
+        ('Data2', ctypes.c_ushort),
+        ('Data3', ctypes.c_ushort),
+        ('Data4', ctypes.c_ubyte * 8),
+    ]
+
+    def __init__(self, name=None):
+        super().__init__()
+        if name is not None:
+            value = uuid.UUID(name)
+            self.Data1, self.Data2, self.Data3 = value.fields[:3]
+            self.Data4[:] = value.bytes[8:]
+
+    def __str__(self):
+        value = uuid.UUID(bytes=self.Data1.to_bytes(4, 'big') + self.Data2.to_bytes(2, 'big') + self.Data3.to_bytes(2, 'big') + bytes(self.Data4))
+        return '{' + str(value).upper() + '}'
+
+    def __repr__(self):
+        return f'GUID("{self}")'
+
+    def __eq__(self, other):
+        return isinstance(other, GUID) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    @classmethod
+    def create_new(cls):
+        return cls(str(uuid.uuid4()))
+
+
+class IUnknown:
+    _iid_ = GUID('{00000000-0000-0000-C000-000000000046}')
+
+
+class COMObject:
+    """
+    Base of the objects implementing COM interfaces in Python, the methods are called directly.
+    """
+    _com_interfaces_ = ()
+
+    def __init__(self):
+        pass
+
+
+def CoInitialize():
+    fake_devices.count('CoInitialize')
+
+
+def CoInitializeEx(flags=None):
+    fake_devices.count('CoInitializeEx')
+
+
+def CoUninitialize():
+    fake_devices.count('CoUninitialize')
+
+
+def CoCreateInstance(clsid, interface=None, clsctx=None, machine=None, pServerInfo=None):
+    fake_devices.count('CoCreateInstance')
+    import fake_core_audio
+    return fake_core_audio.create_instance(clsid, interface)
+
+
+if not hasattr(ctypes, 'windll'):
+    # CoreAudio frees the mix format with ctypes.windll.ole32.CoTaskMemFree()
+    def _co_task_mem_free(p):
+        fake_devices.count('CoTaskMemFree')
+        fake_devices.free(p)
+    ctypes.windll = types.SimpleNamespace(ole32=types.SimpleNamespace(CoTaskMemFree=_co_task_mem_free))
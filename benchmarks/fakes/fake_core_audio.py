@@ -0,0 +1,270 @@
+"""
+Fake Core Audio objects of the simulated devices: the device enumerator, the devices and their endpoints.
+
+Each method counts its call as 'Interface::Method' in fake_devices.com_calls.
+The devices removed by fake_devices.set_state() fail as on Windows, with COMError.
+"""
+
+import ctypes
+import functools
+
+import comtypes
+from comtypes import GUID, COMError
+import fake_devices
+from pycaw.api.mmdeviceapi import IMMDeviceEnumerator, PROPERTYKEY
+from pycaw.api.endpointvolume import IAudioEndpointVolume
+from pycaw.api.audioclient import IAudioClient
+
+
+CLSID_MMDeviceEnumerator = GUID('{BCDE0395-E52F-467C-8E3D-C4579291692E}')
+PKEY_Device_FriendlyName = (GUID('{A45C254E-DF1C-4EFD-8020-67D146A850E0}'), 14)
+
+E_NOINTERFACE = -0x7FFFBFFE            # 0x80004002
+E_NOTFOUND = -0x7FF8FB70               # 0x80070490
+AUDCLNT_E_DEVICE_INVALIDATED = -0x7776FFFC  # 0x88890004
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+KSDATAFORMAT_SUBTYPE_PCM = GUID('{00000001-0000-0010-8000-00AA00389B71}')
+KSDATAFORMAT_SUBTYPE_IEEE_FLOAT = GUID('{00000003-0000-0010-8000-00AA00389B71}')
+
+
+class WAVEFORMATEX(ctypes.Structure):
+    # Same layout as core_audio.WAVEFORMATEX
+    _pack_ = 2
+    _fields_ = [
+        ('wFormatTag', ctypes.c_ushort),
+        ('nChannels', ctypes.c_ushort),
+        ('nSamplesPerSec', ctypes.c_ulong),
+        ('nAvgBytesPerSec', ctypes.c_ulong),
+        ('nBlockAlign', ctypes.c_ushort),
+        ('wBitsPerSample', ctypes.c_ushort),
+        ('cbSize', ctypes.c_ushort),
+    ]
+
+
+class WAVEFORMATEXTENSIBLE(ctypes.Structure):
+    _pack_ = 2
+    _fields_ = [
+        ('Format', WAVEFORMATEX),
+        ('wValidBitsPerSample', ctypes.c_ushort),
+        ('dwChannelMask', ctypes.c_ulong),
+        ('SubFormat', GUID),
+    ]
+
+
+class AUDIO_VOLUME_NOTIFICATION_DATA(ctypes.Structure):
+    _fields_ = [
+        ('guidEventContext', GUID),
+        ('bMuted', ctypes.c_int),
+        ('fMasterVolume', ctypes.c_float),
+        ('nChannels', ctypes.c_uint),
+        ('afChannelVolumes', ctypes.c_float * 8),
+    ]
+
+
+def _method(interface):
+    """
+    Decorator to count the calls of a method of the interface.
+    """
+    def decorator(method):
+        name = f'{interface}::{method.__name__}'
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            fake_devices.count(name)
+            return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _check(device):
+    if device.state != fake_devices.ACTIVE:
+        raise COMError(AUDCLNT_E_DEVICE_INVALIDATED, 'The device has been invalidated.', None)
+
+
+def create_instance(clsid, interface):
+    if clsid != CLSID_MMDeviceEnumerator or interface not in (None, IMMDeviceEnumerator):
+        raise COMError(E_NOINTERFACE, 'No such interface supported', None)
+    return DeviceEnumerator()
+
+
+class DeviceEnumerator:
+    @_method('IMMDeviceEnumerator')
+    def EnumAudioEndpoints(self, data_flow, state_mask):
+        return DeviceCollection([d for d in fake_devices.DEVICES if d.state & state_mask])
+
+    @_method('IMMDeviceEnumerator')
+    def GetDevice(self, device_id):
+        device = fake_devices.find(device_id)
+        if device is None:
+            raise COMError(E_NOTFOUND, 'Element not found.', None)
+        return Device(device)
+
+    @_method('IMMDeviceEnumerator')
+    def GetDefaultAudioEndpoint(self, data_flow, role):
+        for device in fake_devices.DEVICES:
+            if device.state == fake_devices.ACTIVE:
+                return Device(device)
+        raise COMError(E_NOTFOUND, 'Element not found.', None)
+
+    @_method('IMMDeviceEnumerator')
+    def RegisterEndpointNotificationCallback(self, client):
+        fake_devices.notification_clients.append(client)
+
+    @_method('IMMDeviceEnumerator')
+    def UnregisterEndpointNotificationCallback(self, client):
+        if client in fake_devices.notification_clients:
+            fake_devices.notification_clients.remove(client)
+
+
+class DeviceCollection:
+    def __init__(self, devices):
+        self.devices = devices
+
+    @_method('IMMDeviceCollection')
+    def GetCount(self):
+        return len(self.devices)
+
+    @_method('IMMDeviceCollection')
+    def Item(self, i):
+        return Device(self.devices[i])
+
+
+class Device:
+    def __init__(self, device):
+        self.device = device
+
+    @_method('IMMDevice')
+    def GetId(self):
+        return self.device.id
+
+    @_method('IMMDevice')
+    def GetState(self):
+        return self.device.state
+
+    @_method('IMMDevice')
+    def OpenPropertyStore(self, mode):
+        return PropertyStore(self.device)
+
+    @_method('IMMDevice')
+    def Activate(self, iid, clsctx, params):
+        _check(self.device)
+        return Unknown(self.device, iid)
+
+
+class Unknown:
+    def __init__(self, device, iid):
+        self.device = device
+        self.iid = iid
+
+    @_method('IUnknown')
+    def QueryInterface(self, interface):
+        if interface._iid_ != self.iid:
+            raise COMError(E_NOINTERFACE, 'No such interface supported', None)
+        if interface is IAudioEndpointVolume:
+            return EndpointVolume(self.device)
+        if interface is IAudioClient:
+            return AudioClient(self.device)
+        raise COMError(E_NOINTERFACE, 'No such interface supported', None)
+
+
+class PropVariant:
+    def __init__(self, value):
+        self.value = value
+
+    def GetValue(self):
+        return self.value
+
+
+class PropertyStore:
+    def __init__(self, device):
+        self.device = device
+
+    @_method('IPropertyStore')
+    def GetValue(self, key):
+        key = ctypes.cast(key, ctypes.POINTER(PROPERTYKEY)).contents
+        if (key.fmtid, key.pid) == PKEY_Device_FriendlyName:
+            return PropVariant(self.device.friendly_name)
+        return PropVariant(None)
+
+
+class EndpointVolume:
+    def __init__(self, device):
+        self.device = device
+
+    @_method('IAudioEndpointVolume')
+    def GetChannelCount(self):
+        _check(self.device)
+        return self.device.channels
+
+    @_method('IAudioEndpointVolume')
+    def GetMasterVolumeLevelScalar(self):
+        _check(self.device)
+        return self.device.volume
+
+    @_method('IAudioEndpointVolume')
+    def SetMasterVolumeLevelScalar(self, level, event_context):
+        _check(self.device)
+        self.device.volume = max(0.0, min(1.0, level))
+        self._notify(event_context)
+
+    @_method('IAudioEndpointVolume')
+    def GetMute(self):
+        _check(self.device)
+        return 1 if self.device.mute else 0
+
+    @_method('IAudioEndpointVolume')
+    def SetMute(self, mute, event_context):
+        _check(self.device)
+        self.device.mute = bool(mute)
+        self._notify(event_context)
+
+    @_method('IAudioEndpointVolume')
+    def RegisterControlChangeNotify(self, callback):
+        _check(self.device)
+        self.device.volume_callbacks.append(callback)
+
+    @_method('IAudioEndpointVolume')
+    def UnregisterControlChangeNotify(self, callback):
+        if callback in self.device.volume_callbacks:
+            self.device.volume_callbacks.remove(callback)
+
+    def _notify(self, event_context):
+        # Windows calls them on its own thread, they are called before the setter returns here.
+        data = AUDIO_VOLUME_NOTIFICATION_DATA()
+        data.guidEventContext = event_context
+        data.bMuted = self.device.mute
+        data.fMasterVolume = self.device.volume
+        data.nChannels = self.device.channels
+        for i in range(self.device.channels):
+            data.afChannelVolumes[i] = self.device.volume
+        for callback in list(self.device.volume_callbacks):
+            callback.OnNotify(comtypes.pointer(data))
+
+
+class AudioClient:
+    def __init__(self, device):
+        self.device = device
+
+    @_method('IAudioClient')
+    def GetMixFormat(self):
+        _check(self.device)
+        device = self.device
+        if device.is_float:
+            wave_format = WAVEFORMATEXTENSIBLE()
+            fmt = wave_format.Format
+            fmt.wFormatTag = WAVE_FORMAT_EXTENSIBLE
+            fmt.cbSize = 22
+            wave_format.wValidBitsPerSample = device.bits_per_sample
+            wave_format.dwChannelMask = 0x3
+            wave_format.SubFormat = KSDATAFORMAT_SUBTYPE_IEEE_FLOAT
+        else:
+            wave_format = WAVEFORMATEX()
+            fmt = wave_format
+            fmt.wFormatTag = WAVE_FORMAT_PCM
+        fmt.nChannels = device.channels
+        fmt.nSamplesPerSec = device.rate
+        fmt.wBitsPerSample = device.bits_per_sample
+        fmt.nBlockAlign = device.channels * device.bits_per_sample // 8
+        fmt.nAvgBytesPerSec = device.rate * fmt.nBlockAlign
+        return fake_devices.allocate(wave_format)
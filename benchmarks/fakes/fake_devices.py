@@ -0,0 +1,117 @@
+"""
+Simulated audio devices shared by the fake pyaudio, comtypes and pycaw modules.
+
+The same devices are seen by PortAudio (MME and WASAPI host APIs) and by Core Audio,
+so the friendly names of Core Audio resolve to the MME devices as on Windows.
+Every call of a fake COM method is counted in com_calls.
+"""
+
+import collections
+import ctypes
+import threading
+import uuid
+
+
+# Device state of Core Audio, core_audio_constants.DeviceState
+ACTIVE = 0x01
+NOTPRESENT = 0x04
+
+# MME truncates the device names to 31 characters
+MME_NAME_LENGTH = 31
+
+
+class FakeDevice:
+    def __init__(self, friendly_name, channels, rate, bits_per_sample, is_float):
+        self.id = '{0.0.0.00000000}.{' + str(uuid.uuid5(uuid.NAMESPACE_OID, friendly_name)) + '}'
+        self.friendly_name = friendly_name
+        self.channels = channels
+        self.rate = rate
+        self.bits_per_sample = bits_per_sample
+        self.is_float = is_float
+        self.state = ACTIVE
+        self.volume = 1.0
+        self.mute = False
+        self.volume_callbacks = []
+
+
+DEVICES = [
+    FakeDevice('Speakers (Fake High Definition Audio)', 2, 48000, 32, True),
+    FakeDevice('Headphones (Fake USB Audio)', 2, 44100, 16, False),
+]
+
+HOST_APIS = ('MME', 'Windows WASAPI')
+
+# name -> call count
+com_calls = collections.Counter()
+_lock = threading.Lock()
+# IMMNotificationClient objects registered to the enumerator
+notification_clients = []
+# address -> buffer of the mix formats not freed by CoTaskMemFree() yet
+allocations = {}
+
+
+def count(name):
+    with _lock:
+        com_calls[name] += 1
+
+
+def reset_counts():
+    with _lock:
+        com_calls.clear()
+
+
+def find(device_id):
+    for device in DEVICES:
+        if device.id == device_id:
+            return device
+    return None
+
+
+def portaudio_devices() -> list:
+    """
+    Return the PortAudio device information of all the host APIs, in the order of the device index.
+    """
+    devices = []
+    for host_api, name in enumerate(HOST_APIS):
+        for device in DEVICES:
+            if device.state != ACTIVE:
+                continue
+            devices.append({
+                'index': len(devices),
+                'structVersion': 2,
+                'name': device.friendly_name[:MME_NAME_LENGTH] if name == 'MME' else device.friendly_name,
+                'hostApi': host_api,
+                'maxInputChannels': 0,
+                'maxOutputChannels': device.channels,
+                'defaultLowInputLatency': 0.0,
+                'defaultLowOutputLatency': 0.09,
+                'defaultHighInputLatency': 0.0,
+                'defaultHighOutputLatency': 0.18,
+                # MME accepts any rate, so PortAudio reports the first rate of its search order.
+                'defaultSampleRate': 44100.0 if name == 'MME' else float(device.rate),
+            })
+    return devices
+
+
+def set_state(device_id, state):
+    """
+    Change the state of a device, and notify the registered clients as Core Audio does.
+    """
+    device = find(device_id)
+    device.state = state
+    for client in list(notification_clients):
+        client.OnDeviceStateChanged(device_id, state)
+
+
+def allocate(structure):
+    """
+    Keep a structure returned to the caller until free() is called with its pointer, as CoTaskMemAlloc().
+    """
+    pointer = ctypes.pointer(structure)
+    allocations[ctypes.addressof(structure)] = structure
+    return pointer
+
+
+def free(pointer):
+    address = ctypes.cast(pointer, ctypes.c_void_p).value
+    allocations.pop(address, None)
@@ -0,0 +1,281 @@
+"""
+Fake PyAudio with a null sink, to run the player without an audio device.
+
+The output streams discard the frames, but they are consumed on a clock as a device does:
+a write blocks while the buffer of the device is full, and the callback is called once per buffer.
+The clock runs FAKE_PORTAUDIO_SPEED times faster than the real time, 1 by default.
+0 consumes the frames as fast as they are written.
+The variable is read when a stream is opened, so it can be set before the player process is started.
+
+Only the part of the PyAudio API used by this repository is implemented.
+"""
+
+import os
+import threading
+import time
+
+import fake_devices
+from . import _portaudio
+
+
+paFloat32 = 1
+paInt32 = 2
+paInt24 = 4
+paInt16 = 8
+paInt8 = 16
+paUInt8 = 32
+
+paContinue = 0
+paComplete = 1
+paAbort = 2
+
+paOutputUnderflow = 4
+
+paFramesPerBufferUnspecified = 0
+
+paInvalidChannelCount = -9998
+paInvalidSampleRate = -9997
+paInvalidDevice = -9996
+paSampleFormatNotSupported = -9994
+
+_WIDTHS = {paFloat32: 4, paInt32: 4, paInt24: 3, paInt16: 2, paInt8: 1, paUInt8: 1}
+
+# Seconds of the device buffer, as the default high latency of MME
+LATENCY = 0.18
+# Frames per callback when frames_per_buffer is unspecified
+CALLBACK_FRAMES = 1024
+
+
+def get_sample_size(format):
+    return _WIDTHS[format]
+
+
+def get_format_from_width(width, unsigned=True):
+    if width == 1:
+        return paUInt8 if unsigned else paInt8
+    return {2: paInt16, 3: paInt24, 4: paFloat32}[width]
+
+
+def _speed():
+    return float(os.environ.get('FAKE_PORTAUDIO_SPEED', '1'))
+
+
+class Stream:
+    """
+    Output stream of the null sink.
+
+    frames_written counts the frames consumed by the sink, underflows the times its buffer ran empty.
+    """
+
+    def __init__(self, pa, rate, channels, format, input=False, output=False, input_device_index=None,
+                 output_device_index=None, frames_per_buffer=paFramesPerBufferUnspecified, start=True,
+                 input_host_api_specific_stream_info=None, output_host_api_specific_stream_info=None,
+                 stream_callback=None):
+        if not output:
+            raise ValueError('Only output streams are simulated', paInvalidDevice)
+        pa.is_format_supported(rate, output_device=output_device_index, output_channels=channels, output_format=format)
+        self._stream = self   # for _portaudio
+        self._rate = rate
+        self._frame_size = channels * _WIDTHS[format]
+        self._speed = _speed()
+        self._capacity = int(LATENCY * rate)
+        self._callback = stream_callback
+        self._frames_per_buffer = frames_per_buffer or CALLBACK_FRAMES
+        self._until = 0.0         # perf_counter() when the buffered frames are played
+        self._primed = False
+        self._is_running = False
+        self._active = False
+        self._generation = 0      # the callback thread of an aborted start exits
+        self._thread = None
+        self.frames_written = 0
+        self.underflows = 0
+        if start:
+            self.start_stream()
+
+    def _buffered(self, now) -> int:
+        if self._speed <= 0:
+            return 0
+        return max(0, int((self._until - now) * self._rate * self._speed))
+
+    def _consume(self, frames) -> int:
+        """
+        Pass frames to the device, waiting while its buffer is full.
+
+        Returns:
+            int: paOutputUnderflow if the buffer had run empty before them, otherwise 0.
+        """
+        status = 0
+        now = time.perf_counter()
+        if self._speed > 0:
+            wait = (self._buffered(now) + frames - self._capacity) / (self._rate * self._speed)
+            if wait > 0:
+                time.sleep(wait)
+                now = time.perf_counter()
+            if self._primed and self._until < now:
+                status = paOutputUnderflow
+                self.underflows += 1
+            self._until = max(self._until, now) + frames / (self._rate * self._speed)
+        self._primed = True
+        self.frames_written += frames
+        return status
+
+    def start_stream(self):
+        if self._is_running:
+            return
+        self._is_running = True
+        self._active = True
+        self._primed = False
+        self._generation += 1
+        if self._callback:
+            self._thread = threading.Thread(target=self._run, args=(self._generation,), daemon=True)
+            self._thread.start()
+
+    def _run(self, generation):
+        status = 0
+        while generation == self._generation:
+            frames = self._frames_per_buffer
+            data, flag = self._callback(None, frames, {'output_buffer_dac_time': self._until}, status)
+            if generation != self._generation:
+                break
+            size = len(memoryview(data).cast('B'))
+            status = self._consume(size // self._frame_size)
+            if flag != paContinue or size < frames * self._frame_size:
+                # The stream is completed after the buffer is played.
+                self._drain()
+                if generation == self._generation:
+                    # Not started again while it was draining
+                    self._active = False
+                break
+            if self._speed <= 0:
+                # Let the other threads run
+                time.sleep(0)
+
+    def _drain(self):
+        if self._speed > 0:
+            time.sleep(max(0.0, self._until - time.perf_counter()))
+
+    def stop_stream(self):
+        """
+        Stop the stream after the buffered frames are played.
+        """
+        if not self._is_running:
+            return
+        self._generation += 1
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._drain()
+        self._is_running = False
+        self._active = False
+
+    def abort(self):
+        self._generation += 1
+        self._until = 0.0
+        self._is_running = False
+        self._active = False
+
+    def close(self):
+        self.abort()
+
+    def is_active(self) -> bool:
+        return self._active
+
+    def is_stopped(self) -> bool:
+        return not self._is_running
+
+    def get_output_latency(self) -> float:
+        return LATENCY
+
+    def get_input_latency(self) -> float:
+        return 0.0
+
+    def get_time(self) -> float:
+        return time.perf_counter()
+
+    def get_cpu_load(self) -> float:
+        return 0.0
+
+    def get_write_available(self) -> int:
+        return self._capacity - min(self._capacity, self._buffered(time.perf_counter()))
+
+    def write(self, frames, num_frames=None, exception_on_underflow=False):
+        if not self._is_running:
+            raise OSError('Stream is stopped', -9983)
+        if num_frames is None:
+            num_frames = len(memoryview(frames).cast('B')) // self._frame_size
+        if self._consume(num_frames) and exception_on_underflow:
+            raise OSError('Output underflowed', -9980)
+
+
+class PyAudio:
+    Stream = Stream
+
+    def __init__(self):
+        self._devices = fake_devices.portaudio_devices()
+
+    def terminate(self):
+        pass
+
+    def open(self, *args, **kwargs):
+        return Stream(self, *args, **kwargs)
+
+    def close(self, stream):
+        stream.close()
+
+    def get_sample_size(self, format):
+        return get_sample_size(format)
+
+    def get_format_from_width(self, width, unsigned=True):
+        return get_format_from_width(width, unsigned)
+
+    def get_host_api_count(self) -> int:
+        return len(fake_devices.HOST_APIS)
+
+    def get_default_host_api_info(self) -> dict:
+        return self.get_host_api_info_by_index(0)
+
+    def get_host_api_info_by_index(self, host_api_index) -> dict:
+        devices = [d for d in self._devices if d['hostApi'] == host_api_index]
+        return {
+            'index': host_api_index,
+            'structVersion': 1,
+            'type': host_api_index,
+            'name': fake_devices.HOST_APIS[host_api_index],
+            'deviceCount': len(devices),
+            'defaultInputDevice': -1,
+            'defaultOutputDevice': devices[0]['index'] if devices else -1,
+        }
+
+    def get_device_count(self) -> int:
+        return len(self._devices)
+
+    def get_device_info_by_index(self, device_index) -> dict:
+        if not 0 <= device_index < len(self._devices):
+            raise OSError('Invalid device', paInvalidDevice)
+        return dict(self._devices[device_index])
+
+    def get_device_info_by_host_api_device_index(self, host_api_index, host_api_device_index) -> dict:
+        devices = [d for d in self._devices if d['hostApi'] == host_api_index]
+        return dict(devices[host_api_device_index])
+
+    def get_default_output_device_info(self) -> dict:
+        if not self._devices:
+            raise OSError('No Default Output Device Available', paInvalidDevice)
+        return dict(self._devices[0])
+
+    def is_format_supported(self, rate, input_device=None, input_channels=None, input_format=None,
+                            output_device=None, output_channels=None, output_format=None) -> bool:
+        """
+        Raise ValueError if the device can't open the format.
+
+        MME converts any rate, the other host APIs only take the rate of the audio engine.
+        """
+        if output_device is None:
+            raise ValueError('Must specify stream format for input, output, or both', paInvalidDevice)
+        device = self.get_device_info_by_index(output_device)
+        if output_format not in _WIDTHS:
+            raise ValueError('Sample format not supported', paSampleFormatNotSupported)
+        if not 0 < output_channels <= device['maxOutputChannels']:
+            raise ValueError('Invalid number of channels', paInvalidChannelCount)
+        if fake_devices.HOST_APIS[device['hostApi']] != 'MME' and rate != device['defaultSampleRate']:
+            raise ValueError('Invalid sample rate', paInvalidSampleRate)
+        return True
@@ -0,0 +1,5 @@
+def abort_stream(stream):
+    """
+    Stop the stream without playing the buffered frames.
+    """
+    stream.abort()
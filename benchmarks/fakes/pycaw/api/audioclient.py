@@ -0,0 +1,9 @@
+"""
+Fake pycaw.api.audioclient, only the interface IDs used by CoreAudio.
+"""
+
+from comtypes import GUID, IUnknown
+
+
+class IAudioClient(IUnknown):
+    _iid_ = GUID('{1CB9AD4C-DBFA-4C32-B178-C2F568A703B2}')
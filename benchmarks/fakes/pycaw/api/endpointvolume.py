@@ -0,0 +1,13 @@
+"""
+Fake pycaw.api.endpointvolume, only the interface IDs used by CoreAudio.
+"""
+
+from comtypes import GUID, IUnknown
+
+
+class IAudioEndpointVolumeCallback(IUnknown):
+    _iid_ = GUID('{B1136C83-B6B5-4ADD-98A5-A2DF8EEDF6FA}')
+
+
+class IAudioEndpointVolume(IUnknown):
+    _iid_ = GUID('{5CDF2C82-841E-4546-9722-0CF74078229A}')
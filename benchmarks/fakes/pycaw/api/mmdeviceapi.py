@@ -0,0 +1,30 @@
+"""
+Fake pycaw.api.mmdeviceapi, only the interface IDs and the structures used by CoreAudio.
+"""
+
+import ctypes
+
+from comtypes import GUID, IUnknown
+
+
+class PROPERTYKEY(ctypes.Structure):
+    _fields_ = [
+        ('fmtid', GUID),
+        ('pid', ctypes.c_ulong),
+    ]
+
+
+class IMMDevice(IUnknown):
+    _iid_ = GUID('{D666063F-1587-4E43-81F1-B948E807363F}')
+
+
+class IMMDeviceCollection(IUnknown):
+    _iid_ = GUID('{0BD7A1BE-7A1A-44DB-8397-CC5392387B5E}')
+
+
+class IMMNotificationClient(IUnknown):
+    _iid_ = GUID('{7991EEC9-7E89-4D85-8390-6C703CEC60C0}')
+
+
+class IMMDeviceEnumerator(IUnknown):
+    _iid_ = GUID('{A95664D2-9614-4F35-A746-DE8DB63617E6}')
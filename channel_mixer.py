@@ -0,0 +1,95 @@
+import numpy as np
+
+
+# -3 dB
+_M3DB = 0.7071067811865476
+
+# Downmix and upmix matrices, [input channel][output channel]
+# The channel order of WAV files is FL, FR, FC, LFE, BL, BR, SL, SR.
+# Refer:
+#   https://learn.microsoft.com/ja-jp/windows/win32/api/mmreg/ns-mmreg-waveformatextensible
+_MATRICES = {
+    # mono -> stereo
+    (1, 2): [
+        [1.0, 1.0],
+    ],
+    # stereo -> mono
+    (2, 1): [
+        [0.5],
+        [0.5],
+    ],
+    # quad (FL, FR, BL, BR) -> stereo
+    (4, 2): [
+        [1.0, 0.0],
+        [0.0, 1.0],
+        [_M3DB, 0.0],
+        [0.0, _M3DB],
+    ],
+    # 5.1 (FL, FR, FC, LFE, BL, BR) -> stereo, LFE is dropped
+    (6, 2): [
+        [1.0, 0.0],
+        [0.0, 1.0],
+        [_M3DB, _M3DB],
+        [0.0, 0.0],
+        [_M3DB, 0.0],
+        [0.0, _M3DB],
+    ],
+    # 7.1 (FL, FR, FC, LFE, BL, BR, SL, SR) -> stereo, LFE is dropped
+    (8, 2): [
+        [1.0, 0.0],
+        [0.0, 1.0],
+        [_M3DB, _M3DB],
+        [0.0, 0.0],
+        [_M3DB, 0.0],
+        [0.0, _M3DB],
+        [_M3DB, 0.0],
+        [0.0, _M3DB],
+    ],
+}
+
+
+def mix_matrix(in_channels, out_channels) -> np.ndarray:
+    """
+    Return the matrix to mix in_channels to out_channels.
+
+    The gains to an output channel are normalized not to exceed 1.0 in total, so a downmix never clips.
+    """
+
+    if (in_channels, out_channels) in _MATRICES:
+        matrix = np.array(_MATRICES[(in_channels, out_channels)], dtype=np.float32)
+    elif out_channels == 1 and (in_channels, 2) in _MATRICES:
+        # Downmix to stereo, and then to mono
+        matrix = np.array(_MATRICES[(in_channels, 2)], dtype=np.float32) @ np.array(_MATRICES[(2, 1)], dtype=np.float32)
+    elif in_channels == 1:
+        # mono -> all the channels
+        matrix = np.ones((1, out_channels), dtype=np.float32)
+    else:
+        # Fold the channels which the output doesn't have into the existing ones
+        matrix = np.zeros((in_channels, out_channels), dtype=np.float32)
+        for i in range(in_channels):
+            matrix[i, i % out_channels] = 1.0
+
+    total = matrix.sum(axis=0)
+    total[total < 1.0] = 1.0
+    return matrix / total
+
+
+class ChannelMixer:
+    """
+    Mix frames of in_channels to out_channels with a matrix.
+    """
+
+    def __init__(self, in_channels, out_channels):
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.matrix = mix_matrix(in_channels, out_channels)
+
+    def process(self, frames) -> np.ndarray:
+        """
+        Args:
+            frames (np.ndarray): float32 samples shaped (frames, in_channels).
+
+        Returns:
+            np.ndarray: float32 samples shaped (frames, out_channels).
+        """
+        return frames @ self.matrix
@@ -1,9 +1,15 @@
+import ctypes
+import functools
+import threading
+import time
 import uuid
+from typing import NamedTuple
 import comtypes
 from comtypes import GUID
 from comtypes import COMObject
 from pycaw.api.mmdeviceapi import IMMDeviceEnumerator, IMMNotificationClient, PROPERTYKEY
 from pycaw.api.endpointvolume import IAudioEndpointVolume, IAudioEndpointVolumeCallback
+from pycaw.api.audioclient import IAudioClient
 import core_audio_constants
 
 
@@ -16,6 +22,75 @@ class COMErrorException(Exception):
     pass
 
 
+class AudioDevice(NamedTuple):
+    """
+    Render device record returned by CoreAudio.audio_device_list()
+    """
+    id: str
+    friendly_name: str
+    state: int             # core_audio_constants.DeviceState
+    channels: int          # mix format of the audio engine
+    sample_rate: int
+    bits_per_sample: int
+    is_float: bool
+
+
+class WAVEFORMATEX(ctypes.Structure):
+    # Refer:
+    #   https://learn.microsoft.com/ja-jp/windows/win32/api/mmeapi/ns-mmeapi-waveformatex
+    #
+    # pycaw defines all the fields as WORD, so nSamplesPerSec and nAvgBytesPerSec are defined here again.
+    _pack_ = 2
+    _fields_ = [
+        ('wFormatTag', ctypes.c_ushort),
+        ('nChannels', ctypes.c_ushort),
+        ('nSamplesPerSec', ctypes.c_ulong),
+        ('nAvgBytesPerSec', ctypes.c_ulong),
+        ('nBlockAlign', ctypes.c_ushort),
+        ('wBitsPerSample', ctypes.c_ushort),
+        ('cbSize', ctypes.c_ushort),
+    ]
+
+
+class WAVEFORMATEXTENSIBLE(ctypes.Structure):
+    # Refer:
+    #   https://learn.microsoft.com/ja-jp/windows/win32/api/mmreg/ns-mmreg-waveformatextensible
+    _pack_ = 2
+    _fields_ = [
+        ('Format', WAVEFORMATEX),
+        ('wValidBitsPerSample', ctypes.c_ushort),
+        ('dwChannelMask', ctypes.c_ulong),
+        ('SubFormat', GUID),
+    ]
+
+
+def _friendly_name_key():
+    # Refer:
+    #   https://github.com/AndreMiras/pycaw/blob/develop/pycaw/utils.py
+    key = PROPERTYKEY()
+    key.fmtid = comtypes.GUID('{A45C254E-DF1C-4EFD-8020-67D146A850E0}')
+    key.pid = 14
+    return key
+
+
+def _timed(method):
+    """
+    Decorator to record the call count and the elapsed time of a CoreAudio method.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - t0
+            stats = self.call_stats.setdefault(method.__name__, [0, 0.0, 0.0]) # count, total, max
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+    return wrapper
+
+
 class DeviceChangedCallback(COMObject):
     """
     IMMNotificationClient interface class
@@ -80,8 +155,10 @@ class VolumeChangedCallback(COMObject):
     #   float afChannelVolumes[1];
     # } AUDIO_VOLUME_NOTIFICATION_DATA, *PAUDIO_VOLUME_NOTIFICATION_DATA;
 
-    def __init__(self, callback=None):
+    def __init__(self, callback=None, ignore_own_changes=False):
         self.callback = callback
+        # If True, the notifications of the changes made by CoreAudio (event context is MY_UUID) are not passed to the callback.
+        self.ignore_own_changes = ignore_own_changes
 
     _com_interfaces_ = (IAudioEndpointVolumeCallback,)
 
@@ -94,6 +171,8 @@ class VolumeChangedCallback(COMObject):
         nChannels = notify_data.nChannels
         ChannelVolumes = list(notify_data.afChannelVolumes)
         pass
+        if self.ignore_own_changes and guid == GUID(MY_UUID):
+            return S_OK
         if self.callback:
             # ChannelVolumes is an array, and only nChannels elements are validated.
             self.callback(guid, bMuted, fMasterVolume, nChannels, ChannelVolumes[:nChannels])
@@ -103,43 +182,119 @@ class VolumeChangedCallback(COMObject):
 class CoreAudio:
     """
     Core Audio API wrap class
+
+    It holds a COM session between open() and close():
+    one initialized apartment, one IMMDeviceEnumerator and the IAudioEndpointVolume interface of each device.
+    The methods reuse them, so volume and mute operations don't set up COM for every call.
+    The session must be used from the thread which opened it.
     """
 
     def __init__(self):
+        self.device_enumerator = None
+        # device ID -> IAudioEndpointVolume
         # If the IAudioEndpointVolume interface is released, the callback function for volume change notification will also be released.
-        # To avoid releasing the callback function, it is as an instance variable.
-        self.audio_endpoint_volume = None
+        # To avoid releasing the callback function, it is kept until the callback is unregistered.
+        self.endpoint_volumes = {}
         # It sets to True, when the volume change callback function is registered.
         self.volume_change_callback_registered = False
+        # method name -> [call count, total seconds, max seconds]
+        self.call_stats = {}
 
     def __del__(self):
         if self.volume_change_callback_registered:
             # Error : Not released
             pass
-        if self.audio_endpoint_volume:
-            self.audio_endpoint_volume.Release()
+        self.close()
 
-    def audio_device_id_list(self) -> list:
+    def open(self):
         """
-        Enumerate Core Audio devices and return a list of GUIDs with the following process.
+        Start the COM session.
 
         1. CoInitialize()
         2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDeviceCollection = IMMDeviceEnumerator::EnumAudioEndpoints(...)
-        4. IMMDevice = IMMDeviceCollection::Item(i)
-        5. id = IMMDevice::GetId()
-        6. CoUninitialize()
         """
 
+        if self.device_enumerator is not None:
+            return
+
         comtypes.CoInitialize()
 
-        device_enumerator = comtypes.CoCreateInstance(
+        self.device_enumerator = comtypes.CoCreateInstance(
             core_audio_constants.CLSID_MMDeviceEnumerator,
             IMMDeviceEnumerator,
             comtypes.CLSCTX_INPROC_SERVER,
         )
 
-        collections = device_enumerator.EnumAudioEndpoints( # type: ignore
+    def close(self):
+        """
+        Finish the COM session.
+
+        1. IAudioEndpointVolume::Release() for all the devices
+        2. IMMDeviceEnumerator::Release()
+        3. CoUninitialize()
+        """
+
+        if self.device_enumerator is None:
+            return
+
+        self.endpoint_volumes.clear()
+        self.device_enumerator = None
+
+        comtypes.CoUninitialize()
+
+    def timing(self) -> dict:
+        """
+        Return the call count and the elapsed time of each method.
+
+        Returns:
+            dict: {method name: {'count': int, 'total': seconds, 'mean': seconds, 'max': seconds}}
+        """
+        return {
+            name: {'count': count, 'total': total, 'mean': total / count, 'max': longest}
+            for name, (count, total, longest) in self.call_stats.items()
+        }
+
+    def _enumerator(self):
+        """
+        Return the IMMDeviceEnumerator of the session. The session is opened if it is not yet.
+        """
+        if self.device_enumerator is None:
+            self.open()
+        return self.device_enumerator
+
+    def _endpoint_volume(self, device_id):
+        """
+        Return the IAudioEndpointVolume of the device.
+
+        For the first call of the device:
+        1. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
+        2. IUnknown = IMMDevice::Activate(...)
+        3. IAudioEndpointVolume = IUnknown::QueryInterface(IAudioEndpointVolume)
+        """
+
+        endpoint_volume = self.endpoint_volumes.get(device_id)
+        if endpoint_volume is None:
+            device = self._enumerator().GetDevice(device_id) # type: ignore
+            audio_endpoint_volume = device.Activate(
+                IAudioEndpointVolume._iid_, # type: ignore
+                comtypes.CLSCTX_ALL,
+                None,
+            )
+            endpoint_volume = audio_endpoint_volume.QueryInterface(IAudioEndpointVolume)
+            self.endpoint_volumes[device_id] = endpoint_volume
+        return endpoint_volume
+
+    @_timed
+    def audio_device_id_list(self) -> list:
+        """
+        Enumerate Core Audio devices and return a list of GUIDs with the following process.
+
+        1. IMMDeviceCollection = IMMDeviceEnumerator::EnumAudioEndpoints(...)
+        2. IMMDevice = IMMDeviceCollection::Item(i)
+        3. id = IMMDevice::GetId()
+        """
+
+        collections = self._enumerator().EnumAudioEndpoints( # type: ignore
             core_audio_constants.EDataFlow.eRender,
             core_audio_constants.DeviceState.ACTIVE,
             # const.DeviceState.ACTIVE | const.DeviceState.UNPLUGGED,
@@ -165,357 +320,292 @@ class CoreAudio:
             id = device.GetId()
             devices.append(id)
 
-        comtypes.CoUninitialize()
-
         return devices
 
+    @_timed
     def get_friendly_name(self, device_id) -> str:
         """
         Return the friendly name of the device from the device ID with the following process.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
-        4. IPropertyStore = IMMDevice::OpenPropertyStore(STGM_READ)
-        5. PROPERTYKEY = {A45C254E-DF1C-4EFD-8020-67D146A850E0}, 14
-        6. value = IPropertyStore::GetValue(PROPERTYKEY)
-        7. friendly_name = value.GetValue()
-        8. CoUninitialize()
+        1. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
+        2. IPropertyStore = IMMDevice::OpenPropertyStore(STGM_READ)
+        3. PROPERTYKEY = {A45C254E-DF1C-4EFD-8020-67D146A850E0}, 14
+        4. value = IPropertyStore::GetValue(PROPERTYKEY)
+        5. friendly_name = value.GetValue()
         """
 
-        comtypes.CoInitialize()
-
-        device_enumerator = comtypes.CoCreateInstance(
-            core_audio_constants.CLSID_MMDeviceEnumerator,
-            IMMDeviceEnumerator,
-            comtypes.CLSCTX_INPROC_SERVER,
-        )
+        device = self._enumerator().GetDevice(device_id) # type: ignore
+        return self._friendly_name(device)
 
-        device = device_enumerator.GetDevice(device_id) # type: ignore
+    def _friendly_name(self, device, key=None) -> str:
         property_store = device.OpenPropertyStore(core_audio_constants.STGM.STGM_READ)
+        if key is None:
+            key = _friendly_name_key()
+        value = property_store.GetValue(comtypes.pointer(key))
+        return value.GetValue()
 
-        # Refer:
-        #   https://github.com/AndreMiras/pycaw/blob/develop/pycaw/utils.py
-    
-        key = PROPERTYKEY()
-        key.fmtid = comtypes.GUID('{A45C254E-DF1C-4EFD-8020-67D146A850E0}')
-        key.pid = 14
+    def _mix_format(self, device):
+        """
+        Return (channels, sample rate, bits per sample, is float) of the shared mode mix format.
 
-        value = property_store.GetValue(comtypes.pointer(key))
-        friendly_name = value.GetValue()
+        1. IUnknown = IMMDevice::Activate(IAudioClient)
+        2. IAudioClient = IUnknown::QueryInterface(IAudioClient)
+        3. WAVEFORMATEX = IAudioClient::GetMixFormat()
+        4. CoTaskMemFree(WAVEFORMATEX)
+        """
 
-        comtypes.CoUninitialize()
+        audio_client = device.Activate(
+            IAudioClient._iid_, # type: ignore
+            comtypes.CLSCTX_ALL,
+            None,
+        ).QueryInterface(IAudioClient)
+        pointer = audio_client.GetMixFormat()
+        try:
+            address = ctypes.cast(pointer, ctypes.c_void_p).value
+            wave_format = WAVEFORMATEX.from_address(address)
+            is_float = wave_format.wFormatTag == core_audio_constants.WaveFormatTag.IEEE_FLOAT
+            if wave_format.wFormatTag == core_audio_constants.WaveFormatTag.EXTENSIBLE and wave_format.cbSize >= 22:
+                extensible = WAVEFORMATEXTENSIBLE.from_address(address)
+                is_float = extensible.SubFormat == core_audio_constants.KSDATAFORMAT_SUBTYPE_IEEE_FLOAT
+            return wave_format.nChannels, wave_format.nSamplesPerSec, wave_format.wBitsPerSample, is_float
+        finally:
+            ctypes.windll.ole32.CoTaskMemFree(pointer)
+
+    @_timed
+    def audio_device_list(self) -> list:
+        """
+        Enumerate active render devices and return a list of AudioDevice in a single pass.
+
+        1. IMMDeviceCollection = IMMDeviceEnumerator::EnumAudioEndpoints(...)
+        2. IMMDevice = IMMDeviceCollection::Item(i)
+        3. id = IMMDevice::GetId(), state = IMMDevice::GetState()
+        4. friendly_name = IMMDevice::OpenPropertyStore(STGM_READ)::GetValue(PKEY_Device_FriendlyName)
+        5. mix format = IMMDevice::Activate(IAudioClient)::GetMixFormat()
+        """
+
+        collections = self._enumerator().EnumAudioEndpoints( # type: ignore
+            core_audio_constants.EDataFlow.eRender,
+            core_audio_constants.DeviceState.ACTIVE,
+        )
+
+        key = _friendly_name_key()
+        devices = []
+
+        count = collections.GetCount()
+        for i in range(count):
+            device = collections.Item(i)
+            try:
+                mix_format = self._mix_format(device)
+            except comtypes.COMError:
+                # The device is removed while enumerating, or it can't be activated.
+                mix_format = (0, 0, 0, False)
+            devices.append(AudioDevice(device.GetId(), self._friendly_name(device, key), device.GetState(), *mix_format))
 
-        return friendly_name
+        return devices
 
+    @_timed
     def register_device_change_callback(self, callback):
         """
         Register a callback function to receive device state change notifications.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDeviceEnumerator::RegisterEndpointNotificationCallback(callback)
-        4. CoUninitialize()
+        1. IMMDeviceEnumerator::RegisterEndpointNotificationCallback(callback)
         """
 
-        comtypes.CoInitialize()
-
-        device_enumerator = comtypes.CoCreateInstance(
-            core_audio_constants.CLSID_MMDeviceEnumerator,
-            IMMDeviceEnumerator,
-            comtypes.CLSCTX_INPROC_SERVER,
-        )
-
-        ret = device_enumerator.RegisterEndpointNotificationCallback(callback) # type: ignore
+        ret = self._enumerator().RegisterEndpointNotificationCallback(callback) # type: ignore
         pass
 
-        comtypes.CoUninitialize()
-
+    @_timed
     def unregister_device_change_callback(self, callback):
         """
         Unregister a callback function to receive device state change notifications.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDeviceEnumerator::UnregisterEndpointNotificationCallback(callback)
-        4. CoUninitialize()
+        1. IMMDeviceEnumerator::UnregisterEndpointNotificationCallback(callback)
         """
 
-        comtypes.CoInitialize()
-
-        device_enumerator = comtypes.CoCreateInstance(
-            core_audio_constants.CLSID_MMDeviceEnumerator,
-            IMMDeviceEnumerator,
-            comtypes.CLSCTX_INPROC_SERVER,
-        )
-
-        ret = device_enumerator.UnregisterEndpointNotificationCallback(callback) # type: ignore
+        ret = self._enumerator().UnregisterEndpointNotificationCallback(callback) # type: ignore
         pass
 
-        comtypes.CoUninitialize()
-
+    @_timed
     def get_volume(self, device_id):
         """
         Return the master volume of the specified device.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
-        4. IUnknown = IMMDevice::Activate(...)
-        5. IAudioEndpointVolume = IUnknown::QueryInterface(IAudioEndpointVolume)
-        6. volume = IAudioEndpointVolume::GetMasterVolumeLevelScalar()
-        7. IAudioEndpointVolume::Release()
-        8. CoUninitialize()
+        1. IAudioEndpointVolume of the device (cached)
+        2. volume = IAudioEndpointVolume::GetMasterVolumeLevelScalar()
         """
 
-        comtypes.CoInitialize()
-
-        if self.audio_endpoint_volume is None:
-            device_enumerator = comtypes.CoCreateInstance(
-                core_audio_constants.CLSID_MMDeviceEnumerator,
-                IMMDeviceEnumerator,
-                comtypes.CLSCTX_INPROC_SERVER,
-            )
-
-            device = device_enumerator.GetDevice(device_id) # type: ignore
-            self.audio_endpoint_volume = device.Activate(
-                IAudioEndpointVolume._iid_, # type: ignore
-                comtypes.CLSCTX_ALL,
-                None,
-            )
-
-        endpoint_volume = self.audio_endpoint_volume.QueryInterface(IAudioEndpointVolume)
+        endpoint_volume = self._endpoint_volume(device_id)
 
         volume = endpoint_volume.GetMasterVolumeLevelScalar()
 
-        # Don't release the IAudioEndpointVolume interface here.
-        # self.audio_endpoint_volume.Release()
-
-        comtypes.CoUninitialize()
-
         return volume
 
+    @_timed
     def get_mute(self, device_id):
         """
         Return the mute state of the specified device.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
-        4. IUnknown = IMMDevice::Activate(...)
-        5. IAudioEndpointVolume = IUnknown::QueryInterface(IAudioEndpointVolume)
-        6. mute = IAudioEndpointVolume::GetMute()
-        7. IAudioEndpointVolume::Release()
-        8. CoUninitialize()
+        1. IAudioEndpointVolume of the device (cached)
+        2. mute = IAudioEndpointVolume::GetMute()
         """
 
-        comtypes.CoInitialize()
-
-        if self.audio_endpoint_volume is None:
-            device_enumerator = comtypes.CoCreateInstance(
-                core_audio_constants.CLSID_MMDeviceEnumerator,
-                IMMDeviceEnumerator,
-                comtypes.CLSCTX_INPROC_SERVER,
-            )
-
-            device = device_enumerator.GetDevice(device_id) # type: ignore
-            self.audio_endpoint_volume = device.Activate(
-                IAudioEndpointVolume._iid_, # type: ignore
-                comtypes.CLSCTX_ALL,
-                None,
-            )
-
-        endpoint_volume = self.audio_endpoint_volume.QueryInterface(IAudioEndpointVolume)
+        endpoint_volume = self._endpoint_volume(device_id)
 
         mute = endpoint_volume.GetMute()
 
-        # Don't release the IAudioEndpointVolume interface here.
-        # self.audio_endpoint_volume.Release()
-
-        comtypes.CoUninitialize()
-
         return True if mute==1 else False
 
+    @_timed
     def set_volume(self, device_id, volume: float):
         """
         Set the master volume of the specified device.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
-        4. IUnknown = IMMDevice::Activate(...)
-        5. IAudioEndpointVolume = IUnknown::QueryInterface(IAudioEndpointVolume)
-        6. volume = IAudioEndpointVolume::SetMasterVolumeLevelScalar(volume)
-        7. IAudioEndpointVolume::Release()
-        8. CoUninitialize()
+        1. IAudioEndpointVolume of the device (cached)
+        2. IAudioEndpointVolume::SetMasterVolumeLevelScalar(volume)
         """
 
-        comtypes.CoInitialize()
-
-        if self.audio_endpoint_volume is None:
-            device_enumerator = comtypes.CoCreateInstance(
-                core_audio_constants.CLSID_MMDeviceEnumerator,
-                IMMDeviceEnumerator,
-                comtypes.CLSCTX_INPROC_SERVER,
-            )
-
-            device = device_enumerator.GetDevice(device_id) # type: ignore
-            self.audio_endpoint_volume = device.Activate(
-                IAudioEndpointVolume._iid_, # type: ignore
-                comtypes.CLSCTX_ALL,
-                None,
-            )
-
-        endpoint_volume = self.audio_endpoint_volume.QueryInterface(IAudioEndpointVolume)
+        endpoint_volume = self._endpoint_volume(device_id)
 
-        guid = device_id.split('}.')[1]
-        endpoint_volume.SetMasterVolumeLevelScalar(volume, GUID(MY_UUID)) # GUID(guid))
+        endpoint_volume.SetMasterVolumeLevelScalar(volume, GUID(MY_UUID))
         # It is possible to set GUID_NULL as a GUID to pass to the IAudioEndpointVolumeCallback::OnNotify.
         # It's a trial to use a unique GUID to distinguish internal changes to others.
 
-        # Don't release the IAudioEndpointVolume interface here.
-        # self.audio_endpoint_volume.Release()
-
-        comtypes.CoUninitialize()
-
+    @_timed
     def set_mute(self, device_id, mute: bool):
         """
         Set the mute state of the specified device.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
-        4. IUnknown = IMMDevice::Activate(...)
-        5. IAudioEndpointVolume = IUnknown::QueryInterface(IAudioEndpointVolume)
-        6. mute = IAudioEndpointVolume::SetMute(mute)
-        7. IAudioEndpointVolume::Release()
-        8. CoUninitialize()
+        1. IAudioEndpointVolume of the device (cached)
+        2. IAudioEndpointVolume::SetMute(mute)
         """
 
-        comtypes.CoInitialize()
-
-        if self.audio_endpoint_volume is None:
-            device_enumerator = comtypes.CoCreateInstance(
-                core_audio_constants.CLSID_MMDeviceEnumerator,
-                IMMDeviceEnumerator,
-                comtypes.CLSCTX_INPROC_SERVER,
-            )
-
-            device = device_enumerator.GetDevice(device_id) # type: ignore
-            self.audio_endpoint_volume = device.Activate(
-                IAudioEndpointVolume._iid_, # type: ignore
-                comtypes.CLSCTX_ALL,
-                None,
-            )
-
-        endpoint_volume = self.audio_endpoint_volume.QueryInterface(IAudioEndpointVolume)
+        endpoint_volume = self._endpoint_volume(device_id)
 
-        guid = device_id.split('}.')[1]
-        endpoint_volume.SetMute(mute, GUID(MY_UUID)) # GUID(guid))
+        endpoint_volume.SetMute(mute, GUID(MY_UUID))
         # It is possible to set GUID_NULL as a GUID to pass to the IAudioEndpointVolumeCallback::OnNotify.
         # It's a trial to use a unique GUID to distinguish internal changes to others.
 
-        # self.audio_endpoint_volume.Release()
-
-        comtypes.CoUninitialize()
-
+    @_timed
     def register_volume_change_callback(self, device_id, callback):
         """
         Register a callback function to receive volume change notifications for the specified device.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
-        4. IUnknown = IMMDevice::Activate(...)
-        5. IAudioEndpointVolume = IUnknown::QueryInterface(IAudioEndpointVolume)
-        6. IAudioEndpointVolume::RegisterControlChangeNotify(callback)
-        7. IAudioEndpointVolume::Release()
-        8. CoUninitialize()
+        1. IAudioEndpointVolume of the device (cached)
+        2. IAudioEndpointVolume::RegisterControlChangeNotify(callback)
         """
 
         if self.volume_change_callback_registered:
             # Error : Already registered
             return
 
-        comtypes.CoInitialize()
-
-        if self.audio_endpoint_volume is None:
-            device_enumerator = comtypes.CoCreateInstance(
-                core_audio_constants.CLSID_MMDeviceEnumerator,
-                IMMDeviceEnumerator,
-                comtypes.CLSCTX_INPROC_SERVER,
-            )
-
-            device = device_enumerator.GetDevice(device_id) # type: ignore
-            self.audio_endpoint_volume = device.Activate(
-                IAudioEndpointVolume._iid_, # type: ignore
-                comtypes.CLSCTX_ALL,
-                None,
-            )
-
-        endpoint_volume = self.audio_endpoint_volume.QueryInterface(IAudioEndpointVolume)
+        endpoint_volume = self._endpoint_volume(device_id)
 
         ret = endpoint_volume.RegisterControlChangeNotify(callback)
 
-        # Don't release the IAudioEndpointVolume interface here.
-        # self.audio_endpoint_volume.Release()
-
-        comtypes.CoUninitialize()
-
         self.volume_change_callback_registered = True
 
+    @_timed
     def unregister_volume_change_callback(self, device_id, callback):
         """
         Unregister a callback function to receive volume change notifications for the specified device.
 
-        1. CoInitialize()
-        2. IMMDeviceEnumerator = CoCreateInstance(...)
-        3. IMMDevice = IMMDeviceEnumerator::GetDevice(ID)
-        4. IUnknown = IMMDevice::Activate(...)
-        5. IAudioEndpointVolume = IUnknown::QueryInterface(IAudioEndpointVolume)
-        6. IAudioEndpointVolume::UnregisterControlChangeNotify(callback)
-        7. IAudioEndpointVolume::Release()
-        8. CoUninitialize()
+        1. IAudioEndpointVolume of the device (cached)
+        2. IAudioEndpointVolume::UnregisterControlChangeNotify(callback)
+        3. IAudioEndpointVolume::Release()
         """
 
         if not self.volume_change_callback_registered:
             # Error : Not registered
             return
 
-        if self.audio_endpoint_volume is None:
+        endpoint_volume = self.endpoint_volumes.get(device_id)
+        if endpoint_volume is None:
             return
 
-        comtypes.CoInitialize()
-
-        # device_enumerator = comtypes.CoCreateInstance(
-        #     const.CLSID_MMDeviceEnumerator,
-        #     IMMDeviceEnumerator,
-        #     comtypes.CLSCTX_INPROC_SERVER,
-        # )
-        # 
-        # device = device_enumerator.GetDevice(device_id)
-        # self.audio_endpoint_volume = device.Activate(
-        #     IAudioEndpointVolume._iid_,
-        #     comtypes.CLSCTX_ALL,
-        #     None,
-        # )
-
-        endpoint_volume = self.audio_endpoint_volume.QueryInterface(IAudioEndpointVolume)
-
         ret = endpoint_volume.UnregisterControlChangeNotify(callback)
         pass
 
-        self.audio_endpoint_volume.Release()
         # _CAUTION_ : If it is called from callback function, the following line causes deadlock
-        self.audio_endpoint_volume = None
-
-        comtypes.CoUninitialize()
+        del self.endpoint_volumes[device_id]
 
         self.volume_change_callback_registered = False
 
     def release(self):
-        if self.audio_endpoint_volume:
-            self.audio_endpoint_volume.Release()
-        self.audio_endpoint_volume = None
+        """
+        Release the cached IAudioEndpointVolume interfaces.
+        """
+        self.endpoint_volumes.clear()
+
 
+class VolumeWriter:
+    """
+    Write the master volume of devices from a background thread.
+
+    set_volume() only stores the latest request and returns immediately.
+    The worker thread writes at most once per interval, so rapid changes (e.g. dragging a slider) are coalesced
+    and the COM calls are bounded regardless of the request rate.
+    The latest volume is written with the latest mute state requested in the interval.
+    The worker thread has its own CoreAudio session, because a COM session belongs to the thread which opened it.
+    """
 
+    def __init__(self, interval=1 / 60):
+        """
+        Args:
+            interval (float): The minimum interval between writes in seconds.
+        """
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.pending = {}   # device ID -> (volume, mute)
+        self.running = True
+        self.requests = 0   # set_volume() calls
+        self.writes = 0     # endpoint writes
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def set_volume(self, device_id, volume: float, mute=None):
+        """
+        Request to set the master volume, and the mute state if it is not None.
+        """
+        with self.condition:
+            if mute is None and device_id in self.pending:
+                # A mute requested in the same interval is still written.
+                mute = self.pending[device_id][1]
+            self.pending[device_id] = (volume, mute)
+            self.requests += 1
+            self.condition.notify()
+
+    def close(self):
+        """
+        Write the pending request and stop the worker thread.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        ca = CoreAudio()
+        ca.open()
+        try:
+            while True:
+                with self.condition:
+                    while self.running and not self.pending:
+                        self.condition.wait()
+                    if not self.pending:
+                        break
+                    pending = self.pending
+                    self.pending = {}
+
+                for device_id, (volume, mute) in pending.items():
+                    try:
+                        ca.set_volume(device_id, volume)
+                        if mute is not None:
+                            ca.set_mute(device_id, mute)
+                    except comtypes.COMError:
+                        # The device has been removed
+                        ca.release()
+                    self.writes += 1
+
+                time.sleep(self.interval)
+        finally:
+            ca.close()
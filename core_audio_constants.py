@@ -37,3 +37,13 @@ class STGM:
     STGM_READWRITE = 2
 
 
+class WaveFormatTag:
+    # Refer:
+    #   https://learn.microsoft.com/ja-jp/windows/win32/api/mmreg/ns-mmreg-waveformatextensible
+    PCM = 0x0001
+    IEEE_FLOAT = 0x0003
+    EXTENSIBLE = 0xFFFE
+
+
+KSDATAFORMAT_SUBTYPE_PCM = GUID('{00000001-0000-0010-8000-00AA00389B71}')
+KSDATAFORMAT_SUBTYPE_IEEE_FLOAT = GUID('{00000003-0000-0010-8000-00AA00389B71}')
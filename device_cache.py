@@ -0,0 +1,99 @@
+import threading
+
+import comtypes
+import pyaudio
+
+from core_audio import CoreAudio
+
+
+class DeviceCache:
+    """
+    Map Core Audio friendly names to PyAudio device information of the MME host API.
+
+    The devices are enumerated once and kept until invalidate() is called,
+    so repeated lookups don't initialize PortAudio or walk the device list.
+    The information of a device has 'mixSampleRate' and 'mixFormat' (bits per sample, is float) of the Core Audio mix format,
+    if it is known. MME accepts any rate and format and converts them to the mix format, so it is the native format of the device.
+    """
+
+    HOST_API = 'MME'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_name = None   # MME device name -> device information
+        self.lengths = []     # lengths of the device names, longest first
+        self.resolved = {}    # friendly name -> device information
+        self.mix_formats = {} # friendly name -> (sample rate, bits per sample, is float)
+
+    def invalidate(self):
+        """
+        Discard the cache. It should be called when a device state is changed.
+        """
+        with self.lock:
+            self.by_name = None
+            self.lengths = []
+            self.resolved = {}
+            self.mix_formats = {}
+
+    def get(self, device_friendly_name):
+        """
+        Return the PyAudio device information regarding the device friendly name, or None.
+
+        MME truncates device names to 31 characters, so a device matches if its name is a prefix of the friendly name.
+        The longest match wins, and only the distinct name lengths are tried instead of every device.
+        """
+        with self.lock:
+            if self.by_name is None:
+                self._build()
+            if device_friendly_name in self.resolved:
+                return self.resolved[device_friendly_name]
+
+            device = None
+            for length in self.lengths:
+                device = self.by_name.get(device_friendly_name[:length])
+                if device is not None:
+                    break
+            if device is not None and device_friendly_name in self.mix_formats:
+                rate, bits, is_float = self.mix_formats[device_friendly_name]
+                device = dict(device, mixSampleRate=float(rate), mixFormat=(bits, is_float))
+            self.resolved[device_friendly_name] = device
+            return device
+
+    def devices(self) -> list:
+        """
+        Return the information of all the output devices.
+        """
+        with self.lock:
+            if self.by_name is None:
+                self._build()
+            return list(self.by_name.values())
+
+    def _build(self):
+        self.by_name = {}
+        p = pyaudio.PyAudio()
+        try:
+            host_api_count = p.get_host_api_count()
+            for i in range(host_api_count):
+                host_api = p.get_host_api_info_by_index(i)
+                if host_api['name'] != self.HOST_API:
+                    continue
+                device_count = int(host_api['deviceCount'])
+                for j in range(device_count):
+                    device = p.get_device_info_by_host_api_device_index(i, j)
+                    if int(device['maxOutputChannels']) > 0:
+                        # The first one is used for the same name, as the enumeration order.
+                        self.by_name.setdefault(str(device['name']), device)
+        finally:
+            p.terminate()
+        self.lengths = sorted({len(name) for name in self.by_name}, reverse=True)
+
+        ca = CoreAudio()
+        try:
+            for device in ca.audio_device_list():
+                if device.bits_per_sample:
+                    self.mix_formats[device.friendly_name] = (device.sample_rate, device.bits_per_sample, device.is_float)
+        except (OSError, comtypes.COMError):
+            # The devices are played without knowing their mix formats
+            pass
+        finally:
+            ca.close()
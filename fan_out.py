@@ -0,0 +1,293 @@
+"""
+Play many WAV files to many devices at once without the GUI.
+
+The jobs of a manifest are started at their offsets from the start of the run,
+each on a free player process of a bounded pool. The player processes are pinned to cores,
+and the device names are resolved once for all of them.
+A report of each job and of the whole run is printed or written as JSON.
+
+The manifest is a CSV file with the header file,device,start,volume or a JSON list of objects with these keys.
+    file   : the path of the WAV file, relative to the manifest
+    device : the friendly name of the device
+    start  : seconds from the start of the run, 0 by default
+    volume : the linear gain of the file, 1 by default
+
+Usage:
+    python fan_out.py <manifest> [--players N] [--no-pin] [--engine blocking|callback] [--output FILE]
+                                 [--backend portaudio|null|wav] [--speed FACTOR] [--out FOLDER]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+import psutil
+
+from audio_player import AudioPlayer, Engine, PlayerEvent
+from output_backend import PortAudioBackend, NullBackend, WavFileBackend
+from player_stats import percentiles
+
+
+class Job(NamedTuple):
+    file: str
+    device: str
+    start: float = 0.0
+    volume: float = 1.0
+
+
+def load_manifest(path) -> list:
+    """
+    Return the jobs of a manifest file.
+
+    Raises:
+        ValueError: A job has no file or device, or a value isn't a number.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    jobs = []
+    for i, row in enumerate(rows):
+        if not row.get('file') or not row.get('device'):
+            raise ValueError(f'Job {i} : file and device are required')
+        jobs.append(Job(
+            os.path.join(folder, row['file']),
+            row['device'],
+            float(row.get('start') or 0),
+            float(row['volume']) if row.get('volume') not in (None, '') else 1.0,
+        ))
+    return jobs
+
+
+class _Slot:
+    """
+    A player process of the pool and the job it plays.
+    """
+
+    def __init__(self, index, player, core):
+        self.index = index
+        self.player = player
+        self.core = core
+        self.job = None      # the report of the job being played
+        self.before = None   # player_stats() before the job
+
+
+class FanOut:
+    """
+    Pool of AudioPlayer processes which play jobs concurrently.
+    """
+
+    # Player events which end a job
+    END_EVENTS = {
+        PlayerEvent.FINISHED: 'finished',
+        PlayerEvent.ERROR: 'error',
+        PlayerEvent.DEVICE_LOST: 'device_lost',
+        PlayerEvent.STOPPED: 'stopped',
+    }
+
+    def __init__(self, players, backends, engine=Engine.BLOCKING, pin=True):
+        """
+        Args:
+            players (int): The number of the player processes.
+            backends: A function which returns the output backend of the player of the index.
+                Returning the same PortAudioBackend shares its device cache between the players.
+            pin (bool): Pin each player process to a core, round robin over the cores available to this process.
+        """
+        self.condition = threading.Condition()
+        self.start_time = 0.0
+        cores = sorted(psutil.Process().cpu_affinity()) if pin and hasattr(psutil.Process, 'cpu_affinity') else []
+        self.slots = []
+        for i in range(players):
+            # Only the index is bound, the slot is looked up when the event comes.
+            player = AudioPlayer(engine=engine, backend=backends(i), event_callback=lambda event, info, i=i: self._on_event(i, event, info))
+            core = None
+            if cores:
+                core = cores[i % len(cores)]
+                psutil.Process(player.play_process.pid).cpu_affinity([core])
+            self.slots.append(_Slot(i, player, core))
+        self.free = list(self.slots)
+        self.lost = []   # the slots whose player processes have exited, they take no more jobs
+
+    def close(self):
+        for slot in self.slots:
+            slot.player.close()
+
+    def _now(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def _on_event(self, index, event, info):
+        """
+        Record the events of the job of a player. (Listener thread of the player)
+        """
+        with self.condition:
+            slot = self.slots[index]
+            job = slot.job
+            if job is None:
+                if slot.player.exited and slot in self.free:
+                    # An idle player has exited
+                    self.free.remove(slot)
+                    self.lost.append(slot)
+                    self.condition.notify_all()
+                return
+            if event == PlayerEvent.STARTED:
+                job['started'] = self._now()
+                job['start_delay_ms'] = (job['started'] - job['start']) * 1000
+            elif event == PlayerEvent.STALLED:
+                job['stalls'] += 1
+            elif event in self.END_EVENTS:
+                job['finished'] = self._now()
+                job['result'] = self.END_EVENTS[event]
+                if info:
+                    job['message'] = str(info)
+                stats = slot.player.player_stats()
+                job['underruns'] = stats['underruns'] - slot.before['underruns']
+                job['underflows'] = stats['underflows'] - slot.before['underflows']
+                if job['started'] is not None:
+                    job['first_sample_ms'] = stats['first_sample_ms']
+                    job['seconds'] = job['finished'] - job['started']
+                slot.job = None
+                if slot.player.exited:
+                    self.lost.append(slot)
+                else:
+                    self.free.append(slot)
+                self.condition.notify_all()
+
+    def run(self, jobs):
+        """
+        Play the jobs, each at its start offset or as soon as a player is free after it.
+
+        Returns:
+            (list, dict): The reports of the jobs in the order of the manifest, and the report of the run.
+        """
+        reports = [{
+            'index': i,
+            'file': job.file,
+            'device': job.device,
+            'start': job.start,
+            'volume': job.volume,
+            'player': None,
+            'core': None,
+            'dispatched': None,
+            'started': None,
+            'finished': None,
+            'start_delay_ms': None,
+            'seconds': None,
+            'result': None,
+            'message': '',
+            'stalls': 0,
+            'underruns': 0,
+            'underflows': 0,
+            'first_sample_ms': None,
+        } for i, job in enumerate(jobs)]
+
+        # Resolved once for all the players, unknown devices fail before the run.
+        devices = {}
+        for job in jobs:
+            if job.device not in devices:
+                devices[job.device] = self.slots[0].player._get_device(job.device)
+
+        self.start_time = time.perf_counter()
+        for i in sorted(range(len(jobs)), key=lambda i: jobs[i].start):
+            job = jobs[i]
+            report = reports[i]
+            if devices[job.device] is None:
+                report['result'] = 'error'
+                report['message'] = f'Device not found : {job.device}'
+                continue
+            delay = job.start - self._now()
+            if delay > 0:
+                time.sleep(delay)
+            with self.condition:
+                self.condition.wait_for(lambda: self.free or len(self.lost) == len(self.slots))
+                if not self.free:
+                    report['result'] = 'error'
+                    report['message'] = 'All the player processes have exited'
+                    continue
+                slot = self.free.pop(0)
+                slot.job = report
+            report['player'] = slot.index
+            report['core'] = slot.core
+            report['dispatched'] = self._now()
+            slot.before = slot.player.player_stats()
+            # The player of the last job has finished or failed, let it load again.
+            slot.player.audio_finished()
+            slot.player.play_audio(job.device, job.file, gain=job.volume)
+
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.free) + len(self.lost) == len(self.slots))
+        elapsed = self._now()
+
+        delays = [r['start_delay_ms'] for r in reports if r['start_delay_ms'] is not None]
+        summary = {
+            'jobs': len(reports),
+            'finished': sum(r['result'] == 'finished' for r in reports),
+            'failed': sum(r['result'] != 'finished' for r in reports),
+            'players': len(self.slots),
+            'cores': sorted({slot.core for slot in self.slots if slot.core is not None}),
+            'wall_seconds': elapsed,
+            'start_delay_ms': percentiles(delays),
+            'max_start_delay_ms': max(delays) if delays else None,
+            'underruns': sum(r['underruns'] for r in reports),
+            'underflows': sum(r['underflows'] for r in reports),
+            'stalls': sum(r['stalls'] for r in reports),
+            'lost_players': len(self.lost),
+        }
+        return reports, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play the jobs of a manifest to many devices at once.')
+    parser.add_argument('manifest', help='CSV or JSON file of the jobs')
+    parser.add_argument('--players', type=int, default=None, help='the number of player processes, the core count by default')
+    parser.add_argument('--no-pin', action='store_true', help="don't pin the player processes to cores")
+    parser.add_argument('--engine', default='blocking', choices=('blocking', 'callback'))
+    parser.add_argument('--backend', default='portaudio', choices=('portaudio', 'null', 'wav'))
+    parser.add_argument('--speed', type=float, default=1.0, help='the clock of the null and wav backends, 0 to not wait')
+    parser.add_argument('--out', default='.', help='the folder of the files of the wav backend')
+    parser.add_argument('--output', help='the JSON file of the report, printed if not given')
+    args = parser.parse_args()
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f'Bad manifest : {e}', file=sys.stderr)
+        return 1
+    if not jobs:
+        print('No jobs', file=sys.stderr)
+        return 1
+
+    shared = PortAudioBackend()
+    def backends(i):
+        if args.backend == 'null':
+            return NullBackend(speed=args.speed)
+        if args.backend == 'wav':
+            # The streams of each player are numbered by the player
+            return WavFileBackend(os.path.join(args.out, f'player{i}-{{index:04d}}-{{device}}.wav'), speed=args.speed)
+        return shared
+
+    players = min(args.players or os.cpu_count() or 1, len(jobs))
+    engine = Engine.CALLBACK if args.engine == 'callback' else Engine.BLOCKING
+    fan_out = FanOut(players, backends, engine, pin=not args.no_pin)
+    try:
+        reports, summary = fan_out.run(jobs)
+    finally:
+        fan_out.close()
+
+    result = {'summary': summary, 'jobs': reports}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
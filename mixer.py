@@ -0,0 +1,157 @@
+import numpy as np
+
+import sample_format
+from pipeline import Pipeline
+from resampler import Quality
+
+
+def soft_clip(samples, threshold=0.8):
+    """
+    Limit float samples to (-1.0, 1.0) in place without the hard edges of clipping.
+
+    The samples under the threshold are kept as they are, and the ones over it are bent by tanh,
+    so the curve and its slope are continuous at the threshold.
+
+    Returns:
+        The samples.
+    """
+    over = np.abs(samples) > threshold
+    if over.any():
+        knee = 1.0 - threshold
+        x = samples[over]
+        samples[over] = np.sign(x) * (threshold + knee * np.tanh((np.abs(x) - threshold) / knee))
+    return samples
+
+
+class _Voice:
+    """
+    A source of the mixer and the frames converted from it, not mixed yet.
+    """
+
+    def __init__(self, source, pipeline, chunk):
+        self.source = source
+        self.pipeline = pipeline
+        self.chunk = chunk
+        self.rest = np.zeros((0, pipeline.out_channels), dtype=np.float32)
+        self.ended = False   # all the frames of the source have been converted
+
+    def mix_into(self, out) -> bool:
+        """
+        Add the next frames to out.
+
+        Returns:
+            bool: False if the last frame of the source has been added.
+        """
+        frames = len(out)
+        while len(self.rest) < frames and not self.ended:
+            data = self.source.read(self.chunk)
+            if not data:
+                converted = self.pipeline.flush_float()
+                self.ended = True
+            else:
+                converted = self.pipeline.process_float(data)
+            if len(converted):
+                self.rest = np.concatenate((self.rest, converted)) if len(self.rest) else converted
+        n = min(frames, len(self.rest))
+        out[:n] += self.rest[:n]
+        self.rest = self.rest[n:]
+        return not self.ended or len(self.rest) > 0
+
+    def close(self):
+        self.source.close()
+
+
+class Mixer:
+    """
+    Mix any number of voices into one stream, with the interface of WavReader used by the player.
+
+    A voice is a WavReader or a CachedPcm of any format, converted to the format of the mixer by its own Pipeline with its gain.
+    read() sums the voices in float32 block by block, bends the peaks by soft_clip(), and converts the sum to the sample format.
+    An integer sum of fewer bits than float32 is dithered by TpdfDither.
+    Silence is returned while there are no voices, so the stream keeps running and a new voice is heard after the output latency.
+    """
+
+    # The channels of the mix, limited by the device, and the default sample width
+    CHANNELS = 2
+    SAMPLE_WIDTH = 2
+
+    def __init__(self, channels, rate, sample_width=SAMPLE_WIDTH, quality=Quality.MEDIUM, voice_finished=None, threshold=0.8, is_float=False):
+        """
+        Args:
+            quality (str): The resampling quality of the voices of other rates.
+            voice_finished: Called as voice_finished(voice_id) when the last frame of a voice has been mixed.
+            threshold (float): The level where soft_clip() starts to bend the sum.
+            is_float (bool): Return the mix as IEEE floats.
+        """
+        self.channels = channels
+        self.rate = rate
+        self.sample_width = sample_width
+        self.is_float = is_float
+        self.dither = None
+        if not is_float and sample_format.precision(sample_width) < sample_format.FLOAT_BITS:
+            self.dither = sample_format.TpdfDither()
+        self.frame_size = channels * sample_width
+        self.frames = 0          # the length is unknown
+        self.quality = quality or Quality.MEDIUM
+        self.voice_finished = voice_finished
+        self.threshold = threshold
+        self.voices = {}         # voice id: _Voice
+        self.position = 0
+        self.block = np.zeros((0, channels), dtype=np.float32)
+
+    def add(self, voice_id, source, gain=1.0, chunk=1024):
+        """
+        Start to mix a source at the next block.
+
+        Raises:
+            ValueError: The format of the source can't be converted.
+        """
+        if source.sample_width not in ((4, 8) if source.is_float else (1, 2, 3, 4)):
+            raise ValueError(f'Unsupported sample width : {source.sample_width}')
+        pipeline = Pipeline(source.channels, source.rate, source.sample_width, self.channels, self.rate, self.quality, gain=gain, is_float=source.is_float)
+        self.remove(voice_id)
+        self.voices[voice_id] = _Voice(source, pipeline, chunk)
+
+    def remove(self, voice_id) -> bool:
+        """
+        Stop mixing a voice.
+
+        Returns:
+            bool: False if the voice isn't mixed.
+        """
+        voice = self.voices.pop(voice_id, None)
+        if voice is None:
+            return False
+        voice.close()
+        return True
+
+    def read(self, frames):
+        """
+        Return the next frames of the mix.
+
+        Returns:
+            A read-only bytes-like object of exactly the frames.
+        """
+        if len(self.block) < frames:
+            self.block = np.zeros((frames, self.channels), dtype=np.float32)
+        out = self.block[:frames]
+        out.fill(0.0)
+        for voice_id, voice in list(self.voices.items()):
+            if not voice.mix_into(out):
+                self.remove(voice_id)
+                if self.voice_finished:
+                    self.voice_finished(voice_id)
+        self.position += frames
+        return sample_format.from_float(soft_clip(out, self.threshold), self.sample_width, self.is_float, self.dither)
+
+    def seek(self, frame):
+        # A mix has no position to move to
+        pass
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        for voice in self.voices.values():
+            voice.close()
+        self.voices.clear()
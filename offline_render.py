@@ -0,0 +1,200 @@
+"""
+Render WAV files to the frames the player would pass to a device, without waiting for a clock.
+
+The files are converted by the Pipeline of the player with the same settings,
+so an output is identical to what WavFileBackend records while the player plays the file.
+The files are rendered in parallel by a pool of processes, one per core by default.
+
+Usage:
+    python offline_render.py <file or folder>... --out FOLDER [--device NAME | --channels N --rate HZ]
+                             [--quality fast|medium|best|none] [--gain GAIN] [--workers N] [--json]
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+from typing import NamedTuple
+
+from pipeline import Pipeline, stream_format, stream_sample_format, is_stream_format
+from resampler import Quality
+from wav_reader import WavReader, WavError
+from wav_writer import WavWriter
+
+
+# Frames read at a time, as the player
+CHUNK = 2 ** 10
+
+
+class RenderResult(NamedTuple):
+    """
+    Result of a file returned by render_file()
+    """
+    source: str
+    output: str
+    frames: int          # source frames
+    out_frames: int
+    seconds: float       # duration of the source
+    cpu_seconds: float   # CPU time of the worker to render it
+    error: str = ''      # the message if it failed, the output is removed then
+
+
+def render_file(source, output, device, quality=Quality.MEDIUM, gain=1.0) -> RenderResult:
+    """
+    Render a WAV file to the frames passed to the device, and write them to a WAV file.
+
+    Args:
+        source (str): The path of the WAV file.
+        output (str): The path of the rendered WAV file.
+        device (dict): The device information, 'maxOutputChannels', the native rate and 'mixFormat' if any are used.
+        quality (str): Quality.FAST, MEDIUM or BEST, or None to keep the rate of the file. The same as AudioPlayer.
+        gain (float): The linear gain. The same as AudioPlayer.
+    """
+    start = time.process_time()
+    frames = out_frames = 0
+    seconds = 0.0
+    try:
+        with WavReader(source) as wf:
+            frames = wf.frames
+            seconds = wf.frames / wf.rate
+            channels, rate = stream_format(device, wf.channels, wf.rate, quality)
+            # The formats of PortAudio, as the player negotiates them with the device
+            sample_width, is_float = stream_sample_format(device, wf.sample_width, wf.is_float, is_stream_format)
+            pipeline = Pipeline(wf.channels, wf.rate, wf.sample_width, channels, rate, quality or Quality.MEDIUM, sample_width, gain, wf.is_float, is_float)
+            frame_size = channels * sample_width
+            with WavWriter(output, channels, rate, sample_width, is_float) as out:
+                while True:
+                    data = wf.read(CHUNK)
+                    last = not data
+                    data = pipeline.flush() if last else pipeline.process(data)
+                    if data:
+                        out.writeframesraw(data)
+                        out_frames += len(data) // frame_size
+                    if last:
+                        break
+    except (OSError, WavError) as e:
+        if os.path.exists(output):
+            os.remove(output)
+        return RenderResult(source, output, frames, 0, seconds, time.process_time() - start, str(e))
+    return RenderResult(source, output, frames, out_frames, seconds, time.process_time() - start)
+
+
+def output_paths(sources, folder) -> list:
+    """
+    Return the paths of the outputs in the folder, named after the sources.
+
+    A name used by an earlier source gets a number, so the outputs don't overwrite each other.
+    """
+    used = set()
+    paths = []
+    for source in sources:
+        stem, ext = os.path.splitext(os.path.basename(source))
+        name = stem + ext
+        n = 1
+        while name.lower() in used:
+            n += 1
+            name = f'{stem}-{n}{ext}'
+        used.add(name.lower())
+        paths.append(os.path.join(folder, name))
+    return paths
+
+
+def render(sources, folder, device, quality=Quality.MEDIUM, gain=1.0, workers=None, progress=None):
+    """
+    Render the files in parallel.
+
+    Args:
+        sources: The paths of the WAV files.
+        folder (str): The folder of the outputs, see output_paths().
+        workers (int): The number of the processes, os.cpu_count() if None.
+        progress: Called as progress(done, total, RenderResult) when each file is finished.
+
+    Returns:
+        (list, dict): RenderResult of the files in the order of completion, and the throughput statistics.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(folder, exist_ok=True)
+    results = []
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_file, source, output, device, quality, gain) for source, output in zip(sources, output_paths(sources, folder))]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if progress:
+                progress(len(results), len(futures), result)
+    elapsed = time.perf_counter() - start
+
+    rendered = [r for r in results if not r.error]
+    seconds = sum(r.seconds for r in rendered)
+    cpu_seconds = sum(r.cpu_seconds for r in results)
+    statistics = {
+        'files':             len(results),
+        'failed':            len(results) - len(rendered),
+        'workers':           workers,
+        'wall_seconds':      elapsed,
+        'cpu_seconds':       cpu_seconds,
+        'audio_seconds':     seconds,
+        'realtime_factor':   seconds / elapsed if elapsed else 0.0,
+        'frames_per_second': sum(r.frames for r in rendered) / elapsed if elapsed else 0.0,
+        'out_frames':        sum(r.out_frames for r in rendered),
+        'parallelism':       cpu_seconds / elapsed if elapsed else 0.0,  # cores kept busy on average
+    }
+    return results, statistics
+
+
+def _wav_files(paths) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted((name for name in os.listdir(path) if name.lower().endswith('.wav')), key=str.lower)
+            files.extend(os.path.join(path, name) for name in names)
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render WAV files to the frames the player passes to a device.')
+    parser.add_argument('paths', nargs='+', help='WAV files, or folders of them')
+    parser.add_argument('--out', required=True, help='the folder of the rendered files')
+    parser.add_argument('--device', help='the friendly name of the device to take its channels and rate from')
+    parser.add_argument('--channels', type=int, default=2, help='the channels of the device, if --device is not given')
+    parser.add_argument('--rate', type=int, default=48000, help='the rate of the device, if --device is not given')
+    parser.add_argument('--quality', default=Quality.MEDIUM, choices=(Quality.FAST, Quality.MEDIUM, Quality.BEST, 'none'))
+    parser.add_argument('--gain', type=float, default=1.0, help='the linear gain')
+    parser.add_argument('--workers', type=int, default=None, help='the number of processes, the core count by default')
+    parser.add_argument('--json', action='store_true', help='print the statistics as JSON')
+    args = parser.parse_args()
+
+    if args.device:
+        # PortAudio is needed only to look up the device
+        from device_cache import DeviceCache
+        device = DeviceCache().get(args.device)
+        if device is None:
+            print(f'No device : {args.device}', file=sys.stderr)
+            return 1
+    else:
+        device = {'name': 'render', 'maxOutputChannels': args.channels, 'defaultSampleRate': float(args.rate)}
+    quality = None if args.quality == 'none' else args.quality
+
+    def progress(done, total, result):
+        if result.error:
+            print(f'[{done}/{total}] {result.source} : {result.error}', file=sys.stderr, flush=True)
+        elif not args.json:
+            print(f'[{done}/{total}] {result.source} -> {result.output} ({result.seconds / max(result.cpu_seconds, 1e-9):.0f}x real time)', flush=True)
+
+    files = _wav_files(args.paths)
+    results, statistics = render(files, args.out, device, quality, args.gain, args.workers, progress)
+    if args.json:
+        print(json.dumps(statistics))
+    else:
+        for key, value in statistics.items():
+            print(f'{key:17} : {value}')
+    return 1 if statistics['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
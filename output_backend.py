@@ -0,0 +1,441 @@
+import threading
+import time
+
+import pyaudio
+
+from device_cache import DeviceCache
+from pipeline import is_stream_format
+from wav_writer import WavWriter
+
+
+class CallbackFlag:
+    # Returned by the stream callback with the frames, the same values as PortAudio
+    CONTINUE = 0
+    COMPLETE = 1
+
+
+class StreamStatus:
+    # Flags passed to the stream callback, the same values as PortAudio
+    OUTPUT_UNDERFLOW = 4
+
+
+class OutputBackend:
+    """
+    Base class of the outputs of the player process.
+
+    A backend is created by the caller of AudioPlayer and passed to the player process,
+    so it only holds its settings until initialize() is called in the player process.
+    The devices are dictionaries like the device information of PyAudio,
+    with at least 'index', 'name', 'maxOutputChannels' and 'defaultSampleRate',
+    and 'mixSampleRate' and 'mixFormat' (bits per sample, is float) of the OS mixer if they are known.
+
+    The streams returned by open() have the methods of PyAudio streams used by the player:
+    write(), start_stream(), stop_stream(), close(), is_active(), get_write_available(), get_output_latency(),
+    and abort_stream() to stop at once, discarding the buffered frames.
+    """
+
+    def get_device(self, device_friendly_name):
+        """
+        Return the device information of the name, or None. (Caller process)
+        """
+        raise NotImplementedError
+
+    def invalidate(self):
+        """
+        Discard the devices known by get_device(), for example after a device is added or removed. (Caller process)
+        """
+        pass
+
+    def initialize(self):
+        """
+        Start the backend in the player process.
+        """
+        pass
+
+    def terminate(self):
+        pass
+
+    def reset(self):
+        """
+        Start the backend again to see the current devices.
+        """
+        self.terminate()
+        self.initialize()
+
+    def is_format_supported(self, device, channels, rate, sample_width, is_float=False) -> bool:
+        """
+        Return True if a stream of the format can be opened on the device. (Player process)
+
+        The formats of PortAudio are taken, so a backend without a device receives the frames a device would.
+        """
+        return is_stream_format(sample_width, is_float)
+
+    def open(self, device, channels, rate, sample_width, callback=None, is_float=False, ready=None):
+        """
+        Open an output stream.
+
+        Args:
+            device (dict): The device information returned by get_device().
+            channels (int): The channel count of the frames.
+            rate (int): The sampling rate of the frames.
+            sample_width (int): The bytes per sample, 4 is a 32-bit integer unless is_float is True.
+            callback: Called as callback(None, frame_count, time_info, status) and returns (data, CallbackFlag)
+                to pull the frames. The stream is opened stopped if it is given, otherwise the frames are written.
+            is_float (bool): The samples are 32-bit IEEE floats, see is_format_supported().
+            ready: Called as ready(frame_count) and returns True if the callback has the frames or the end to return.
+                A stream on its own clock waits for it instead of taking the silence of an underrun,
+                and a device stream, whose clock can't wait, doesn't call it.
+
+        Raises:
+            OSError: The device can't be opened.
+        """
+        raise NotImplementedError
+
+
+class PortAudioStream:
+    """
+    PyAudio stream with abort_stream().
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        # The methods of the stream are used as they are, not to add a call to the playback loop.
+        self.write = stream.write
+        self.start_stream = stream.start_stream
+        self.stop_stream = stream.stop_stream
+        self.close = stream.close
+        self.is_active = stream.is_active
+        self.get_write_available = stream.get_write_available
+        self.get_output_latency = stream.get_output_latency
+
+    def abort_stream(self):
+        """
+        Stop the stream at once, discarding the frames buffered for the device.
+
+        Stream.stop_stream() waits until the buffered frames are played,
+        and PyAudio doesn't wrap Pa_AbortStream(), so the C module is called directly.
+        """
+        stream = self.stream
+        if not stream._is_running:
+            return
+        pyaudio._portaudio.abort_stream(stream._stream)
+        stream._is_running = False
+
+
+class PortAudioBackend(OutputBackend):
+    """
+    Output to the devices of the MME host API of PortAudio.
+    """
+
+    def __init__(self):
+        self.p = None              # PortAudio session of the player process
+        self.device_cache = None   # of the caller process
+
+    def __getstate__(self):
+        # The PortAudio session and the device cache belong to the process which made them.
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def get_device(self, device_friendly_name):
+        if self.device_cache is None:
+            self.device_cache = DeviceCache()
+        return self.device_cache.get(device_friendly_name)
+
+    def invalidate(self):
+        if self.device_cache:
+            self.device_cache.invalidate()
+
+    def initialize(self):
+        self.p = pyaudio.PyAudio()
+
+    def terminate(self):
+        # The device list of PortAudio is fixed at initialization, reset() initializes it again.
+        if self.p:
+            self.p.terminate()
+        self.p = None
+
+    def _format(self, sample_width, is_float):
+        """
+        Raises:
+            ValueError: PortAudio has no format of the sample width.
+        """
+        if is_float:
+            if sample_width != 4:
+                raise ValueError(f'Unsupported float sample width : {sample_width}')
+            return pyaudio.paFloat32
+        # get_format_from_width() returns paFloat32 for 4 bytes, but the frames are 32-bit integers.
+        return pyaudio.paInt32 if sample_width == 4 else self.p.get_format_from_width(sample_width)
+
+    def is_format_supported(self, device, channels, rate, sample_width, is_float=False) -> bool:
+        # Refer:
+        #   https://people.csail.mit.edu/hubert/pyaudio/docs/#pyaudio.PyAudio.is_format_supported
+        try:
+            return self.p.is_format_supported(
+                rate,
+                output_device=device['index'],
+                output_channels=channels,
+                output_format=self._format(sample_width, is_float),
+            )
+        except ValueError:
+            return False
+
+    def open(self, device, channels, rate, sample_width, callback=None, is_float=False, ready=None):
+        stream = self.p.open(
+            format=self._format(sample_width, is_float),
+            channels=channels,
+            rate=rate,
+            output=True,
+            output_device_index=device['index'],
+            stream_callback=callback,
+            start=callback is None,
+        )
+        return PortAudioStream(stream)
+
+
+class SinkStream:
+    """
+    Stream which consumes the frames on its own clock instead of a device.
+
+    The clock runs speed times faster than the real time, and 0 consumes the frames as soon as they are passed.
+    Like a device, a write blocks while latency seconds of frames are buffered,
+    and the callback is called when there is room for frames_per_buffer frames.
+    Unlike a device, the callback waits until ready() reports the frames,
+    so the consumed frames are the frames of the source at any speed, and a late callback is an underflow.
+    Subclasses receive the consumed frames in output().
+    """
+
+    def __init__(self, rate, frame_size, callback=None, speed=0.0, latency=0.1, frames_per_buffer=1024, ready=None):
+        self.rate = rate
+        self.frame_size = frame_size
+        self.callback = callback
+        self.ready = ready
+        self.speed = speed
+        self.latency = latency
+        self.capacity = max(frames_per_buffer, int(latency * rate))
+        self.frames_per_buffer = frames_per_buffer
+        self.until = 0.0          # perf_counter() when the buffered frames are played
+        self.primed = False
+        self.running = False
+        self.active = False
+        self.generation = 0       # the callback thread of a stopped start exits
+        self.thread = None
+        self.aborted = threading.Event()  # wakes the callback thread waiting for room
+        self.frames_written = 0
+
+    def output(self, data):
+        raise NotImplementedError
+
+    def _buffered(self, now) -> int:
+        if self.speed <= 0:
+            # Consumed at once, but it never asks for more frames than are passed.
+            return self.capacity
+        return max(0, int((self.until - now) * self.rate * self.speed))
+
+    def _consume(self, data) -> int:
+        """
+        Pass the frames to the clock, waiting while the buffer is full.
+
+        Returns:
+            int: StreamStatus.OUTPUT_UNDERFLOW if the buffer had run empty before them, otherwise 0.
+        """
+        status = 0
+        frames = len(data) // self.frame_size
+        if self.speed > 0:
+            now = time.perf_counter()
+            wait = (self._buffered(now) + frames - self.capacity) / (self.rate * self.speed)
+            if wait > 0 and self.aborted.wait(wait):
+                return 0
+            now = time.perf_counter()
+            if self.primed and self.until < now:
+                status = StreamStatus.OUTPUT_UNDERFLOW
+            self.until = max(self.until, now) + frames / (self.rate * self.speed)
+        self.primed = True
+        self.output(data)
+        self.frames_written += frames
+        return status
+
+    def _drain(self):
+        if self.speed > 0:
+            time.sleep(max(0.0, self.until - time.perf_counter()))
+
+    def _wait_ready(self, generation) -> bool:
+        """
+        Wait until the callback has the frames to return. (Callback thread)
+
+        Returns:
+            bool: False if the stream has been stopped meanwhile.
+        """
+        while not self.ready(self.frames_per_buffer):
+            if self.aborted.wait(0.0005) or generation != self.generation:
+                return False
+        return True
+
+    def _run(self, generation):
+        """
+        Pull the frames from the callback. (Callback thread)
+        """
+        status = 0
+        nbytes = self.frames_per_buffer * self.frame_size
+        while generation == self.generation:
+            if self.ready and not self._wait_ready(generation):
+                break
+            data, flag = self.callback(None, self.frames_per_buffer, {}, status)
+            if generation != self.generation:
+                break
+            data = memoryview(data).cast('B')
+            status = self._consume(data)
+            if flag != CallbackFlag.CONTINUE or len(data) < nbytes:
+                # Completed after the buffered frames are played
+                self._drain()
+                self.active = False
+                break
+            if self.speed <= 0:
+                # Let the player loop fill the ring
+                time.sleep(0)
+
+    def write(self, frames, num_frames=None, exception_on_underflow=False):
+        if not self.running:
+            raise OSError('Stream is stopped')
+        self._consume(memoryview(frames).cast('B'))
+
+    def start_stream(self):
+        if self.running:
+            return
+        self.running = True
+        self.active = True
+        self.primed = False
+        self.generation += 1
+        self.aborted.clear()
+        if self.callback:
+            self.thread = threading.Thread(target=self._run, args=(self.generation,), daemon=True)
+            self.thread.start()
+
+    def stop_stream(self):
+        """
+        Stop the stream after the buffered frames are played.
+        """
+        if not self.running:
+            return
+        self.generation += 1
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        self._drain()
+        self.running = False
+        self.active = False
+
+    def abort_stream(self):
+        self.generation += 1
+        self.aborted.set()
+        if self.thread and self.thread is not threading.current_thread():
+            # The callback must not run after this returns
+            self.thread.join()
+        self.thread = None
+        self.until = 0.0
+        self.running = False
+        self.active = False
+
+    def close(self):
+        self.abort_stream()
+
+    def is_active(self) -> bool:
+        return self.active
+
+    def get_write_available(self) -> int:
+        return self.capacity - min(self.capacity, self._buffered(time.perf_counter()))
+
+    def get_output_latency(self) -> float:
+        return self.latency if self.speed > 0 else 0.0
+
+
+class NullStream(SinkStream):
+    def output(self, data):
+        pass
+
+
+class WavFileStream(SinkStream):
+    def __init__(self, path, channels, rate, sample_width, is_float=False, **kwargs):
+        super().__init__(rate, channels * sample_width, **kwargs)
+        self.path = path
+        self.file = WavWriter(path, channels, rate, sample_width, is_float)
+
+    def output(self, data):
+        self.file.writeframesraw(data)
+
+    def close(self):
+        super().close()
+        if self.file:
+            # The header is updated with the length
+            self.file.close()
+        self.file = None
+
+
+class NullBackend(OutputBackend):
+    """
+    Output which discards the frames, to run the player without a device.
+
+    Any device name is accepted as a device of the given format.
+    With speed 0 the frames are consumed as fast as the player produces them.
+    The callback of the CALLBACK engine waits for the frames of the ring then, as at the other speeds.
+    """
+
+    def __init__(self, channels=2, rate=48000, speed=0.0, latency=0.1):
+        """
+        Args:
+            channels (int): The channel count of the devices.
+            rate (int): The default sampling rate of the devices.
+            speed (float): The speed of the clock consuming the frames to the real time, 0 to not wait.
+            latency (float): The seconds of frames buffered by the clock.
+        """
+        self.channels = channels
+        self.rate = rate
+        self.speed = speed
+        self.latency = latency
+
+    def get_device(self, device_friendly_name):
+        return {
+            'index': 0,
+            'name': device_friendly_name,
+            'maxOutputChannels': self.channels,
+            'defaultSampleRate': float(self.rate),
+        }
+
+    def _stream_options(self, callback, ready) -> dict:
+        return {'callback': callback, 'speed': self.speed, 'latency': self.latency, 'ready': ready}
+
+    def open(self, device, channels, rate, sample_width, callback=None, is_float=False, ready=None):
+        stream = NullStream(rate, channels * sample_width, **self._stream_options(callback, ready))
+        if callback is None:
+            stream.start_stream()
+        return stream
+
+
+class WavFileBackend(NullBackend):
+    """
+    Output which writes the frames passed to each stream to a WAV file.
+
+    The file holds the frames exactly as a device would receive them, after the conversion to the device format.
+    Float streams are written as IEEE float files, which the wave module can't read.
+    Frames discarded by abort_stream() on a device, for example by stop or seek, are in the file.
+    """
+
+    def __init__(self, path_format, channels=2, rate=48000, speed=0.0, latency=0.1):
+        """
+        Args:
+            path_format (str): The path of the file of each stream, formatted with
+                index (the count of the streams opened before it) and device (the device name).
+                For example 'out/{device}-{index:03d}.wav'.
+        """
+        super().__init__(channels, rate, speed, latency)
+        self.path_format = path_format
+        self.opened = 0
+
+    def open(self, device, channels, rate, sample_width, callback=None, is_float=False, ready=None):
+        path = self.path_format.format(index=self.opened, device=device['name'])
+        self.opened += 1
+        stream = WavFileStream(path, channels, rate, sample_width, is_float, **self._stream_options(callback, ready))
+        if callback is None:
+            stream.start_stream()
+        return stream
@@ -0,0 +1,122 @@
+import collections
+
+
+class CacheStats:
+    # Index of the shared counters of PcmCache
+    HITS = 0
+    MISSES = 1
+    EVICTIONS = 2
+    BYTES = 3    # bytes held now
+    ENTRIES = 4  # entries held now
+    SIZE = 5
+
+
+class CachedPcm:
+    """
+    Reader of PCM frames held in memory, with the interface of WavReader used by the player.
+
+    The frames are already in the format of the stream, so nothing is converted or read from the disk.
+    """
+
+    def __init__(self, data, channels, rate, sample_width, is_float=False):
+        self.data = memoryview(data).toreadonly()
+        self.channels = channels
+        self.rate = rate
+        self.sample_width = sample_width
+        self.is_float = is_float
+        self.frame_size = channels * sample_width
+        self.frames = len(self.data) // self.frame_size
+        self.position = 0
+
+    def read(self, frames):
+        """
+        Return a read-only view of the next frames without copying.
+        """
+        frames = min(frames, self.frames - self.position)
+        if frames <= 0:
+            return memoryview(b'')
+        start = self.position * self.frame_size
+        self.position += frames
+        return self.data[start:start + frames * self.frame_size]
+
+    def seek(self, frame):
+        self.position = max(0, min(frame, self.frames))
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        # The data is owned by the cache
+        self.data = None
+
+
+class PcmCache:
+    """
+    LRU cache of PCM frames converted to the format of a device.
+
+    The total size of the frames is kept under the budget by evicting the least recently used entries.
+    The counters are kept in the stats array, so that another process can read them.
+    """
+
+    def __init__(self, budget, stats=None):
+        """
+        Args:
+            budget (int): The maximum bytes of the frames held by the cache.
+            stats: An array of CacheStats.SIZE integers to count in, for example a multiprocessing.RawArray.
+        """
+        self.budget = budget
+        self.stats = stats if stats is not None else [0] * CacheStats.SIZE
+        self.entries = collections.OrderedDict()  # key: (data, channels, rate, sample_width, is_float)
+        self.size = 0
+
+    def get(self, key):
+        """
+        Return a reader of the frames of the key, or None if they are not held.
+
+        Returns:
+            CachedPcm: A new reader of the frames.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats[CacheStats.MISSES] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats[CacheStats.HITS] += 1
+        return CachedPcm(*entry)
+
+    def accepts(self, size) -> bool:
+        """
+        Return True if the frames of the size can be held.
+        """
+        return 0 < size <= self.budget
+
+    def put(self, key, data, channels, rate, sample_width, is_float=False):
+        """
+        Hold the frames, evicting the least recently used entries to keep the budget.
+
+        The data must not be modified after it is put.
+        """
+        if not self.accepts(len(data)):
+            return
+        self._remove(key)
+        while self.size + len(data) > self.budget:
+            self._remove(next(iter(self.entries)))
+            self.stats[CacheStats.EVICTIONS] += 1
+        self.entries[key] = (data, channels, rate, sample_width, is_float)
+        self.size += len(data)
+        self._update()
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        self._update()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= len(entry[0])
+        self._update()
+
+    def _update(self):
+        self.stats[CacheStats.BYTES] = self.size
+        self.stats[CacheStats.ENTRIES] = len(self.entries)
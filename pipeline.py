@@ -0,0 +1,184 @@
+import numpy as np
+
+import sample_format
+from channel_mixer import ChannelMixer
+from resampler import Resampler, Quality
+
+
+class Pipeline:
+    """
+    Convert PCM frames of a source to the format of the output stream block by block.
+
+    The stages are channel mixing, sampling rate conversion, gain and sample width conversion, vectorized with NumPy.
+    If the source is already in the output format, process() returns the data as it is.
+    Integer outputs of fewer bits than the source are dithered by TpdfDither, instead of rounding the samples alone.
+    The result doesn't depend on the size of the blocks, so the player and the offline render produce the same frames.
+    """
+
+    def __init__(self, in_channels, in_rate, sample_width, out_channels, out_rate, quality=Quality.MEDIUM, out_sample_width=None, gain=1.0, is_float=False, out_is_float=False, dither_seed=0):
+        """
+        Args:
+            is_float (bool): The source samples are IEEE floats, see sample_format.to_float().
+            out_is_float (bool): Convert to IEEE floats, see sample_format.from_float().
+            dither_seed (int): The seed of the dither, the same seed gives the same frames.
+        """
+        self.in_channels = in_channels
+        self.in_rate = in_rate
+        self.out_channels = out_channels
+        self.out_rate = out_rate
+        self.sample_width = sample_width
+        self.out_sample_width = out_sample_width or sample_width
+        self.is_float = is_float
+        self.out_is_float = out_is_float
+        self.dither = None
+        # The samples are converted in float32, which keeps FLOAT_BITS of a more precise source.
+        in_bits = min(sample_format.precision(sample_width, is_float), sample_format.FLOAT_BITS)
+        if not out_is_float and sample_format.precision(self.out_sample_width) < in_bits:
+            self.dither = sample_format.TpdfDither(dither_seed)
+        # Linear factor, the samples out of the range are clipped
+        self.gain = np.float32(gain)
+        self.mixer = None
+        if in_channels != out_channels:
+            self.mixer = ChannelMixer(in_channels, out_channels)
+        self.resampler = None
+        if in_rate != out_rate:
+            # Mixed before resampling, the resampler processes fewer channels.
+            self.resampler = Resampler(in_rate, out_rate, out_channels, quality)
+
+    @property
+    def passthrough(self) -> bool:
+        return (self.mixer is None and self.resampler is None and self.gain == 1
+                and self.sample_width == self.out_sample_width and self.is_float == self.out_is_float)
+
+    def process(self, data):
+        """
+        Convert interleaved PCM frames.
+
+        The result can be empty for a short input, because the resampler keeps a history.
+
+        Returns:
+            A read-only bytes-like object of the converted frames.
+        """
+        if self.passthrough or not data:
+            return data
+        return sample_format.from_float(self.process_float(data), self.out_sample_width, self.out_is_float, self.dither)
+
+    def process_float(self, data) -> np.ndarray:
+        """
+        Convert interleaved PCM frames to float32 frames of shape (frames, out_channels), before the sample width conversion.
+
+        The samples aren't clipped, so the frames of several sources can be summed.
+        """
+        frames = sample_format.to_float(data, self.sample_width, self.is_float).reshape(-1, self.in_channels)
+        if self.mixer:
+            frames = self.mixer.process(frames)
+        if self.resampler:
+            frames = self.resampler.process(frames)
+        if self.gain != 1:
+            frames = frames * self.gain
+        return frames
+
+    def flush(self):
+        """
+        Return the frames kept in the pipeline after the last input.
+        """
+        if self.resampler is None:
+            return b''
+        return sample_format.from_float(self.flush_float(), self.out_sample_width, self.out_is_float, self.dither)
+
+    def flush_float(self) -> np.ndarray:
+        """
+        Return the frames kept in the pipeline after the last input, as process_float().
+        """
+        if self.resampler is None:
+            return np.zeros((0, self.out_channels), dtype=np.float32)
+        frames = self.resampler.flush()
+        if self.gain != 1:
+            frames = frames * self.gain
+        return frames
+
+    def reset(self):
+        """
+        Discard the frames kept in the pipeline, for example after seeking.
+        """
+        if self.resampler:
+            self.resampler.reset()
+
+
+def native_rate(device) -> int:
+    """
+    Return the native sampling rate of a device, or 0 if it is unknown.
+
+    The rate of the Core Audio mix format ('mixSampleRate') is taken if it is given.
+    MME accepts any rate, so PortAudio reports the first rate of its search order as 'defaultSampleRate',
+    which is 44100 Hz for almost every device.
+    """
+    return int(device.get('mixSampleRate') or device.get('defaultSampleRate') or 0)
+
+
+def stream_format(device, channels, rate, quality):
+    """
+    Return (channels, rate) of the stream to play a source on a device.
+
+    If the device has fewer channels than the source, the frames are mixed down.
+    The source is converted to the native rate of the device, not to leave it to the OS mixer or the driver,
+    unless quality is None.
+
+    Args:
+        device (dict): The device information, 'maxOutputChannels' and the rates of native_rate() are used.
+        channels (int): The channel count of the source.
+        rate (int): The sampling rate of the source.
+        quality (str): The resampling quality, or None to play at the rate of the source.
+    """
+    channels = min(channels, int(device['maxOutputChannels']))
+    if quality and native_rate(device):
+        rate = native_rate(device)
+    return channels, rate
+
+
+# Sample formats of the streams as (sample width, is float), the most precise first, as the formats of PortAudio
+STREAM_FORMATS = ((4, True), (4, False), (3, False), (2, False), (1, False))
+
+
+def is_stream_format(sample_width, is_float=False) -> bool:
+    """
+    Return True if the sample format is one of STREAM_FORMATS.
+    """
+    return (sample_width, is_float) in STREAM_FORMATS
+
+
+def stream_sample_format(device, sample_width, is_float=False, supported=None):
+    """
+    Return (sample width, is float) of the stream to play a source on a device.
+
+    The mix format of the device is taken if it is known and supported, even if it has fewer bits than the source.
+    The OS mixer converts any other format to it, so the samples are converted and dithered by the Pipeline instead.
+    Otherwise the format of the source is taken if it is supported,
+    then the first supported one of STREAM_FORMATS which keeps the bits of the source, then the most precise supported one.
+
+    Args:
+        device (dict): The device information, 'mixFormat' (bits per sample, is float) of Core Audio is used if it is given.
+        sample_width (int): The bytes per sample of the source.
+        is_float (bool): The source samples are IEEE floats.
+        supported: Called as supported(sample_width, is_float) to check a format with the device. All the formats are supported if None.
+    """
+    if supported is None:
+        supported = lambda sample_width, is_float: True
+
+    mix_format = device.get('mixFormat')
+    if mix_format:
+        bits, mix_float = mix_format
+        if (bits // 8, bool(mix_float)) in STREAM_FORMATS and supported(bits // 8, bool(mix_float)):
+            return bits // 8, bool(mix_float)
+
+    if supported(sample_width, is_float):
+        return sample_width, is_float
+    formats = [f for f in STREAM_FORMATS if supported(*f)]
+    if not formats:
+        # Left to the device to reject
+        return sample_width, is_float
+    bits = min(sample_format.precision(sample_width, is_float), sample_format.FLOAT_BITS)
+    for f in formats:
+        if sample_format.precision(*f) >= bits:
+            return f
+    return max(formats, key=lambda f: sample_format.precision(*f))
@@ -0,0 +1,185 @@
+"""
+Telemetry of the player process in a shared memory block.
+
+The player process updates plain 64-bit counters, and readers attach to the block by its name.
+Nothing is locked or sent through a pipe, so reading doesn't slow the audio path.
+
+Usage:
+    python player_stats.py <name> [--interval SECONDS] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+
+# Upper bounds of the buckets of the write time histogram in microseconds, the last bucket has no bound.
+LATENCY_BUCKETS_US = (100, 250, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+
+
+class StatsField:
+    # Index of the counters in the block
+    UNDERFLOWS = 0     # the device ran out of frames (status flags of the callback, or an empty write buffer)
+    UNDERRUNS = 1      # the callback found the ring empty and played silence
+    WRITES = 2         # stream writes, or callbacks
+    WRITE_NS = 3       # total time of them
+    WRITE_MAX_NS = 4
+    FILL = 5           # bytes in the ring drained by the stream
+    CAPACITY = 6       # bytes of the ring
+    CPU_NS = 7         # CPU time of the player process
+    FIRST_SAMPLE_NS = 8  # time from loading to the first frames passed to the device
+    LOADS = 9
+    STREAM_ERRORS = 10
+    HISTOGRAM = 11     # LATENCY_BUCKETS_US + 1 counters of the write time
+    SIZE = HISTOGRAM + len(LATENCY_BUCKETS_US) + 1
+
+
+def percentiles(values, percentiles=(50, 90, 99)) -> dict:
+    """
+    Return {percentile: value} of the values by the nearest rank, in the unit of the values.
+    """
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {}
+    for p in percentiles:
+        rank = max(1, -(-len(ordered) * p // 100))
+        result[p] = ordered[min(rank, len(ordered)) - 1]
+    return result
+
+
+class PlayerStats:
+    """
+    Shared memory block of the counters of the player process.
+
+    Each counter is written by one thread of the player process,
+    the main loop or the PortAudio callback, and read by any process.
+    """
+
+    def __init__(self, name=None, create=False, standalone=False):
+        """
+        Args:
+            name (str): The name of the block. A block with a generated name is created if None.
+            create (bool): Create the block with the name, instead of attaching to it.
+            standalone (bool): True if this process is not started by the creator of the block, like the CLI.
+        """
+        size = StatsField.SIZE * 8
+        if name is None or create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.owner = True
+        else:
+            try:
+                # The creator is responsible for unlinking the block.
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # Python 3.12 or earlier
+                self.shm = shared_memory.SharedMemory(name=name)
+                if standalone and os.name == 'posix':
+                    # Otherwise, the block is removed when this process exits.
+                    # A child process shares the resource tracker of the creator, so it must not do it.
+                    resource_tracker.unregister(self.shm._name, 'shared_memory')
+            self.owner = False
+        self.fields = self.shm.buf[:size].cast('q')
+        if self.owner:
+            self.reset()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def add(self, field, n=1):
+        self.fields[field] += n
+
+    def set(self, field, value):
+        self.fields[field] = value
+
+    def record_write(self, ns):
+        """
+        Count a stream write or a callback which took ns nanoseconds.
+        """
+        fields = self.fields
+        fields[StatsField.WRITES] += 1
+        fields[StatsField.WRITE_NS] += ns
+        if ns > fields[StatsField.WRITE_MAX_NS]:
+            fields[StatsField.WRITE_MAX_NS] = ns
+        us = ns // 1000
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS_US) and us >= LATENCY_BUCKETS_US[bucket]:
+            bucket += 1
+        fields[StatsField.HISTOGRAM + bucket] += 1
+
+    def reset(self):
+        for i in range(StatsField.SIZE):
+            self.fields[i] = 0
+
+    def snapshot(self) -> dict:
+        """
+        Return the counters converted to readable units.
+        """
+        values = self.fields.tolist()
+        writes = values[StatsField.WRITES]
+        labels = [f'<{us}us' for us in LATENCY_BUCKETS_US] + [f'>={LATENCY_BUCKETS_US[-1]}us']
+        return {
+            'underflows':        values[StatsField.UNDERFLOWS],
+            'underruns':         values[StatsField.UNDERRUNS],
+            'writes':            writes,
+            'write_mean_us':     values[StatsField.WRITE_NS] / writes / 1000 if writes else 0.0,
+            'write_max_us':      values[StatsField.WRITE_MAX_NS] / 1000,
+            'write_histogram':   dict(zip(labels, values[StatsField.HISTOGRAM:StatsField.HISTOGRAM + len(labels)])),
+            'fill_bytes':        values[StatsField.FILL],
+            'capacity_bytes':    values[StatsField.CAPACITY],
+            'cpu_seconds':       values[StatsField.CPU_NS] / 1e9,
+            'first_sample_ms':   values[StatsField.FIRST_SAMPLE_NS] / 1e6,
+            'loads':             values[StatsField.LOADS],
+            'stream_errors':     values[StatsField.STREAM_ERRORS],
+        }
+
+    def close(self):
+        """
+        Detach from the shared memory block, and remove it if this process created it.
+        """
+        if self.shm is None:
+            return
+        self.fields.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the telemetry of a player process.')
+    parser.add_argument('name', help='the name of the stats block, AudioPlayer.stats_name')
+    parser.add_argument('--interval', type=float, default=0, help='seconds between prints, 0 to print once')
+    parser.add_argument('--json', action='store_true', help='print a JSON object per line')
+    args = parser.parse_args()
+
+    try:
+        stats = PlayerStats(args.name, standalone=True)
+    except FileNotFoundError:
+        print(f'No stats block : {args.name}', file=sys.stderr)
+        return 1
+    try:
+        while True:
+            snapshot = stats.snapshot()
+            if args.json:
+                print(json.dumps(snapshot), flush=True)
+            else:
+                for key, value in snapshot.items():
+                    print(f'{key:16} : {value}')
+                print(flush=True)
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
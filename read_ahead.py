@@ -0,0 +1,173 @@
+import os
+import threading
+
+from ring_buffer import RingBuffer
+
+
+class ReadAheadStats:
+    # Index of the shared counters of ReadAheadReader
+    FILL = 0      # bytes buffered ahead of the playhead
+    CAPACITY = 1  # bytes of the buffer
+    STALLS = 2    # times the buffer ran empty before the end
+    SIZE = 3
+
+
+class ReadAheadReader:
+    """
+    Reader of a WAV file which reads ahead of the playhead on a thread.
+
+    The thread reads the data chunk with large sequential reads into a ring buffer,
+    so a slow disk or network share stalls the thread instead of the output stream.
+    It has the interface of WavReader used by the player,
+    but read() returns None if the data isn't read yet instead of blocking.
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+    # Seconds to wait for the first block after opening or seeking
+    FIRST_BLOCK_TIMEOUT = 1.0
+
+    def __init__(self, wf, seconds, stats=None, wait=True):
+        """
+        Args:
+            wf (WavReader): The opened file. Its format and the data chunk are used, it is closed with the reader.
+            seconds (float): The length of the audio to keep buffered.
+            stats: An array of ReadAheadStats.SIZE integers to count in, for example a multiprocessing.RawArray.
+            wait (bool): Wait for the first block. False for a file opened ahead while another one is played,
+                read() returns None until the block is read.
+        """
+        self.wf = wf
+        self.channels = wf.channels
+        self.rate = wf.rate
+        self.sample_width = wf.sample_width
+        self.is_float = wf.is_float
+        self.frame_size = wf.frame_size
+        self.frames = wf.frames
+        self.stats = stats if stats is not None else [0] * ReadAheadStats.SIZE
+
+        size = max(1, int(seconds * wf.rate)) * wf.frame_size
+        self.block_size = max(wf.frame_size, min(self.BLOCK_SIZE, size // 2) // wf.frame_size * wf.frame_size)
+        self.ring = RingBuffer(size)
+        self.out = bytearray()       # reused output buffer of read()
+        self.stats[ReadAheadStats.CAPACITY] = size
+        self.stats[ReadAheadStats.FILL] = 0
+
+        # Own handle for the thread, the memory map of WavReader is not used.
+        flags = os.O_RDONLY | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_SEQUENTIAL', 0)
+        self.file = open(os.open(wf.file.name, flags), 'rb', buffering=0)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(self.file.fileno(), wf.data_offset, wf.data_size, os.POSIX_FADV_SEQUENTIAL)
+
+        self.position = 0            # frame of the next read()
+        self.starved = False         # the buffer is empty before the end
+        self.thread = None
+        self.running = False
+        self.space = threading.Event()  # set by the consumer when a block can be written
+        self.ready = threading.Event()  # set by the thread when data is written
+        self._start(0, wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start(self, frame, wait=True):
+        self.ring.reset()
+        self.position = frame
+        self.starved = False
+        self.ready.clear()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=(frame,), daemon=True)
+        self.thread.start()
+        if wait:
+            self.ready.wait(self.FIRST_BLOCK_TIMEOUT)
+
+    def _stop(self):
+        self.running = False
+        self.space.set()
+        if self.thread:
+            self.thread.join()
+        self.thread = None
+
+    def _run(self, frame):
+        """
+        Read the data chunk from the frame into the ring. (Read-ahead thread)
+        """
+        offset = self.wf.data_offset + frame * self.frame_size
+        end = self.wf.data_offset + self.frames * self.frame_size
+        block = memoryview(bytearray(self.block_size))
+        fd = self.file.fileno()
+        self.file.seek(offset)
+        while self.running and offset < end:
+            if self.ring.writable() < self.block_size:
+                self.space.clear()
+                # Check again, the consumer may have read before the event is cleared.
+                if self.ring.writable() < self.block_size:
+                    self.space.wait()
+                continue
+            n = self.file.readinto(block[:min(self.block_size, end - offset)])
+            if not n:
+                # The file is shorter than the data chunk
+                break
+            offset += n
+            if hasattr(os, 'posix_fadvise') and offset < end:
+                # Let the OS read the next block while this one is played
+                os.posix_fadvise(fd, offset, min(self.block_size, end - offset), os.POSIX_FADV_WILLNEED)
+            self.ring.write(block[:n])
+            self.ready.set()
+        self.ring.finish()
+        self.ready.set()
+
+    def report_to(self, stats):
+        """
+        Count in the stats array from now on, for example when the reader opened ahead becomes the current one.
+        """
+        stats[ReadAheadStats.CAPACITY] = self.ring.size
+        stats[ReadAheadStats.FILL] = self.ring.readable()
+        self.stats = stats
+
+    def read(self, frames):
+        """
+        Return a read-only view of the next frames copied from the ring.
+
+        The view is valid until the next read().
+        An empty view is returned at the end of the data, and None if the data isn't read yet.
+        """
+        # Check it before reading, all the data is in the ring if it is set.
+        finished = self.ring.finished
+        readable = self.ring.readable()
+        nbytes = min(frames * self.frame_size, readable - readable % self.frame_size)
+        if nbytes <= 0:
+            if finished:
+                return memoryview(b'')
+            if not self.starved:
+                self.starved = True
+                self.stats[ReadAheadStats.STALLS] += 1
+            return None
+        self.starved = False
+        if len(self.out) < nbytes:
+            self.out = bytearray(nbytes)
+        out = memoryview(self.out)[:nbytes]
+        self.ring.read_into(out)
+        self.position += nbytes // self.frame_size
+        fill = self.ring.readable()
+        self.stats[ReadAheadStats.FILL] = fill
+        if self.ring.size - fill >= self.block_size:
+            self.space.set()
+        return out.toreadonly()
+
+    def seek(self, frame):
+        self._stop()
+        self._start(max(0, min(frame, self.frames)))
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        self._stop()
+        if self.file:
+            self.file.close()
+        self.file = None
+        self.wf.close()
+        self.ring.release()
+        self.stats[ReadAheadStats.FILL] = 0
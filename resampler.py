@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class Quality:
+    FAST = 'fast'
+    MEDIUM = 'medium'
+    BEST = 'best'
+
+
+# Taps per phase, Kaiser window beta, and cutoff relative to the lower Nyquist frequency
+_PRESETS = {
+    Quality.FAST:   (16, 5.0, 0.85),
+    Quality.MEDIUM: (32, 8.0, 0.90),
+    Quality.BEST:   (64, 10.0, 0.95),
+}
+
+
+def _filter_length(taps, up):
+    """
+    Return the length of the prototype filter.
+
+    It is odd, so that the center of the filter is on a sample and the delay is an integer.
+    """
+    return taps * up - 1 + (taps * up) % 2
+
+
+class Resampler:
+    """
+    Streaming polyphase resampler vectorized with NumPy.
+
+    The rate is converted by the ratio up / down (reduced by their GCD).
+    The input history and the output phase are kept between blocks,
+    so the blocks can have any length and the output is continuous.
+    """
+
+    def __init__(self, in_rate, out_rate, channels, quality=Quality.MEDIUM):
+        g = math.gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+
+        self.taps, beta, rolloff = _PRESETS[quality]
+        self.phases = self._design(self.up, self.down, self.taps, beta, rolloff)
+        # Compensate the group delay of the filter, so the output isn't shifted.
+        self.delay = (_filter_length(self.taps, self.up) - 1) // 2
+
+        self.reset()
+
+    @staticmethod
+    def _design(up, down, taps, beta, rolloff):
+        """
+        Return the polyphase table [phase][tap] of a Kaiser-windowed sinc low pass filter.
+
+        The taps are reversed, so that they are multiplied with the inputs in the order of time.
+        """
+        length = _filter_length(taps, up)
+        # Cutoff frequency normalized by the upsampled rate
+        cutoff = 0.5 * rolloff / max(up, down)
+        n = np.arange(length) - (length - 1) // 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+        # The gain of each phase is up, so that the upsampled zeros don't lower the level.
+        h *= up / h.sum()
+        h = np.concatenate((h, np.zeros(taps * up - length)))
+        return h.reshape(taps, up).T[:, ::-1].astype(np.float32)
+
+    def reset(self):
+        """
+        Clear the history, for example after seeking.
+        """
+        self.history = np.zeros((self.taps - 1, self.channels), dtype=np.float32)
+        self.in_count = 0    # input frames received
+        self.out_count = 0   # output frames returned
+        self.flushed = False
+
+    def process(self, frames) -> np.ndarray:
+        """
+        Args:
+            frames (np.ndarray): float32 samples shaped (frames, channels).
+
+        Returns:
+            np.ndarray: float32 samples at the output rate shaped (frames, channels).
+        """
+
+        buffer = np.concatenate((self.history, frames))
+        # Global input index of buffer[0]
+        base = self.in_count - (self.taps - 1)
+        self.in_count += len(frames)
+
+        # Output k uses the inputs up to (k * down + delay) // up
+        last = (self.in_count * self.up - 1 - self.delay) // self.down
+        k = np.arange(self.out_count, last + 1, dtype=np.int64)
+        self.out_count = max(self.out_count, last + 1)
+
+        self.history = buffer[len(buffer) - (self.taps - 1):]
+        if len(k) == 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+
+        t = k * self.down + self.delay
+        phase = t % self.up
+        index = t // self.up - base
+        # window[k] is (channels, taps) of the inputs which output k uses, in the order of time.
+        window = sliding_window_view(buffer, self.taps, axis=0)[index - (self.taps - 1)]
+        return np.matmul(window, self.phases[phase][:, :, None])[:, :, 0]
+
+    def flush(self) -> np.ndarray:
+        """
+        Return the remaining outputs after the last input.
+        """
+        if self.flushed:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        self.flushed = True
+        total = -(-self.in_count * self.up // self.down)
+        out = self.process(np.zeros((self.taps, self.channels), dtype=np.float32))
+        # The padding zeros are not a part of the input.
+        remaining = max(0, total - (self.out_count - len(out)))
+        self.out_count = total
+        return out[:remaining]
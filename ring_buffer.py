@@ -0,0 +1,192 @@
+from multiprocessing import shared_memory
+
+
+class RingBuffer:
+    """
+    Lock-free ring buffer of bytes for one producer and one consumer.
+
+    The read and write positions are counters which only increase.
+    The producer updates only the write position and the consumer updates only the read position,
+    so the producer and the consumer don't need a lock to share the buffer.
+    The buffer is allocated once, reading and writing don't allocate memory.
+    """
+
+    HEADER_SIZE = 64
+
+    # Index of the header words
+    _READ = 0
+    _WRITE = 1
+    _SIZE = 2
+    _FINISHED = 3
+
+    def __init__(self, size, buffer=None):
+        """
+        Args:
+            size (int): The capacity of the ring in bytes.
+            buffer: The memory to place the ring. A new bytearray is allocated if None.
+                It needs HEADER_SIZE + size bytes.
+        """
+
+        if buffer is None:
+            buffer = bytearray(self.HEADER_SIZE + size)
+        self.size = size
+        self.memory = memoryview(buffer)
+        self.header = self.memory[:32].cast('Q')
+        self.data = self.memory[self.HEADER_SIZE:self.HEADER_SIZE + size]
+        self.header[self._SIZE] = size
+
+    def readable(self) -> int:
+        """
+        Return the number of bytes which can be read.
+        """
+        return self.header[self._WRITE] - self.header[self._READ]
+
+    def writable(self) -> int:
+        """
+        Return the number of bytes which can be written.
+        """
+        return self.size - (self.header[self._WRITE] - self.header[self._READ])
+
+    @property
+    def finished(self) -> bool:
+        """
+        True if the producer has written all the data.
+        """
+        return self.header[self._FINISHED] != 0
+
+    def finish(self):
+        """
+        Tell the consumer that no more data will be written. (Producer)
+        """
+        self.header[self._FINISHED] = 1
+
+    def write(self, data) -> int:
+        """
+        Copy data into the ring as much as it can be stored. (Producer)
+
+        Returns:
+            int: The number of bytes written.
+        """
+
+        data = memoryview(data).cast('B')
+        write_position = self.header[self._WRITE]
+        n = min(len(data), self.size - (write_position - self.header[self._READ]))
+        if n <= 0:
+            return 0
+        start = write_position % self.size
+        first = min(n, self.size - start)
+        self.data[start:start + first] = data[:first]
+        if first < n:
+            self.data[:n - first] = data[first:n]
+        # Publish the data after it is copied.
+        self.header[self._WRITE] = write_position + n
+        return n
+
+    def read_into(self, buffer) -> int:
+        """
+        Copy data from the ring into the buffer as much as it is available. (Consumer)
+
+        Returns:
+            int: The number of bytes read.
+        """
+
+        buffer = memoryview(buffer).cast('B')
+        read_position = self.header[self._READ]
+        n = min(len(buffer), self.header[self._WRITE] - read_position)
+        if n <= 0:
+            return 0
+        start = read_position % self.size
+        first = min(n, self.size - start)
+        buffer[:first] = self.data[start:start + first]
+        if first < n:
+            buffer[first:n] = self.data[:n - first]
+        # Release the space after it is copied.
+        self.header[self._READ] = read_position + n
+        return n
+
+    def peek(self, nbytes):
+        """
+        Return a read-only view of the readable data without copying. (Consumer)
+
+        The view is contiguous, so it can be shorter than the readable data at the end of the ring.
+        Call consume() after the view is used.
+        """
+        read_position = self.header[self._READ]
+        n = min(nbytes, self.header[self._WRITE] - read_position)
+        start = read_position % self.size
+        n = min(n, self.size - start)
+        return self.data[start:start + n].toreadonly()
+
+    def consume(self, nbytes):
+        """
+        Release the space of the data returned by peek(). (Consumer)
+        """
+        self.header[self._READ] += nbytes
+
+    def clear(self):
+        """
+        Discard all the data in the ring. (Consumer)
+        """
+        self.header[self._READ] = self.header[self._WRITE]
+
+    def reset(self):
+        """
+        Discard all the data and the finished flag, for example after seeking.
+
+        Neither the producer nor the consumer may be running.
+        """
+        self.header[self._READ] = self.header[self._WRITE]
+        self.header[self._FINISHED] = 0
+
+    def release(self):
+        """
+        Release the views of the memory.
+        """
+        self.header.release()
+        self.data.release()
+        self.memory.release()
+
+
+class SharedRingBuffer(RingBuffer):
+    """
+    RingBuffer placed in a shared memory block.
+
+    The creator and the process attached by the name share the ring without pickling or copying.
+    """
+
+    def __init__(self, size=0, name=None):
+        """
+        Args:
+            size (int): The capacity of the ring in bytes. It is used only when a new block is created.
+            name (str): The name of the shared memory block to attach. A new block is created if None.
+        """
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER_SIZE + size)
+            self.owner = True
+        else:
+            try:
+                # The creator is responsible for unlinking the block.
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # Python 3.12 or earlier
+                self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            size = self.shm.buf[:32].cast('Q')[self._SIZE]
+        super().__init__(size, self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        """
+        Detach from the shared memory block, and remove it if this process created it.
+        """
+        if self.shm is None:
+            return
+        self.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
@@ -0,0 +1,136 @@
+import numpy as np
+
+
+# Significant bits of the float32 samples the conversions work in
+FLOAT_BITS = 24
+
+
+def precision(sample_width, is_float=False) -> int:
+    """
+    Return the significant bits of a sample format.
+
+    The bits of the mantissa are counted for floats, 24 for float32 and 53 for float64.
+    """
+    if is_float:
+        return FLOAT_BITS if sample_width == 4 else 53
+    return 8 * sample_width
+
+
+class TpdfDither:
+    """
+    Triangular (TPDF) dither from -1 to +1 LSB, added to the samples before they are rounded to fewer bits.
+
+    The noise of a sample is the difference of two uniform numbers, drawn for all the samples of a block at once.
+    The numbers come from a generator of a fixed seed in the order of the samples,
+    so the result doesn't depend on the size of the blocks and a render can be repeated exactly.
+    """
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+
+    def noise(self, count) -> np.ndarray:
+        """
+        Return the noise of the next samples in LSB.
+        """
+        uniform = self.rng.random(2 * count, dtype=np.float32).reshape(count, 2)
+        return uniform[:, 0] - uniform[:, 1]
+
+
+def to_float(data, sample_width, is_float=False) -> np.ndarray:
+    """
+    Convert interleaved little-endian PCM samples to float32 in [-1.0, 1.0).
+
+    Args:
+        data: The PCM samples. (bytes-like)
+        sample_width (int): The bytes per sample. 1 (unsigned), 2, 3 (packed) or 4.
+        is_float (bool): The samples are IEEE floats of 4 or 8 bytes. They are converted as they are, without clipping.
+    """
+
+    if is_float:
+        if sample_width == 4:
+            samples = np.frombuffer(data, dtype='<f4').astype(np.float32)
+        elif sample_width == 8:
+            samples = np.frombuffer(data, dtype='<f8').astype(np.float32)
+        else:
+            raise ValueError(f'Unsupported float sample width : {sample_width}')
+    elif sample_width == 1:
+        samples = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+        samples -= 128.0
+        samples *= 1.0 / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32)
+        samples *= 1.0 / 32768
+    elif sample_width == 3:
+        samples = int24_to_int32(data).astype(np.float32)
+        samples *= 1.0 / 2147483648
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32)
+        samples *= 1.0 / 2147483648
+    else:
+        raise ValueError(f'Unsupported sample width : {sample_width}')
+    return samples
+
+
+def from_float(samples, sample_width, is_float=False, dither=None):
+    """
+    Convert float samples to interleaved little-endian PCM samples with clipping.
+
+    Args:
+        is_float (bool): Convert to IEEE floats of 4 or 8 bytes, clipped to [-1.0, 1.0].
+        dither (TpdfDither): Added to the integer samples before they are rounded, or None.
+
+    Returns:
+        memoryview: A read-only view of the converted samples.
+    """
+
+    if is_float:
+        if sample_width not in (4, 8):
+            raise ValueError(f'Unsupported float sample width : {sample_width}')
+        out = np.clip(samples, -1.0, 1.0).astype('<f4' if sample_width == 4 else '<f8')
+    elif sample_width == 1:
+        scaled = _scale(samples, 128, dither)
+        scaled += 128
+        out = scaled.astype(np.uint8)
+    elif sample_width == 2:
+        out = _scale(samples, 32768, dither).astype('<i2')
+    elif sample_width == 3:
+        out = int32_to_int24(_scale(samples, 8388608, dither).astype('<i4'))
+    elif sample_width == 4:
+        # float32 can't hold 2**31 - 1, so it is scaled in float64
+        out = _scale(samples.astype(np.float64), 2147483648, dither).astype('<i4')
+    else:
+        raise ValueError(f'Unsupported sample width : {sample_width}')
+    if out.size == 0:
+        # A view with a zero in its shape can't be cast.
+        return memoryview(b'')
+    return memoryview(out).cast('B').toreadonly()
+
+
+def _scale(samples, full_scale, dither=None):
+    scaled = np.multiply(samples, full_scale)
+    if dither is not None:
+        scaled += dither.noise(scaled.size).reshape(scaled.shape)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -full_scale, full_scale - 1, out=scaled)
+    return scaled
+
+
+def int24_to_int32(data) -> np.ndarray:
+    """
+    Unpack packed 24-bit samples into the upper 3 bytes of int32 samples.
+
+    Each sample is loaded as an int32 at a stride of 3 bytes, taking a byte of the next sample as its top byte,
+    and shifted up by 8 bits to drop it. Only the data is copied once, to pad the end for the last load.
+    """
+    packed = np.frombuffer(data, dtype=np.uint8)
+    padded = np.zeros(len(packed) + 1, dtype=np.uint8)
+    padded[:-1] = packed
+    samples = np.ndarray((len(packed) // 3,), dtype='<i4', buffer=padded, strides=(3,))
+    return samples << 8
+
+
+def int32_to_int24(samples) -> np.ndarray:
+    """
+    Pack the lower 3 bytes of int32 samples.
+    """
+    return samples.view(np.uint8).reshape(-1, 4)[:, :3].copy()
@@ -1,13 +1,14 @@
 import os
 import multiprocessing
+import queue
 
 import tkinter as tk
 import tkinter.ttk as ttk
 from tkinter import font, filedialog
 
-from core_audio import CoreAudio, DeviceChangedCallback, VolumeChangedCallback
+from core_audio import CoreAudio, DeviceChangedCallback, VolumeChangedCallback, VolumeWriter
 import core_audio_constants
-from audio_player import AudioPlayer
+from audio_player import AudioPlayer, PlayerEvent
 
 from get_path import get_module_path
 
@@ -42,26 +43,37 @@ class MainWindow(tk.Frame):
             self.root.iconbitmap(default=icon_file)
 
         self.root.protocol('WM_DELETE_WINDOW', self._exit)
-        # idle timer ID
-        self.after_id = None
+        # Player events are handled on the Tk thread
+        self.root.bind('<<PlayerEvent>>', self._on_player_event)
 
     def _init_device_info(self):
         # Core Audio
         self.ca = CoreAudio()
+        self.ca.open()
 
-        self.ca_audio_id_list = self.ca.audio_device_id_list() # Core Audio device ID List
-        self.ca_selected_device_id = None                      # Selected Core Audio device ID
+        self.ca_audio_list = self.ca.audio_device_list()          # Core Audio device list
+        self.ca_audio_id_list = [d.id for d in self.ca_audio_list] # Core Audio device ID List
+        self.ca_selected_device_id = None                         # Selected Core Audio device ID
 
         self.device_notification = DeviceChangedCallback(render_callback=self.device_changed_callback)
         self.ca.register_device_change_callback(self.device_notification)
-        self.volume_notification = VolumeChangedCallback(self.volume_changed_callback)
+        self.volume_notification = VolumeChangedCallback(self.volume_changed_callback, ignore_own_changes=True)
+        # Volume slider changes are written by a background thread
+        self.volume_writer = VolumeWriter()
 
         # PyAudio Player
-        self.audio_player = AudioPlayer()
+        # Events of the player are queued by its listener thread and handled by <<PlayerEvent>>
+        self.player_events = queue.Queue()
+        self.wav_files = []  # files selected together, played back to back without a gap
+        self.audio_player = AudioPlayer(event_callback=self.player_event_callback)
 
     def _exit(self):
         # Stop playing, just in case
         self.audio_player.stop_audio()
+        # Quit the player process
+        self.audio_player.close()
+        # Write the last volume change
+        self.volume_writer.close()
 
         # UnRegister volume changed notifier
         if self.ca_selected_device_id:
@@ -70,6 +82,7 @@ class MainWindow(tk.Frame):
 
         # UnRegister device changed notifier
         self.ca.unregister_device_change_callback(self.device_notification)
+        self.ca.close()
         self.root.quit()
 
     def _create_fonts(self):
@@ -158,9 +171,8 @@ class MainWindow(tk.Frame):
         self.speaker_list = tk.Listbox(self.speaker_frame, selectmode=tk.SINGLE, activestyle='none', yscrollcommand=self.scroll.set, font=self.font12, border=1)
         self.speaker_list.place(x=0, y=0, width=430, height=80)
         # Add speaker names to the list
-        for id in self.ca_audio_id_list:
-            friendly_name = self.ca.get_friendly_name(id)
-            self.speaker_list.insert(tk.END, friendly_name)
+        for device in self.ca_audio_list:
+            self.speaker_list.insert(tk.END, device.friendly_name)
             pass
         self.scroll.config(command=self.speaker_list.yview)
         self.speaker_list.bind('<<ListboxSelect>>', self._on_select_speaker)
@@ -201,10 +213,11 @@ class MainWindow(tk.Frame):
         pass
 
     def _on_browse(self):
-        file_path = filedialog.askopenfilename(filetypes=[('Wav Files', '*.wav')])
-        if file_path:
+        file_paths = filedialog.askopenfilenames(filetypes=[('Wav Files', '*.wav')])
+        if file_paths:
             self.wav_entry.delete(0, tk.END)
-            self.wav_entry.insert(0, file_path)
+            self.wav_entry.insert(0, file_paths[0])
+            self.wav_files = list(file_paths)
         pass
 
     def _on_select_speaker(self, event):
@@ -246,7 +259,7 @@ class MainWindow(tk.Frame):
             self.stop_button.config(state=tk.DISABLED)
 
             # # Register volume changed notifier
-            self.volume_notification = VolumeChangedCallback(self.volume_changed_callback)
+            self.volume_notification = VolumeChangedCallback(self.volume_changed_callback, ignore_own_changes=True)
             self.ca.register_volume_change_callback(self.ca_selected_device_id, self.volume_notification)
 
         pass
@@ -261,11 +274,12 @@ class MainWindow(tk.Frame):
     def _on_volume(self, event):
         if self.ca_selected_device_id:
             volume = self.volume_var.get() / 100
-            self.ca.set_volume(self.ca_selected_device_id, volume)
             if volume == 0:
                 mute = True
-                self.ca.set_mute(self.ca_selected_device_id, mute)
+                self.volume_writer.set_volume(self.ca_selected_device_id, volume, mute)
                 self.mute.config(image=self.icon_mute)
+            else:
+                self.volume_writer.set_volume(self.ca_selected_device_id, volume)
 
     def _on_refresh_speaker_list(self):
         if self.ca_selected_device_id:
@@ -277,13 +291,13 @@ class MainWindow(tk.Frame):
             self.ca.release()
         self.ca_selected_device_id = None
 
-        self.ca_audio_id_list = self.ca.audio_device_id_list()
+        self.ca_audio_list = self.ca.audio_device_list()
+        self.ca_audio_id_list = [d.id for d in self.ca_audio_list]
 
         self.speaker_list.config(state=tk.NORMAL)
         self.speaker_list.delete(0, tk.END)
-        for id in self.ca_audio_id_list:
-            friendly_name = self.ca.get_friendly_name(id)
-            self.speaker_list.insert(tk.END, friendly_name)
+        for device in self.ca_audio_list:
+            self.speaker_list.insert(tk.END, device.friendly_name)
         self.speaker_list.selection_clear(0, tk.END)
 
         self.mute.config(state=tk.DISABLED)
@@ -308,11 +322,12 @@ class MainWindow(tk.Frame):
         self.stop_button.config(state=tk.NORMAL)
 
         # Play audio
-        device_name = self.ca.get_friendly_name(self.ca_selected_device_id)
-        self.audio_player.play_audio(device_name, wav_file)
-
-        # Start timer
-        self.after_id = self.after(100, self._wait_finish)
+        n = self.ca_audio_id_list.index(self.ca_selected_device_id)
+        device_name = self.ca_audio_list[n].friendly_name
+        following = []
+        if self.wav_files and self.wav_files[0] == wav_file:
+            following = self.wav_files[1:]
+        self.audio_player.play_audio(device_name, wav_file, following)
 
     def _on_pause(self):
         self.audio_player.pause_audio()
@@ -322,34 +337,46 @@ class MainWindow(tk.Frame):
 
     def _on_stop(self):
         self.audio_player.stop_audio()
+        self._show_first_file()
         self.speaker_list.config(state=tk.NORMAL)
         self.play_button.config(state=tk.NORMAL)
         self.pause_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.DISABLED)
-        # Stop timer
-        if self.after_id:
-            self.after_cancel(self.after_id)
-            self.after_id = None
-
-    def _wait_finish(self):
-        if self.audio_player.is_playing:
-            # Playing, ReStart timer
-            self.after_id = self.after(100, self._wait_finish)
+
+    def _on_player_event(self, event):
+        while True:
+            try:
+                player_event, info = self.player_events.get_nowait()
+            except queue.Empty:
+                break
+            if player_event == PlayerEvent.TRACK_CHANGED:
+                # Show the file which is being heard
+                self.wav_entry.delete(0, tk.END)
+                self.wav_entry.insert(0, info)
+            elif player_event in (PlayerEvent.FINISHED, PlayerEvent.DEVICE_LOST, PlayerEvent.ERROR):
+                # print(f'player event : {player_event=}, {info=}') # _FOR_DEBUG_
+                # ERROR is also reported for a queued file which is skipped, and
+                # an event of the previous playback can come after Play is pressed again.
+                if not self.audio_player.is_playing:
+                    self._play_finished()
+
+    def _play_finished(self):
+        self.audio_player.audio_finished()
+        self._show_first_file()
+        # Finish playing
+        self.speaker_list.config(state=tk.NORMAL)
+        if self.ca_selected_device_id:
+            self.play_button.config(state=tk.NORMAL)
         else:
-            self.audio_player.audio_finished()
-            # Finish playing
-            self.after_id = None
-            self.speaker_list.config(state=tk.NORMAL)
-            if self.ca_selected_device_id:
-                self.play_button.config(state=tk.NORMAL)
-            else:
-                self.play_button.config(state=tk.DISABLED)
-            self.pause_button.config(state=tk.DISABLED)
-            self.stop_button.config(state=tk.DISABLED)
-            # Stop timer
-            if self.after_id:
-                self.after_cancel(self.after_id)
-                self.after_id = None
+            self.play_button.config(state=tk.DISABLED)
+        self.pause_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.DISABLED)
+
+    def _show_first_file(self):
+        # The entry follows the queue while playing, put the first file back for the next Play
+        if self.wav_files:
+            self.wav_entry.delete(0, tk.END)
+            self.wav_entry.insert(0, self.wav_files[0])
 
     def volume_changed_callback(self, guid, bMuted, fMasterVolume, nChannels, ChannelVolumes):
         """
@@ -388,6 +415,8 @@ class MainWindow(tk.Frame):
 
         # STOP Audio ...
         self.audio_player.stop_audio()
+        # The player process needs to see the new device list
+        self.audio_player.reset_devices()
 
         # _CAUTION_ : The following line causes deadlock, if it calls here
         # It's important to call it from idle timer.
@@ -397,13 +426,19 @@ class MainWindow(tk.Frame):
         # self._on_refresh_speaker_list()
         self.after(100, self._on_refresh_speaker_list)
 
+    def player_event_callback(self, player_event, info):
+        """
+        Callback function, called when the state of the player is changed.
+        """
 
-    # It doesn't need, because it handles by idle timer
-    # def play_finished_callback(self):
-    #     """
-    #     Callback function, called when the play is finished.
-    #     """
-    #     pass
+        # _CAUTION_ : This function is called from the listener thread of the player.
+        # The widgets must not be touched here, the event is passed to the Tk thread.
+        self.player_events.put((player_event, info))
+        try:
+            self.root.event_generate('<<PlayerEvent>>', when='tail')
+        except (tk.TclError, RuntimeError):
+            # The main loop has quit
+            pass
 
 
 def main():
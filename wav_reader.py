@@ -0,0 +1,201 @@
+import mmap
+import struct
+
+
+class WavError(Exception):
+    # The file is not a WAV file which can be played.
+    pass
+
+
+class WaveFormat:
+    # Refer:
+    #   https://learn.microsoft.com/ja-jp/windows/win32/api/mmreg/ns-mmreg-waveformatex
+    PCM = 0x0001
+    IEEE_FLOAT = 0x0003
+    EXTENSIBLE = 0xFFFE
+
+
+# The SubFormat GUID of WAVE_FORMAT_EXTENSIBLE is the format tag followed by these bytes, as KSDATAFORMAT_SUBTYPE_PCM.
+# Refer:
+#   https://learn.microsoft.com/ja-jp/windows/win32/api/mmreg/ns-mmreg-waveformatextensible
+_SUBFORMAT_SUFFIX = bytes.fromhex('000000001000800000aa00389b71')
+
+# The 32-bit sizes of RF64 (and BW64) are this value, the real sizes are in the ds64 chunk.
+# Refer:
+#   EBU Tech 3306 MBWF / RF64
+_RF64_SIZE = 0xFFFFFFFF
+
+
+class WavReader:
+    """
+    WAV file reader based on a memory map.
+
+    PCM of 8, 16, 24 and 32 bits and IEEE float of 32 and 64 bits are read, also in WAVE_FORMAT_EXTENSIBLE,
+    and RF64 / BW64 files of more than 4 GB. The frames are returned as they are in the file,
+    is_float tells the sample_format functions how to convert them.
+    The chunks are parsed once when the file is opened.
+    read() returns read-only views of the mapped data chunk, so no bytes object is allocated per chunk.
+    Only a window of the file is mapped at a time, so the memory usage stays flat for multi-GB files.
+    """
+
+    WINDOW_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self._parse()
+        except (struct.error, EOFError):
+            self.file.close()
+            raise WavError('Broken WAV file')
+        except WavError:
+            self.file.close()
+            raise
+
+        self.position = 0       # current frame
+        self.mm = None
+        self.view = None
+        self.window_start = 0   # file offset of the mapped window
+        self.window_end = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _parse(self):
+        riff, riff_size, wave_id = struct.unpack('<4sI4s', self._read_exactly(12))
+        if riff not in (b'RIFF', b'RF64', b'BW64') or wave_id != b'WAVE':
+            raise WavError('Not a WAV file')
+
+        self.file.seek(0, 2)
+        file_size = self.file.tell()
+        self.file.seek(12)
+
+        fmt = None
+        data_size64 = None  # the size of the data chunk in the ds64 chunk of RF64
+        self.data_offset = None
+        while True:
+            header = self.file.read(8)
+            if len(header) < 8:
+                break
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            offset = self.file.tell()
+            if chunk_id == b'ds64' and riff != b'RIFF':
+                # riffSize, dataSize, sampleCount, and a table of the other large chunks which isn't used
+                _, data_size64 = struct.unpack('<QQ', self._read_exactly(16))
+            elif chunk_id == b'fmt ':
+                fmt = self._read_exactly(min(chunk_size, 40))
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise WavError('No fmt chunk before data chunk')
+                if chunk_size == _RF64_SIZE and data_size64 is not None:
+                    chunk_size = data_size64
+                self.data_offset = offset
+                # The size can be larger than the file while it is being recorded.
+                self.data_size = min(chunk_size, file_size - offset)
+                break
+            # Chunks are aligned to 2 bytes
+            self.file.seek(offset + chunk_size + (chunk_size & 1))
+        if self.data_offset is None:
+            raise WavError('No data chunk')
+
+        format_tag, channels, rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        valid_bits = bits
+        channel_mask = 0
+        if format_tag == WaveFormat.EXTENSIBLE:
+            if len(fmt) < 40:
+                raise WavError('Broken fmt chunk')
+            valid_bits, channel_mask = struct.unpack('<HI', fmt[18:24])
+            sub_format = fmt[24:40]
+            if sub_format[2:] != _SUBFORMAT_SUFFIX:
+                raise WavError('Unsupported sub format')
+            format_tag, = struct.unpack('<H', sub_format[:2])
+        if format_tag not in (WaveFormat.PCM, WaveFormat.IEEE_FLOAT):
+            raise WavError(f'Unsupported format : {format_tag:#06x}')
+        if channels == 0 or block_align == 0 or block_align % channels:
+            raise WavError('Broken fmt chunk')
+        sample_width = block_align // channels
+        is_float = format_tag == WaveFormat.IEEE_FLOAT
+        if sample_width not in ((4, 8) if is_float else (1, 2, 3, 4)):
+            raise WavError(f'Unsupported sample width : {sample_width}')
+
+        self.format_tag = format_tag   # PCM or IEEE_FLOAT, also for WAVE_FORMAT_EXTENSIBLE
+        self.is_float = is_float
+        self.channels = channels
+        self.rate = rate
+        self.bits_per_sample = bits
+        self.valid_bits = valid_bits   # the bits used in the container, left-justified
+        self.channel_mask = channel_mask
+        self.sample_width = sample_width
+        self.frame_size = block_align
+        self.frames = self.data_size // block_align
+
+    def _read_exactly(self, size):
+        data = self.file.read(size)
+        if len(data) < size:
+            raise EOFError
+        return data
+
+    def _map(self, offset):
+        """
+        Map the window which starts at or before the offset.
+        """
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        end = min(start + self.WINDOW_SIZE, self.data_offset + self.data_size)
+        # The previous window is unmapped when the views returned by read() are released.
+        self.view = None
+        self.mm = mmap.mmap(self.file.fileno(), end - start, access=mmap.ACCESS_READ, offset=start)
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.mm.madvise(mmap.MADV_SEQUENTIAL)
+        self.view = memoryview(self.mm)
+        self.window_start = start
+        self.window_end = end
+
+    def read(self, frames):
+        """
+        Return a read-only view of the next frames without copying.
+
+        The view can be shorter than the requested frames at the end of the mapped window.
+        An empty view is returned at the end of the data.
+        """
+        frames = min(frames, self.frames - self.position)
+        if frames <= 0:
+            return memoryview(b'')
+        start = self.data_offset + self.position * self.frame_size
+        if start < self.window_start or start + self.frame_size > self.window_end:
+            self._map(start)
+        frames = min(frames, (self.window_end - start) // self.frame_size)
+        self.position += frames
+        offset = start - self.window_start
+        return self.view[offset:offset + frames * self.frame_size]
+
+    def readinto(self, buffer) -> int:
+        """
+        Copy the next frames into the buffer.
+
+        Returns:
+            int: The number of frames copied.
+        """
+        buffer = memoryview(buffer).cast('B')
+        copied = 0
+        while copied + self.frame_size <= len(buffer):
+            data = self.read((len(buffer) - copied) // self.frame_size)
+            if not data:
+                break
+            buffer[copied:copied + len(data)] = data
+            copied += len(data)
+        return copied // self.frame_size
+
+    def seek(self, frame):
+        self.position = max(0, min(frame, self.frames))
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        self.view = None
+        self.mm = None
+        if self.file:
+            self.file.close()
+        self.file = None
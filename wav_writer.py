@@ -0,0 +1,68 @@
+import struct
+
+from wav_reader import WaveFormat
+
+
+class WavWriter:
+    """
+    WAV file writer of PCM and IEEE float frames.
+
+    The wave module writes PCM only, so the frames of float streams are written by this class.
+    The header is written with zero sizes when the file is opened and updated by close() with the length.
+    A float file has a fact chunk with the frame count, as the format of WAVE_FORMAT_IEEE_FLOAT requires.
+    """
+
+    def __init__(self, path, channels, rate, sample_width, is_float=False):
+        """
+        Args:
+            sample_width (int): The bytes per sample. 1 to 4, or 4 and 8 if is_float is True.
+            is_float (bool): The frames are IEEE floats.
+
+        Raises:
+            ValueError: The format can't be written.
+        """
+        if sample_width not in ((4, 8) if is_float else (1, 2, 3, 4)):
+            raise ValueError(f'Unsupported sample width : {sample_width}')
+        self.channels = channels
+        self.rate = rate
+        self.sample_width = sample_width
+        self.is_float = is_float
+        self.frame_size = channels * sample_width
+        self.data_size = 0
+        self.file = open(path, 'wb')
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write_header(self):
+        # Refer:
+        #   https://learn.microsoft.com/ja-jp/windows/win32/api/mmreg/ns-mmreg-waveformatex
+        tag = WaveFormat.IEEE_FLOAT if self.is_float else WaveFormat.PCM
+        fmt = struct.pack('<HHIIHH', tag, self.channels, self.rate, self.rate * self.frame_size, self.frame_size, self.sample_width * 8)
+        chunks = b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+        if self.is_float:
+            chunks += b'fact' + struct.pack('<II', 4, self.data_size // self.frame_size)
+        chunks += b'data' + struct.pack('<I', self.data_size)
+        # The data chunk is padded to an even size
+        riff_size = 4 + len(chunks) + self.data_size + self.data_size % 2
+        self.file.seek(0)
+        self.file.write(b'RIFF' + struct.pack('<I', riff_size) + b'WAVE' + chunks)
+
+    def writeframesraw(self, data):
+        """
+        Append frames in the format of the file, the header is updated by close().
+        """
+        self.data_size += self.file.write(data)
+
+    def close(self):
+        if self.file is None:
+            return
+        if self.data_size % 2:
+            self.file.write(b'\x00')
+        self._write_header()
+        self.file.close()
+        self.file = None